@@ -0,0 +1,543 @@
+# app/cli.py
+"""
+cli.py — Ejecución por línea de comandos, sin Qt (servidores sin pantalla).
+
+Uso:
+  python -m app.cli predict --species Ceratitis --model refit D:/fotos/sesion1 D:/fotos/sesion2
+  python -m app.cli predict --species Ceratitis --model refit --out noche.csv D:/fotos
+  python -m app.cli pipeline --species Ceratitis --model refit --save-crops D:/recortes D:/fotos
+  python -m app.cli convert --species Ceratitis --model refit --to tflite --register refit_tflite
+  python -m app.cli export-detector
+  python -m app.cli quantize --species Ceratitis --model refit --calib-dir D:/calib --val-dir D:/val
+  python -m app.cli tune --species Ceratitis --model refit --max-rss-mb 6000
+  python -m app.cli calibrate --species Ceratitis --model refit --val-dir D:/val
+  python -m app.cli export-results --model refit --top1 ef4 --since 2025-10-01 --out ef4.csv
+  python -m app.cli import-csv D:/viejos/predictions.csv
+  python -m app.cli --profile perfiles predict --species Ceratitis --model refit D:/fotos
+
+Si --out ya existe, la corrida se reanuda: las imágenes que ya están en el
+CSV se saltan (en pipeline, las imágenes de las que ya hay algún recorte).
+"""
+
+from __future__ import annotations
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+# --- bootstrap imports para "from core ..." (igual que app/main.py)
+APP_ROOT = Path(__file__).resolve().parent  # .../app
+if str(APP_ROOT) not in sys.path:
+    sys.path.insert(0, str(APP_ROOT))
+
+from core.config import load_app_config
+from core.registry import Registry
+
+
+def _log(msg: str) -> None:
+    print(msg, file=sys.stderr, flush=True)
+
+
+# ---------- predict ----------
+
+def _cmd_predict(args: argparse.Namespace) -> int:
+    from core.tf_session import init_tf_session
+    from core.model_loader import load_entry
+    from core.predictor import iter_prediction_chunks
+    from core.results_store import record_results
+    from core.storage import append_predictions_csv, read_csv_files, run_csv_path
+    from core.utils import iter_images_in_paths
+
+    cfg = load_app_config()
+    if args.batch_size:
+        cfg.batch_size = int(args.batch_size)
+
+    registry = Registry(args.registry)
+    entry = registry.get_model(args.species, args.model)
+
+    paths = iter_images_in_paths(args.inputs)
+    if not paths:
+        _log("No se encontraron imágenes en las rutas dadas.")
+        return 1
+
+    out_path = Path(args.out).expanduser().resolve() if args.out else run_csv_path(cfg, args.species, args.model)
+    done_files = read_csv_files(out_path)
+    pending = [p for p in paths if p not in done_files]
+    if done_files:
+        _log(f"Reanudando {out_path}: {len(paths) - len(pending)} ya procesadas, {len(pending)} pendientes.")
+    if not pending:
+        _log("Nada pendiente.")
+        return 0
+
+    init_tf_session(cfg)
+    t_load = time.perf_counter()
+    lm = load_entry(entry, cfg)
+    _log(f"Modelo {args.species}/{args.model} ({lm.model_hash}) cargado en {time.perf_counter() - t_load:.1f}s")
+
+    total, done = len(pending), 0
+    run_id: Optional[int] = None
+    t0 = time.perf_counter()
+    try:
+        for chunk in iter_prediction_chunks(lm, cfg, pending):
+            append_predictions_csv(out_path, args.species, args.model, lm.model_hash, chunk)
+            if not args.no_global:
+                run_id = record_results(cfg, args.species, args.model, lm.model_hash, chunk,
+                                        run_id=run_id, source="cli")
+            done += len(chunk)
+            elapsed = time.perf_counter() - t0
+            _log(f"[{done}/{total}] {done / max(elapsed, 1e-9):.1f} img/s")
+    except KeyboardInterrupt:
+        _log(f"Interrumpido tras {done}/{total}. Reanuda con: --out \"{out_path}\"")
+        return 130
+
+    elapsed = time.perf_counter() - t0
+    _log(f"Listo: {done} imágenes en {elapsed:.1f}s ({done / max(elapsed, 1e-9):.1f} img/s)")
+    print(str(out_path))
+    return 0
+
+
+# ---------- pipeline (YOLO → clasificador) ----------
+
+def _cmd_pipeline(args: argparse.Namespace) -> int:
+    from core.tf_session import init_tf_session
+    from core.detection_cache import open_detection_cache
+    from core.eyes_detector import EyesDetector, default_eyes_detector
+    from core.model_loader import load_entry
+    from core.pipeline import PipelineStats, iter_pipeline_chunks
+    from core.results_store import open_results_store, record_empty_images, record_results
+    from core.storage import append_predictions_csv, read_csv_files, run_csv_path
+    from core.utils import iter_images_in_paths
+
+    cfg = load_app_config()
+    if args.batch_size:
+        cfg.batch_size = int(args.batch_size)
+    if args.conf is not None:
+        cfg.yolo_conf = float(args.conf)
+    if args.yolo_batch_size:
+        cfg.yolo_batch_size = int(args.yolo_batch_size)
+
+    registry = Registry(args.registry)
+    entry = registry.get_model(args.species, args.model)
+
+    paths = iter_images_in_paths(args.inputs)
+    if not paths:
+        _log("No se encontraron imágenes en las rutas dadas.")
+        return 1
+
+    out_path = Path(args.out).expanduser().resolve() if args.out else run_csv_path(cfg, args.species, args.model)
+    source = f"cli-pipeline:{out_path}"  # las imágenes sin detecciones no van al CSV: se reanuda con la base
+    done_images = {f.split("#roi")[0] for f in read_csv_files(out_path)}
+    if not args.no_global:
+        done_images.update(open_results_store(cfg).empty_images(source))
+    pending = [p for p in paths if p not in done_images]
+    if done_images:
+        _log(f"Reanudando {out_path}: {len(paths) - len(pending)} ya procesadas, {len(pending)} pendientes.")
+    if not pending:
+        _log("Nada pendiente.")
+        return 0
+
+    if args.weights:
+        detector = EyesDetector(args.weights, open_detection_cache(cfg))
+    else:
+        detector = default_eyes_detector(cfg)
+    init_tf_session(cfg)
+    t_load = time.perf_counter()
+    lm = load_entry(entry, cfg)
+    _log(f"Modelo {args.species}/{args.model} ({lm.model_hash}) cargado en {time.perf_counter() - t_load:.1f}s")
+
+    stats = PipelineStats()
+    total, done = len(pending), 0
+    run_id: Optional[int] = None
+    n_empty = 0
+
+    def _record_empty() -> None:
+        nonlocal run_id, n_empty
+        if not args.no_global:
+            new = stats.no_detection_paths[n_empty:]
+            run_id = record_empty_images(cfg, args.species, args.model, lm.model_hash, lm.classes, new,
+                                         run_id=run_id, source=source)
+            n_empty += len(new)
+
+    t0 = time.perf_counter()
+    try:
+        for chunk in iter_pipeline_chunks(lm, cfg, detector, pending, save_dir=args.save_crops, stats=stats):
+            append_predictions_csv(out_path, args.species, args.model, lm.model_hash, chunk)
+            if not args.no_global:
+                run_id = record_results(cfg, args.species, args.model, lm.model_hash, chunk,
+                                        run_id=run_id, source=source)
+            _record_empty()
+            done += len(chunk)
+            elapsed = time.perf_counter() - t0
+            _log(f"[{stats.images}/{total}] {done} recortes, {stats.images / max(elapsed, 1e-9):.1f} img/s")
+    except KeyboardInterrupt:
+        _log(f"Interrumpido tras {stats.images}/{total}. Reanuda con: --out \"{out_path}\"")
+        return 130
+    _record_empty()
+
+    elapsed = time.perf_counter() - t0
+    _log(f"Listo: {stats.images} imágenes, {done} recortes en {elapsed:.1f}s "
+         f"({stats.no_detections} sin detecciones, {stats.failed} ilegibles)")
+    print(str(out_path))
+    return 0
+
+
+# ---------- convert ----------
+
+def _cmd_convert(args: argparse.Namespace) -> int:
+    from core.converter import convert_entry
+
+    cfg = load_app_config()
+    registry = Registry(args.registry)
+    entry = registry.get_model(args.species, args.model)
+    out = convert_entry(
+        registry.yaml_path, args.species, entry, args.to,
+        image_size=cfg.image_size, out_path=args.out, new_key=args.register,
+    )
+    _log(f"Generado: {out}")
+    if args.register:
+        _log(f"Registrado como {args.species}/{args.register} (backend={args.to}) en {registry.yaml_path}")
+    return 0
+
+
+# ---------- export-detector ----------
+
+def _cmd_export_detector(args: argparse.Namespace) -> int:
+    from core.eyes_detector import MODEL_FILENAME, _resolve_weights_path, export_detector_onnx
+
+    weights = Path(args.weights) if args.weights else _resolve_weights_path().with_name(MODEL_FILENAME)
+    if not weights.is_file():
+        _log(f"No existe {weights}")
+        return 1
+    out = Path(args.out) if args.out else weights.with_suffix(".onnx")
+    t0 = time.perf_counter()
+    out = export_detector_onnx(weights, out, imgsz=args.imgsz, dynamic=not args.static)
+    _log(f"Detector exportado en {time.perf_counter() - t0:.1f}s: {out}")
+    if _resolve_weights_path().resolve() == out.resolve():
+        _log("La app y la CLI lo usarán en lugar del .pt (sin cargar torch).")
+    return 0
+
+
+# ---------- quantize ----------
+
+def _cmd_quantize(args: argparse.Namespace) -> int:
+    import json
+    from core.evaluation import evaluate, labelled_images
+    from core.model_loader import keras_output_kind, load_entry
+    from core.quantizer import quantize_keras
+    from core.registry import ModelEntry, register_model
+    from core.utils import iter_images_in_paths
+
+    cfg = load_app_config()
+    registry = Registry(args.registry)
+    entry = registry.get_model(args.species, args.model)
+    if entry.backend != "keras":
+        _log(f"Sólo se cuantizan modelos keras ('{args.model}' es {entry.backend}).")
+        return 1
+
+    calib = iter_images_in_paths([args.calib_dir])[: args.calib_max] if args.calib_dir else []
+    samples = labelled_images(args.val_dir) if args.val_dir else []
+    output = keras_output_kind(entry.path, entry.output)  # las variantes .tflite conservan la softmax, si la hay
+
+    rows = []
+    base_acc = None
+    if samples:
+        r = evaluate(load_entry(entry, cfg), cfg, samples)
+        base_acc = r.accuracy
+        rows.append({"key": args.model, "mode": "float32", "path": entry.path,
+                     "size_mb": Path(entry.path).stat().st_size / 2**20,
+                     "accuracy": r.accuracy, "delta_pp": 0.0, "images_per_s": r.images_per_s})
+
+    for mode in args.modes:
+        if mode == "int8" and not calib:
+            _log("int8 omitido: necesita --calib-dir con imágenes de calibración.")
+            continue
+        _log(f"Cuantizando {args.model} ({mode})…")
+        out = quantize_keras(entry.path, mode, calib_paths=calib,
+                             image_size=cfg.image_size, fast_decode=cfg.jpeg_draft_decode)
+        key = f"{args.model}_{mode}"
+        row = {"key": key, "mode": mode, "path": str(out), "size_mb": out.stat().st_size / 2**20}
+        desc = f"Cuantizado ({mode}) de '{args.model}'."
+
+        if samples:
+            qe = ModelEntry(key=key, name=key, path=str(out), classes_path=entry.classes_path,
+                            backend="tflite", output=output)
+            r = evaluate(load_entry(qe, cfg), cfg, samples)
+            delta = 100.0 * (r.accuracy - (base_acc or 0.0))
+            row.update({"accuracy": r.accuracy, "delta_pp": delta, "images_per_s": r.images_per_s})
+            desc += f" Val acc {100 * r.accuracy:.2f}% ({delta:+.2f} pp)."
+
+        if not args.no_register:
+            register_model(registry.yaml_path, args.species, key, path=out,
+                           classes_path=entry.classes_path, name=f"{entry.name} [{mode}]",
+                           backend="tflite", description=desc, output=output)
+        rows.append(row)
+
+    _log(f"{'modelo':<28}{'MB':>8}{'acc %':>9}{'Δ pp':>8}{'img/s':>9}")
+    for r in rows:
+        acc = f"{100 * r['accuracy']:.2f}" if "accuracy" in r else "—"
+        dlt = f"{r['delta_pp']:+.2f}" if "delta_pp" in r else "—"
+        ips = f"{r['images_per_s']:.1f}" if "images_per_s" in r else "—"
+        _log(f"{r['key']:<28}{r['size_mb']:>8.1f}{acc:>9}{dlt:>8}{ips:>9}")
+
+    report = Path(entry.path).with_name(f"{Path(entry.path).stem}_quant_report.json")
+    report.write_text(json.dumps({"species": args.species, "model": args.model,
+                                  "val_dir": args.val_dir, "n_val": len(samples),
+                                  "variants": rows}, indent=2), encoding="utf-8")
+    print(str(report))
+    return 0
+
+
+# ---------- calibrate ----------
+
+def _cmd_calibrate(args: argparse.Namespace) -> int:
+    from core.calibrator import TemperatureScaler, nll, save_calibration
+    from core.evaluation import collect_logits, labelled_images
+    from core.model_loader import load_entry
+    from core.tf_session import init_tf_session
+
+    cfg = load_app_config()
+    cfg.apply_calibration = False  # T se ajusta sobre la salida sin calibrar
+    entry = Registry(args.registry).get_model(args.species, args.model)
+    samples = labelled_images(args.val_dir)
+
+    init_tf_session(cfg)
+    lm = load_entry(entry, cfg)
+    t0 = time.perf_counter()
+    logits, y = collect_logits(lm, cfg, samples)
+    if not len(y):
+        _log("Ninguna imagen de validación pertenece a las clases del modelo.")
+        return 1
+    _log(f"{len(y)} imágenes ({len(samples) - len(y)} de otras clases) en {time.perf_counter() - t0:.1f}s")
+
+    scaler = TemperatureScaler().fit(logits, y)
+    before, after = nll(logits, y), scaler.nll(logits, y)
+    _log(f"T = {scaler.T:.4f}   NLL {before:.4f} -> {after:.4f}")
+    if args.dry_run:
+        return 0
+
+    out = save_calibration(lm.path, lm.model_hash, scaler, n=int(len(y)),
+                           nll_before=before, nll_after=after, val_dir=str(args.val_dir),
+                           fitted_at=time.strftime("%Y-%m-%dT%H:%M:%S"))
+    print(str(out))
+    return 0
+
+
+# ---------- resultados ----------
+
+def _cmd_export_results(args: argparse.Namespace) -> int:
+    from core.results_store import open_results_store
+
+    store = open_results_store(load_app_config())
+    n = store.export_csv(args.out, species=args.species, model_key=args.model, top1=args.top1,
+                         since=args.since, until=args.until, run_id=args.run)
+    _log(f"{n} filas exportadas.")
+    print(str(Path(args.out).resolve()))
+    return 0
+
+
+def _cmd_import_csv(args: argparse.Namespace) -> int:
+    from core.results_store import open_results_store
+
+    store = open_results_store(load_app_config())
+    for path in args.files:
+        n = store.import_csv(path, force=args.force)
+        _log(f"{path}: {n} filas importadas" + ("" if n else " (ya estaba importado o vacío)")
+             + (f", {store.skipped_rows} mal formadas omitidas" if store.skipped_rows else ""))
+    _log(f"Total en la base: {store.count()} resultados.")
+    return 0
+
+
+# ---------- tune ----------
+
+def _default_thread_options() -> List[Optional[int]]:
+    import os
+    n = os.cpu_count() or 1
+    opts: List[Optional[int]] = [None]
+    for t in (max(1, n // 2), n):
+        if t not in opts:
+            opts.append(t)
+    return opts
+
+
+def _cmd_tune(args: argparse.Namespace) -> int:
+    import tempfile
+    from core.config import update_app_config
+    from core.tuner import SYNTHETIC_SIZE, peak_rss_bytes, pick_best, run_tuning, synthetic_jpegs
+
+    registry = Registry(args.registry)
+    registry.get_model(args.species, args.model)  # valida antes de lanzar subprocesos
+    threads = [t or None for t in args.threads] if args.threads else _default_thread_options()
+    if args.max_rss_mb is not None and peak_rss_bytes() is None:
+        _log("No se puede medir el RSS en este equipo (pip install psutil); --max-rss-mb no se aplicaría.")
+        return 1
+
+    with tempfile.TemporaryDirectory(prefix="irfl_tune_") as tmp:
+        images = args.images
+        if not images:
+            _log(f"Midiendo con JPEG sintéticos de {SYNTHETIC_SIZE[0]}x{SYNTHETIC_SIZE[1]} (--images para usar fotos reales)")
+            synthetic_jpegs(tmp, 16)
+            images = [tmp]
+        results = run_tuning(registry.yaml_path, args.species, args.model, args.batch_sizes,
+                             threads, images, min_seconds=args.min_seconds, log=_log)
+    best = pick_best(results, args.max_rss_mb)
+    if best is None:
+        _log("Ninguna configuración cabe en el presupuesto de memoria.")
+        return 1
+
+    label = best["threads"] or "auto"
+    _log(f"Mejor: batch_size={best['batch_size']}, tf_num_threads={label} "
+         f"({best['images_per_s']:.1f} img/s)")
+    if args.dry_run:
+        return 0
+
+    cfg = load_app_config()
+    path = update_app_config({"batch_size": int(best["batch_size"]), "tf_num_threads": best["threads"]},
+                             cfg.config_dir)
+    print(str(path))
+    return 0
+
+
+def _cmd_tune_worker(args: argparse.Namespace) -> int:
+    import json
+    from core.tf_session import init_tf_session
+    from core.tuner import measure_batch_sizes
+    from core.utils import iter_images_in_paths
+
+    cfg = load_app_config()
+    cfg.tf_num_threads = args.threads or None
+    cfg.tf_warmup_on_start = False
+    init_tf_session(cfg)
+    entry = Registry(args.registry).get_model(args.species, args.model)
+    rows = measure_batch_sizes(entry, cfg, args.batch_sizes, iter_images_in_paths(args.images),
+                               min_seconds=args.min_seconds)
+    print(json.dumps(rows))
+    return 0
+
+
+# ---------- parser ----------
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="IRFLies-App sin interfaz gráfica")
+    parser.add_argument("--registry", default=None, help="ruta a registry.yaml (por defecto: autodetección)")
+    parser.add_argument("--profile", default=None, metavar="DIR",
+                        help="medir tiempos por etapa y guardar histogramas (JSON) y trace de Chrome en DIR")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("predict", help="clasificar imágenes o carpetas y escribir un CSV")
+    p.add_argument("--species", required=True)
+    p.add_argument("--model", required=True, help="clave del modelo en registry.yaml (p.ej. refit)")
+    p.add_argument("--out", default=None, help="CSV de salida; si existe, se reanuda")
+    p.add_argument("--batch-size", type=int, default=None, help="sobrescribe AppConfig.batch_size")
+    p.add_argument("--no-global", action="store_true", help="no registrar en la base de resultados (results.sqlite)")
+    p.add_argument("inputs", nargs="+", help="imágenes o carpetas (se recorren recursivamente)")
+    p.set_defaults(func=_cmd_predict)
+
+    p = sub.add_parser("pipeline", help="detectar ojos con YOLO y clasificar los recortes en una sola pasada")
+    p.add_argument("--species", required=True)
+    p.add_argument("--model", required=True, help="clave del modelo en registry.yaml (p.ej. refit)")
+    p.add_argument("--out", default=None, help="CSV de salida; si existe, se reanuda")
+    p.add_argument("--batch-size", type=int, default=None, help="sobrescribe AppConfig.batch_size")
+    p.add_argument("--conf", type=float, default=None, help="sobrescribe AppConfig.yolo_conf")
+    p.add_argument("--yolo-batch-size", type=int, default=None, help="sobrescribe AppConfig.yolo_batch_size")
+    p.add_argument("--weights", default=None, help="pesos YOLO (por defecto: eyes_yolov8n_best.pt)")
+    p.add_argument("--save-crops", default=None, metavar="DIR", help="guardar además los recortes en DIR")
+    p.add_argument("--no-global", action="store_true",
+                   help="no registrar en la base de resultados (results.sqlite); al reanudar se repiten "
+                        "las imágenes sin detecciones")
+    p.add_argument("inputs", nargs="+", help="imágenes o carpetas (se recorren recursivamente)")
+    p.set_defaults(func=_cmd_pipeline)
+
+    p = sub.add_parser("convert", help="convertir un modelo .keras a TFLite u ONNX")
+    p.add_argument("--species", required=True)
+    p.add_argument("--model", required=True)
+    p.add_argument("--to", required=True, choices=["tflite", "onnx"])
+    p.add_argument("--out", default=None, help="ruta del artefacto (por defecto junto al .keras)")
+    p.add_argument("--register", default=None, metavar="KEY",
+                   help="dar de alta el artefacto en registry.yaml con esta clave")
+    p.set_defaults(func=_cmd_convert)
+
+    p = sub.add_parser("export-detector", help="exportar el detector de ojos (YOLO .pt) a ONNX para usarlo sin torch")
+    p.add_argument("--weights", default=None, help="pesos .pt (por defecto: eyes_yolov8n_best.pt)")
+    p.add_argument("--out", default=None, help="ruta del .onnx (por defecto: junto al .pt)")
+    p.add_argument("--imgsz", type=int, default=640, help="tamaño de entrada del detector")
+    p.add_argument("--static", action="store_true", help="lote fijo de 1 (por defecto el lote es variable)")
+    p.set_defaults(func=_cmd_export_detector)
+
+    p = sub.add_parser("quantize", help="generar y registrar variantes TFLite cuantizadas")
+    p.add_argument("--species", required=True)
+    p.add_argument("--model", required=True)
+    p.add_argument("--modes", nargs="+", default=["dynamic", "float16", "int8"],
+                   choices=["dynamic", "int8", "float16"])
+    p.add_argument("--calib-dir", default=None, help="imágenes para calibrar int8 completo")
+    p.add_argument("--calib-max", type=int, default=200)
+    p.add_argument("--val-dir", default=None, help="carpeta etiquetada (subcarpeta por clase) para medir accuracy")
+    p.add_argument("--no-register", action="store_true", help="no agregar las variantes a registry.yaml")
+    p.set_defaults(func=_cmd_quantize)
+
+    p = sub.add_parser("calibrate", help="ajustar temperature scaling con una carpeta etiquetada")
+    p.add_argument("--species", required=True)
+    p.add_argument("--model", required=True)
+    p.add_argument("--val-dir", required=True, help="carpeta etiquetada (subcarpeta por clase)")
+    p.add_argument("--dry-run", action="store_true", help="sólo mostrar T y NLL, no guardar")
+    p.set_defaults(func=_cmd_calibrate)
+
+    p = sub.add_parser("export-results", help="exportar a CSV resultados de la base (results.sqlite)")
+    p.add_argument("--out", required=True, help="CSV de salida")
+    p.add_argument("--species", default=None)
+    p.add_argument("--model", default=None, help="clave del modelo")
+    p.add_argument("--top1", default=None, help="sólo resultados con esta clase top-1")
+    p.add_argument("--since", default=None, help="desde esta fecha, YYYY-MM-DD[ HH:MM:SS]")
+    p.add_argument("--until", default=None, help="hasta esta fecha (exclusiva)")
+    p.add_argument("--run", type=int, default=None, help="sólo esta corrida (id)")
+    p.set_defaults(func=_cmd_export_results)
+
+    p = sub.add_parser("import-csv", help="importar CSV de resultados anteriores a la base")
+    p.add_argument("--force", action="store_true", help="reimportar aunque ya se haya importado")
+    p.add_argument("files", nargs="+")
+    p.set_defaults(func=_cmd_import_csv)
+
+    p = sub.add_parser("tune", help="medir batch_size/tf_num_threads y guardar el mejor en app_config.json")
+    p.add_argument("--species", required=True)
+    p.add_argument("--model", required=True)
+    p.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    p.add_argument("--threads", type=int, nargs="+", default=None,
+                   help="valores de tf_num_threads a probar (0 = auto); por defecto auto, núcleos/2 y núcleos")
+    p.add_argument("--max-rss-mb", type=float, default=None, help="descartar configuraciones con más RSS pico")
+    p.add_argument("--min-seconds", type=float, default=2.0, help="tiempo mínimo de medición por lote")
+    p.add_argument("--images", nargs="+", default=None,
+                   help="carpetas o imágenes para medir (por defecto, JPEG sintéticos de 1600x1200)")
+    p.add_argument("--dry-run", action="store_true", help="sólo mostrar resultados, no guardar")
+    p.set_defaults(func=_cmd_tune)
+
+    # interno: una medición por proceso (los hilos de TF se fijan al iniciar)
+    p = sub.add_parser("tune-worker")
+    p.add_argument("--species", required=True)
+    p.add_argument("--model", required=True)
+    p.add_argument("--threads", type=int, default=0)
+    p.add_argument("--batch-sizes", type=int, nargs="+", required=True)
+    p.add_argument("--images", nargs="+", required=True)
+    p.add_argument("--min-seconds", type=float, default=2.0)
+    p.set_defaults(func=_cmd_tune_worker)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if not args.profile:
+        return int(args.func(args))
+
+    from core import profiling
+    profiling.enable()
+    try:
+        return int(args.func(args))
+    finally:
+        _log(profiling.format_summary())
+        for path in profiling.export_all(args.profile):
+            _log(f"Perfil guardado: {path}")
+        profiling.disable()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
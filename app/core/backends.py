@@ -0,0 +1,99 @@
+"""
+backends.py — Backends de inferencia alternativos a Keras (TFLite, ONNX Runtime).
+Cada runner es un callable lote float32 [N,S,S,3] -> salidas [N,C] en NumPy,
+igual que LoadedModel.infer, así que el predictor no distingue el backend.
+
+Las dependencias se importan al crear el runner:
+  - TFLite: tflite_runtime si está instalado (ligero); si no, tf.lite.
+  - ONNX: onnxruntime.
+"""
+
+from __future__ import annotations
+import threading
+from typing import Optional
+
+import numpy as np
+
+
+def _tflite_interpreter_cls():
+    try:
+        from tflite_runtime.interpreter import Interpreter  # type: ignore
+        return Interpreter
+    except ImportError:
+        import tensorflow as tf
+        return tf.lite.Interpreter
+
+
+class TFLiteRunner:
+    """Intérprete TFLite; redimensiona la entrada si cambia el tamaño de lote."""
+
+    def __init__(self, model_path: str, num_threads: Optional[int] = None):
+        Interpreter = _tflite_interpreter_cls()
+        self.model_path = str(model_path)
+        self._interp = Interpreter(model_path=self.model_path, num_threads=num_threads)
+        self._interp.allocate_tensors()
+        self._in = self._interp.get_input_details()[0]
+        self._out = self._interp.get_output_details()[0]
+        self._batch = int(self._in["shape"][0])
+        self._lock = threading.Lock()  # el intérprete no es thread-safe
+
+    @property
+    def num_outputs(self) -> int:
+        return int(self._out["shape"][-1])
+
+    def _resize(self, n: int) -> None:
+        shape = list(self._in["shape"])
+        shape[0] = n
+        self._interp.resize_tensor_input(self._in["index"], shape)
+        self._interp.allocate_tensors()
+        self._in = self._interp.get_input_details()[0]
+        self._out = self._interp.get_output_details()[0]
+        self._batch = n
+
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        with self._lock:
+            n = int(batch.shape[0])
+            if n != self._batch:
+                self._resize(n)
+
+            x = np.asarray(batch, dtype=np.float32)
+            in_dtype = self._in["dtype"]
+            if in_dtype != np.float32:
+                # modelo cuantizado con entrada entera (int8/uint8)
+                scale, zero = self._in["quantization"]
+                info = np.iinfo(in_dtype)
+                x = np.clip(np.round(x / scale + zero), info.min, info.max).astype(in_dtype)
+
+            self._interp.set_tensor(self._in["index"], x)
+            self._interp.invoke()
+            y = self._interp.get_tensor(self._out["index"])
+
+            if self._out["dtype"] != np.float32:
+                scale, zero = self._out["quantization"]
+                y = (y.astype(np.float32) - zero) * scale
+            return np.array(y, dtype=np.float32)
+
+
+class OnnxRunner:
+    """Sesión de ONNX Runtime en CPU."""
+
+    def __init__(self, model_path: str, num_threads: Optional[int] = None):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("El backend 'onnx' requiere onnxruntime (pip install onnxruntime)") from e
+        self.model_path = str(model_path)
+        so = ort.SessionOptions()
+        if num_threads:
+            so.intra_op_num_threads = int(num_threads)
+        self._sess = ort.InferenceSession(self.model_path, so, providers=["CPUExecutionProvider"])
+        self._in_name = self._sess.get_inputs()[0].name
+        self._num_outputs = int(self._sess.get_outputs()[0].shape[-1])
+
+    @property
+    def num_outputs(self) -> int:
+        return self._num_outputs
+
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        x = np.asarray(batch, dtype=np.float32)
+        return np.asarray(self._sess.run(None, {self._in_name: x})[0], dtype=np.float32)
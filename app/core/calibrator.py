@@ -1,13 +1,17 @@
 """
 calibrator.py — Calibración de probabilidades (temperature scaling).
 Útil si quieres que los % se acerquen a frecuencias reales.
+
+La temperatura ajustada se guarda junto al modelo en <modelo>.calibration.json
+(con el hash del modelo: si el archivo cambia, la calibración deja de aplicarse).
 """
 
 from __future__ import annotations
+import json
 import numpy as np
 from dataclasses import dataclass
-from typing import Optional
-from scipy.optimize import minimize  # scikit-learn trae scipy por dependencia, ok.
+from pathlib import Path
+from typing import Any, Dict, Optional
 
 
 @dataclass
@@ -20,21 +24,15 @@ class TemperatureScaler:
         logits: [N,C] salidas no normalizadas del modelo
         y_true: [N] índices verdaderos
         """
-        def nll(temp: float) -> float:
-            t = max(0.05, float(temp))
-            z = logits / t
-            z = z - z.max(axis=1, keepdims=True)
-            ex = np.exp(z)
-            p = ex / ex.sum(axis=1, keepdims=True)
-            # -log(p[y])
-            n = np.arange(len(y_true))
-            loss = -np.log(p[n, y_true] + 1e-12).mean()
-            return float(loss)
-
-        res = minimize(lambda v: nll(v[0]), x0=[1.0], bounds=[(0.05, 10.0)], method="L-BFGS-B")
+        from scipy.optimize import minimize  # scikit-learn trae scipy por dependencia, ok.
+
+        res = minimize(lambda v: nll(logits, y_true, v[0]), x0=[1.0], bounds=[(0.05, 10.0)], method="L-BFGS-B")
         self.T = float(res.x[0]) if res.success else 1.0
         return self
 
+    def nll(self, logits: np.ndarray, y_true: np.ndarray) -> float:
+        return nll(logits, y_true, self.T)
+
     def transform_logits(self, logits: np.ndarray) -> np.ndarray:
         t = max(0.05, float(self.T))
         return logits / t
@@ -46,4 +44,42 @@ class TemperatureScaler:
         z = self.transform_logits(z)
         z = z - z.max(axis=1, keepdims=True)
         ex = np.exp(z)
-        return ex / ex.sum(axis=1, keepdims=True)
\ No newline at end of file
+        return ex / ex.sum(axis=1, keepdims=True)
+
+
+def nll(logits: np.ndarray, y_true: np.ndarray, temp: float = 1.0) -> float:
+    """NLL media de softmax(logits / temp) para las clases verdaderas."""
+    t = max(0.05, float(temp))
+    z = logits / t
+    z = z - z.max(axis=1, keepdims=True)
+    # log softmax estable: -log(p[y])
+    logp = z - np.log(np.exp(z).sum(axis=1, keepdims=True))
+    n = np.arange(len(y_true))
+    return float(-logp[n, y_true].mean())
+
+
+def calibration_path(model_path: str | Path) -> Path:
+    p = Path(model_path)
+    return p.with_name(f"{p.name}.calibration.json")
+
+
+def save_calibration(model_path: str | Path, model_hash: str, scaler: TemperatureScaler, **info: Any) -> Path:
+    """Escribe <modelo>.calibration.json con T, el hash del modelo y datos del ajuste."""
+    out = calibration_path(model_path)
+    data: Dict[str, Any] = {"temperature": float(scaler.T), "model_hash": model_hash, **info}
+    out.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+    return out
+
+
+def load_temperature(model_path: str | Path, model_hash: str) -> Optional[float]:
+    """T guardada para este modelo, o None si no hay calibración (o es de otro archivo)."""
+    p = calibration_path(model_path)
+    if not p.is_file():
+        return None
+    try:
+        data = json.loads(p.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if data.get("model_hash") != model_hash:
+        return None
+    return max(0.05, float(data.get("temperature", 1.0)))
\ No newline at end of file
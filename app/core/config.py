@@ -8,7 +8,7 @@ Prioridad de carga (de menor a mayor):
 """
 
 from __future__ import annotations
-import json, os
+import json, os, re
 from dataclasses import dataclass, asdict
 from pathlib import Path
 from typing import Any, Dict
@@ -32,15 +32,37 @@ class AppConfig:
     confidence_threshold: float = 0.60
     top2_margin_pp: float = 0.05  # margen en puntos porcentuales (0.05 = 5pp)
     batch_size: int = 16
+    decode_workers: int | None = None  # hilos de decodificación; None = auto (núcleos), 0 = sin pool
+    jpeg_draft_decode: bool = True     # JPEG: decodificar ya reducido (escalado DCT) antes del resize
+    tensor_cache_mb: int = 0           # caché en disco de tensores preprocesados (0 = desactivada)
+    prediction_cache: bool = False     # caché persistente de salidas por (imagen, modelo)
 
     # TensorFlow
     tf_allow_memory_growth: bool = True
     tf_warmup_on_start: bool = True
     tf_num_threads: int | None = None  # None = auto
+    tf_compile_inference: bool = True  # tf.function con firma fija [None,S,S,3]
+    tf_jit_compile: bool = False       # además compilar con XLA (jit_compile)
+    strip_softmax: bool = True         # quitar la softmax final de los .keras y trabajar con logits
+    apply_calibration: bool = True     # usar <modelo>.calibration.json si existe (cli calibrate)
+
+    # Caché de modelos (ModelManager, LRU)
+    model_cache_max_models: int = 3    # 0 = sin límite por número
+    model_cache_max_mb: int = 0        # presupuesto estimado de pesos en MB (0 = sin límite)
+    prefetch_variants: bool = False    # precargar en segundo plano las otras variantes de la especie
+
+    # Detección de ojos (YOLO)
+    yolo_conf: float = 0.25            # confianza mínima de las detecciones
+    yolo_batch_size: int = 8           # imágenes por llamada al detector en "detectar en todas"
+    save_crop_files: bool = False      # además de clasificar en memoria, guardar los recortes (auditoría)
+    detection_cache: bool = True       # recordar los ROIs por imagen/pesos/conf (<runs_dir>/cache/detections.sqlite)
 
     # Exportación
     export_full_prob_vector: bool = True  # guardar vector de probabilidades por imagen
 
+    # Diagnóstico
+    profiling: bool = False  # tiempos por etapa; al cerrar se guardan en <runs_dir>/profiles
+
     # UI (opcional)
     theme: str = "auto"  # "auto" | "light" | "dark"
 
@@ -109,4 +131,37 @@ def save_app_config(cfg: AppConfig) -> None:
     path = Path(cfg.config_dir) / "app_config.json"
     path.parent.mkdir(parents=True, exist_ok=True)
     with open(path, "w", encoding="utf-8") as f:
-        json.dump(asdict(cfg), f, ensure_ascii=False, indent=2)
\ No newline at end of file
+        json.dump(asdict(cfg), f, ensure_ascii=False, indent=2)
+
+
+def update_app_config(values: Dict[str, Any], config_dir: str | None = None) -> Path:
+    """
+    Cambia sólo las claves de `values` en app_config.json. A diferencia de
+    save_app_config, no escribe las rutas ya resueltas ni lo que venga de
+    variables IRFL_; el resto del archivo (y su formato) queda igual.
+    """
+    path = Path(config_dir or AppConfig().config_dir) / "app_config.json"
+    text = ""
+    if path.is_file():
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            text = f.read()
+    data = json.loads(text) if text.strip() else {}
+    data.update(values)
+
+    # claves planas ya presentes: se reemplaza el valor en el texto
+    for key, value in values.items():
+        text = re.sub(
+            rf'("{re.escape(key)}"\s*:\s*)(null|true|false|-?[0-9.eE+-]+|"(?:[^"\\]|\\.)*")',
+            lambda m, v=value: m.group(1) + json.dumps(v), text, count=1,
+        )
+    try:
+        ok = json.loads(text) == data
+    except ValueError:
+        ok = False
+    if not ok:  # falta alguna clave o el archivo no tenía esa forma
+        text = json.dumps(data, ensure_ascii=False, indent=2)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(text)
+    return path
\ No newline at end of file
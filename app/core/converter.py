@@ -0,0 +1,72 @@
+"""
+converter.py — Convierte un .keras registrado a otro backend (TFLite u ONNX)
+y, opcionalmente, lo da de alta en registry.yaml como un modelo más.
+"""
+
+from __future__ import annotations
+from pathlib import Path
+from typing import Optional
+
+from .model_loader import keras_output_kind
+from .registry import ModelEntry, register_model
+
+
+def convert_keras(keras_path: str, fmt: str, out_path: Optional[str] = None, image_size: int = 224) -> Path:
+    """
+    Genera el artefacto `fmt` ("tflite" | "onnx") a partir del .keras.
+    Por defecto queda junto al .keras con la extensión correspondiente.
+    """
+    import tensorflow as tf
+    from tensorflow.keras.models import load_model
+
+    src = Path(keras_path).resolve()
+    if not src.is_file():
+        raise FileNotFoundError(f"Modelo .keras no encontrado: {src}")
+    out = Path(out_path).resolve() if out_path else src.with_suffix(f".{fmt}")
+    out.parent.mkdir(parents=True, exist_ok=True)
+
+    model = load_model(src, compile=False)
+
+    if fmt == "tflite":
+        converter = tf.lite.TFLiteConverter.from_keras_model(model)
+        out.write_bytes(converter.convert())
+    elif fmt == "onnx":
+        try:
+            import tf2onnx
+        except ImportError as e:
+            raise ImportError("La conversión a ONNX requiere tf2onnx (pip install tf2onnx)") from e
+        spec = (tf.TensorSpec((None, image_size, image_size, 3), tf.float32, name="input"),)
+        tf2onnx.convert.from_keras(model, input_signature=spec, opset=13, output_path=str(out))
+    else:
+        raise ValueError(f"Formato no soportado: {fmt} (usa 'tflite' u 'onnx')")
+
+    return out
+
+
+def convert_entry(
+    registry_path: str | Path,
+    species_key: str,
+    entry: ModelEntry,
+    fmt: str,
+    image_size: int = 224,
+    out_path: Optional[str] = None,
+    new_key: Optional[str] = None,
+) -> Path:
+    """
+    Convierte `entry` y, si se da `new_key`, lo registra con backend=fmt y el
+    `output` (probs/logits) que tiene el .keras de origen.
+    """
+    if entry.backend != "keras":
+        raise ValueError(f"Sólo se convierten modelos keras (el modelo '{entry.key}' es {entry.backend})")
+    out = convert_keras(entry.path, fmt, out_path, image_size)
+    if new_key:
+        register_model(
+            registry_path, species_key, new_key,
+            path=out,
+            classes_path=entry.classes_path,
+            name=f"{entry.name} [{fmt}]",
+            backend=fmt,
+            description=f"Convertido de '{entry.key}'.",
+            output=keras_output_kind(entry.path, entry.output),
+        )
+    return out
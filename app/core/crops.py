@@ -0,0 +1,179 @@
+"""
+crops.py — Recorte de ROIs (x, y, w, h) en píxeles de la imagen original.
+
+Para clasificar, los recortes van en memoria al predictor (decode_crops /
+iter_crop_batches): cada imagen se decodifica una vez para todos sus ROIs y
+no hay JPEG intermedio. save_crops queda para guardar recortes de auditoría.
+Las coordenadas son las del archivo tal cual (sin rotar por EXIF), como las
+muestra CropView.
+"""
+
+from __future__ import annotations
+import math
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from .preprocessor import _resolve_workers, preprocess_image
+from .profiling import span
+
+Roi = Tuple[int, int, int, int]  # (x, y, w, h)
+CropSource = Tuple[str, Sequence[Roi]]  # (imagen, ROIs)
+
+
+def clamp_roi(roi: Roi, width: int, height: int) -> Roi:
+    """Ajusta el ROI a los límites de la imagen (mínimo 1×1)."""
+    x, y, w, h = roi
+    x2 = max(0, min(x, width - 1))
+    y2 = max(0, min(y, height - 1))
+    w2 = max(1, min(w, width - x2))
+    h2 = max(1, min(h, height - y2))
+    return x2, y2, w2, h2
+
+
+def save_crops(src_path: str, rois: Sequence[Roi], out_dir: str | Path, quality: int = 95) -> List[str]:
+    """Guarda cada ROI de `src_path` como JPEG en out_dir; devuelve las rutas en orden."""
+    out_paths: List[str] = []
+    with Image.open(src_path) as im:
+        w0, h0 = im.size
+        for i, roi in enumerate(rois, start=1):
+            x2, y2, w2, h2 = clamp_roi(roi, w0, h0)
+            crop = im.crop((x2, y2, x2 + w2, y2 + h2))
+            name = f"{Path(src_path).stem}__roi{i}_x{x2}_y{y2}_w{w2}_h{h2}.jpg"
+            out = str(Path(out_dir) / name)
+            crop.save(out, quality=quality)
+            out_paths.append(out)
+    return out_paths
+
+
+def crop_label(src_path: str, index: int, roi: Roi) -> str:
+    """Identificador de un recorte en los resultados (mismo sufijo que los archivos de save_crops)."""
+    x, y, w, h = roi
+    return f"{src_path}#roi{index}_x{x}_y{y}_w{w}_h{h}"
+
+
+def decode_crops(
+    src_path: str,
+    rois: Sequence[Roi],
+    image_size: int,
+    fast_decode: bool = True,
+    save_dir: Optional[str | Path] = None,
+    quality: int = 95,
+) -> Tuple[List[str], np.ndarray]:
+    """
+    Decodifica `src_path` una sola vez y devuelve (etiquetas, tensores
+    [k,S,S,3]) de sus ROIs. Con fast_decode, un JPEG se decodifica ya reducido
+    (escalado DCT) mientras el ROI más chico siga midiendo al menos image_size.
+    Con save_dir además se guarda cada recorte a resolución completa.
+    """
+    with span("decode"), Image.open(src_path) as im:
+        w0, h0 = im.size
+        boxes = [clamp_roi(r, w0, h0) for r in rois]
+        if fast_decode and boxes and save_dir is None:
+            need = max(image_size / min(w, h) for _, _, w, h in boxes)
+            if need < 1.0:
+                im.draft("RGB", (math.ceil(w0 * need), math.ceil(h0 * need)))
+        sx, sy = im.size[0] / w0, im.size[1] / h0
+        img = im.convert("RGB")
+    return _crop_tensors(img, src_path, boxes, image_size, sx, sy, save_dir, quality)
+
+
+def crops_from_image(
+    img: Image.Image,
+    src_path: str,
+    rois: Sequence[Roi],
+    image_size: int,
+    save_dir: Optional[str | Path] = None,
+    quality: int = 95,
+    full_size: Optional[Tuple[int, int]] = None,
+) -> Tuple[List[str], np.ndarray]:
+    """
+    Como decode_crops, sobre una imagen RGB ya decodificada. Si `img` es un
+    draft de un original de `full_size` (ancho, alto), se recorta de ella
+    mientras el ROI más chico siga midiendo al menos image_size; si no (o con
+    save_dir, que guarda a resolución completa) se vuelve a leer el archivo.
+    """
+    w0, h0 = full_size or img.size
+    boxes = [clamp_roi(r, w0, h0) for r in rois]
+    sx, sy = img.size[0] / w0, img.size[1] / h0
+    if boxes and (sx, sy) != (1.0, 1.0):
+        if save_dir is not None or min(min(w * sx, h * sy) for _, _, w, h in boxes) < image_size:
+            return decode_crops(src_path, rois, image_size, True, save_dir, quality)
+    return _crop_tensors(img, src_path, boxes, image_size, sx, sy, save_dir, quality)
+
+
+def _crop_tensors(img: Image.Image, src_path: str, boxes: Sequence[Roi], image_size: int,
+                  sx: float, sy: float, save_dir: Optional[str | Path], quality: int) -> Tuple[List[str], np.ndarray]:
+    """Recorta `boxes` (coordenadas originales; img escalada por sx, sy) y las preprocesa."""
+    labels: List[str] = []
+    arrays: List[np.ndarray] = []
+    for i, (x, y, w, h) in enumerate(boxes, start=1):
+        with span("preprocess"):
+            crop = img.crop((round(x * sx), round(y * sy), round((x + w) * sx), round((y + h) * sy)))
+            arrays.append(preprocess_image(crop, image_size))
+        labels.append(crop_label(src_path, i, (x, y, w, h)))
+        if save_dir is not None:
+            name = f"{Path(src_path).stem}__roi{i}_x{x}_y{y}_w{w}_h{h}.jpg"
+            crop.save(Path(save_dir) / name, quality=quality)
+    batch = np.stack(arrays, axis=0) if arrays else np.zeros((0, image_size, image_size, 3), np.float32)
+    return labels, batch.astype(np.float32, copy=False)
+
+
+def iter_crop_batches(
+    sources: Iterable[CropSource],
+    image_size: int,
+    batch_size: int,
+    workers: Optional[int] = None,
+    fast_decode: bool = True,
+    save_dir: Optional[str | Path] = None,
+) -> Iterator[Tuple[List[str], np.ndarray]]:
+    """
+    (etiquetas, lote [n,S,S,3]) de los ROIs de todas las imágenes, en orden.
+    Las imágenes se decodifican en un pool de hilos, unas cuantas por delante
+    del consumidor (como preprocessor.iter_batches).
+    """
+    size = max(1, int(batch_size))
+    jobs = ((src, rois) for src, rois in sources if rois)
+    if save_dir is not None:
+        Path(save_dir).mkdir(parents=True, exist_ok=True)
+
+    def _decode(src: str, rois: Sequence[Roi]) -> Tuple[List[str], np.ndarray]:
+        return decode_crops(src, rois, image_size, fast_decode, save_dir)
+
+    n_workers = _resolve_workers(workers)
+    pool = ThreadPoolExecutor(max_workers=n_workers, thread_name_prefix="crops") if n_workers else None
+    pending: deque = deque()
+    labels: List[str] = []
+    arrays: List[np.ndarray] = []
+    try:
+        if pool is None:
+            decoded: Iterator = (_decode(*job) for job in jobs)
+        else:
+            for job in islice(jobs, 2 * n_workers):
+                pending.append(pool.submit(_decode, *job))
+
+            def _ordered() -> Iterator[Tuple[List[str], np.ndarray]]:
+                while pending:
+                    fut = pending.popleft()
+                    nxt = next(jobs, None)
+                    if nxt is not None:
+                        pending.append(pool.submit(_decode, *nxt))
+                    yield fut.result()
+            decoded = _ordered()
+
+        for lab, arr in decoded:
+            labels.extend(lab)
+            arrays.extend(arr)
+            while len(labels) >= size:
+                yield labels[:size], np.stack(arrays[:size], axis=0)
+                del labels[:size], arrays[:size]
+        if labels:
+            yield labels, np.stack(arrays, axis=0)
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
\ No newline at end of file
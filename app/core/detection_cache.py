@@ -0,0 +1,138 @@
+"""
+detection_cache.py — Caché persistente de detecciones de ojos (YOLO).
+Clave: hash del contenido de la imagen + hash de los pesos + umbral `conf`.
+Se guardan los ROIs (x, y, w, h) en píxeles como JSON, también las listas
+vacías (imágenes sin detecciones), así que volver a abrir una carpeta ya
+procesada no pasa de nuevo por el modelo.
+
+Si el archivo de pesos cambia (otro hash para la misma ruta), sus entradas
+viejas se borran en bind_weights().
+"""
+
+from __future__ import annotations
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .config import AppConfig
+from .crops import Roi
+from .prediction_cache import FILES_SCHEMA, memo_file_digest
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS detections (
+    image_hash   TEXT NOT NULL,
+    weights_hash TEXT NOT NULL,
+    conf         REAL NOT NULL,
+    rois         TEXT NOT NULL,
+    PRIMARY KEY (image_hash, weights_hash, conf)
+);
+CREATE INDEX IF NOT EXISTS detections_weights ON detections(weights_hash);
+CREATE TABLE IF NOT EXISTS weights (
+    weights_path TEXT PRIMARY KEY,
+    weights_hash TEXT NOT NULL
+);
+"""
+
+
+def _conf_key(conf: float) -> float:
+    return round(float(conf), 4)  # 0.25 y 0.2500001 son el mismo umbral
+
+
+class DetectionCache:
+    def __init__(self, db_path: str | Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.executescript(_SCHEMA + FILES_SCHEMA)
+        self._con.commit()
+
+    def image_key(self, path: str) -> str:
+        """Hash del contenido del archivo (imagen o pesos), memorizado por mtime/tamaño."""
+        return memo_file_digest(self._con, self._lock, path)
+
+    # ---------- lectura / escritura ----------
+    def get(self, image_hash: str, weights_hash: str, conf: float) -> Optional[List[Roi]]:
+        with self._lock:
+            row = self._con.execute(
+                "SELECT rois FROM detections WHERE image_hash = ? AND weights_hash = ? AND conf = ?",
+                (image_hash, weights_hash, _conf_key(conf)),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return [tuple(r) for r in json.loads(row[0])]
+
+    def put_many(self, rows: Iterable[Tuple[str, List[Roi]]], weights_hash: str, conf: float) -> None:
+        """Guarda (image_hash, rois) en una sola transacción."""
+        data = [
+            (h, weights_hash, _conf_key(conf), json.dumps([list(map(int, r)) for r in rois]))
+            for h, rois in rows
+        ]
+        if not data:
+            return
+        with self._lock:
+            self._con.executemany(
+                "INSERT OR REPLACE INTO detections(image_hash, weights_hash, conf, rois) VALUES (?,?,?,?)",
+                data,
+            )
+            self._con.commit()
+
+    # ---------- invalidación ----------
+    def bind_weights(self, weights_path: str, weights_hash: str) -> int:
+        """
+        Registra el hash actual de los pesos en `weights_path`. Si antes había
+        otro, borra las detecciones hechas con él y devuelve cuántas eran.
+        """
+        key = str(Path(weights_path).resolve())
+        with self._lock:
+            row = self._con.execute(
+                "SELECT weights_hash FROM weights WHERE weights_path = ?", (key,)
+            ).fetchone()
+            removed = 0
+            if row and row[0] != weights_hash:
+                removed = self._con.execute(
+                    "DELETE FROM detections WHERE weights_hash = ?", (row[0],)
+                ).rowcount
+            self._con.execute(
+                "INSERT OR REPLACE INTO weights(weights_path, weights_hash) VALUES (?,?)",
+                (key, weights_hash),
+            )
+            self._con.commit()
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            (entries,) = self._con.execute("SELECT COUNT(*) FROM detections").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": int(entries)}
+
+    def close(self) -> None:
+        with self._lock:
+            self._con.close()
+
+
+_OPEN: Dict[str, DetectionCache] = {}
+_OPEN_LOCK = threading.Lock()
+
+
+def open_detection_cache(cfg: AppConfig) -> Optional[DetectionCache]:
+    """
+    Devuelve la caché compartida (en <runs_dir>/cache/detections.sqlite),
+    o None si cfg.detection_cache está desactivada.
+    """
+    if not cfg.detection_cache:
+        return None
+    path = str(Path(cfg.runs_dir).expanduser().resolve() / "cache" / "detections.sqlite")
+    with _OPEN_LOCK:
+        cache = _OPEN.get(path)
+        if cache is None:
+            cache = DetectionCache(path)
+            _OPEN[path] = cache
+        return cache
@@ -0,0 +1,82 @@
+"""
+evaluation.py — Evaluación de un modelo sobre una carpeta etiquetada
+(una subcarpeta por clase, con el mismo nombre que en classes.json).
+"""
+
+from __future__ import annotations
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .config import AppConfig
+from .model_loader import LoadedModel
+from .predictor import as_logits, iter_prediction_chunks, iter_raw_outputs
+from .utils import iter_images_in_paths
+
+
+def labelled_images(root: str | Path) -> List[Tuple[str, str]]:
+    """[(ruta, clase)] para cada imagen dentro de root/<clase>/..."""
+    base = Path(root)
+    if not base.is_dir():
+        raise FileNotFoundError(f"Carpeta de validación no encontrada: {base}")
+    out: List[Tuple[str, str]] = []
+    for sub in sorted(p for p in base.iterdir() if p.is_dir()):
+        for path in iter_images_in_paths([str(sub)]):
+            out.append((path, sub.name))
+    return out
+
+
+@dataclass
+class EvalResult:
+    n: int = 0
+    correct: int = 0
+    skipped: int = 0                      # imágenes de clases que el modelo no conoce
+    seconds: float = 0.0
+    per_class: Dict[str, Tuple[int, int]] = field(default_factory=dict)  # clase -> (aciertos, total)
+
+    @property
+    def accuracy(self) -> float:
+        return self.correct / self.n if self.n else 0.0
+
+    @property
+    def images_per_s(self) -> float:
+        return self.n / self.seconds if self.seconds > 0 else 0.0
+
+
+def evaluate(lm: LoadedModel, cfg: AppConfig, samples: List[Tuple[str, str]]) -> EvalResult:
+    """Top-1 accuracy de `lm` sobre [(ruta, clase)]."""
+    known = set(lm.classes)
+    labels = {p: c for p, c in samples if c in known}
+    res = EvalResult(skipped=len(samples) - len(labels))
+
+    t0 = time.perf_counter()
+    for chunk in iter_prediction_chunks(lm, cfg, list(labels)):
+        for pred in chunk:
+            truth = labels[pred.file]
+            ok = pred.top1_class == truth
+            hit, tot = res.per_class.get(truth, (0, 0))
+            res.per_class[truth] = (hit + int(ok), tot + 1)
+            res.correct += int(ok)
+            res.n += 1
+    res.seconds = time.perf_counter() - t0
+    return res
+
+
+def collect_logits(lm: LoadedModel, cfg: AppConfig,
+                   samples: List[Tuple[str, str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (logits [N,C], índices verdaderos [N]) sobre [(ruta, clase)], para calibrar.
+    Pasa por la caché de predicciones: repetir el ajuste no vuelve a inferir.
+    """
+    labels = {p: lm.class_to_idx[c] for p, c in samples if c in lm.class_to_idx}
+    logits: List[np.ndarray] = []
+    y: List[int] = []
+    for paths, raw in iter_raw_outputs(lm, cfg, list(labels)):
+        logits.append(np.asarray(as_logits(lm, raw), dtype=np.float32))
+        y.extend(labels[p] for p in paths)
+    if not logits:
+        return np.zeros((0, len(lm.classes)), np.float32), np.zeros(0, np.int64)
+    return np.concatenate(logits, axis=0), np.asarray(y, dtype=np.int64)
\ No newline at end of file
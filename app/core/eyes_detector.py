@@ -1,31 +1,33 @@
 # app/core/eyes_detector.py
 from __future__ import annotations
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Sequence, Tuple, Optional
 import sys
 
-import torch  # <<< seguimos usando torch para el parche
+import numpy as np
+from PIL import Image
 
-# --- Parche para PyTorch 2.6+ ---
-_orig_torch_load = torch.load
+from .crops import Roi
+from .detection_cache import DetectionCache, open_detection_cache
+from .profiling import span
+from .yolo_onnx import OnnxYolo
 
-def _torch_load_ultralytics(*args, **kwargs):
-    kwargs.setdefault("weights_only", False)
-    return _orig_torch_load(*args, **kwargs)
-
-torch.load = _torch_load_ultralytics
-# --- fin del parche ---
-
-from ultralytics import YOLO
+if TYPE_CHECKING:
+    from ultralytics import YOLO
+    from .config import AppConfig
 
 
 MODEL_FILENAME = "eyes_yolov8n_best.pt"
+ONNX_FILENAME = "eyes_yolov8n_best.onnx"  # export-detector: sin torch ni ultralytics
 
 
 def _resolve_weights_path() -> Path:
     """
-    Intenta encontrar el .pt en varias rutas razonables,
+    Intenta encontrar el detector en varias rutas razonables,
     tanto en desarrollo como dentro del .exe de PyInstaller.
+    En cada carpeta se prefiere el .onnx exportado al .pt.
     """
     here = Path(__file__).resolve()
 
@@ -51,48 +53,257 @@ def _resolve_weights_path() -> Path:
         candidates.append(exe_dir / "models" / MODEL_FILENAME)
 
     for c in candidates:
-        if c.is_file():
-            return c
+        for path in (c.with_name(ONNX_FILENAME), c):
+            if path.is_file():
+                return path
 
     msg = "No se encontró el modelo de ojos. Se probaron estas rutas:\n" + \
           "\n".join(str(p) for p in candidates)
     raise FileNotFoundError(msg)
 
 
+_YOLO = None
+
+
+def _import_yolo():
+    """
+    Importa torch + ultralytics la primera vez que se usa el detector (no al
+    importar el módulo: la ventana aparece sin esperar a PyTorch).
+    """
+    global _YOLO
+    if _YOLO is None:
+        import torch  # <<< seguimos usando torch para el parche
+
+        # --- Parche para PyTorch 2.6+ ---
+        _orig_torch_load = torch.load
+
+        def _torch_load_ultralytics(*args, **kwargs):
+            kwargs.setdefault("weights_only", False)
+            return _orig_torch_load(*args, **kwargs)
+
+        torch.load = _torch_load_ultralytics
+        # --- fin del parche ---
+
+        from ultralytics import YOLO
+        _YOLO = YOLO
+    return _YOLO
+
+
 class EyesDetector:
     """
     Wrapper sobre YOLOv8 para detectar la región de ojos.
     Devuelve [(x, y, w, h), ...] en píxeles.
+
+    Con pesos .onnx se usa yolo_onnx.OnnxYolo (ONNX Runtime, sin torch); con
+    .pt, ultralytics.
+
+    Con `cache`, los resultados se recuerdan por contenido de la imagen, pesos
+    y `conf`; si todo sale de la caché, YOLO (y torch) ni se cargan.
     """
 
-    def __init__(self, weights_path: str | Path):
+    def __init__(self, weights_path: str | Path, cache: Optional[DetectionCache] = None):
         self.weights_path = str(weights_path)
-        self._model: Optional[YOLO] = None
+        self.cache = cache
+        self._model: Optional["YOLO | OnnxYolo"] = None
+        self._weights_hash: Optional[str] = None
+
+    @property
+    def is_onnx(self) -> bool:
+        return Path(self.weights_path).suffix.lower() == ".onnx"
 
-    def _lazy_model(self) -> YOLO:
+    def input_size(self) -> Tuple[int, int]:
+        """(alto, ancho) al que el modelo lleva cada imagen: imgsz del .onnx, 640 para el .pt."""
+        if self.is_onnx:
+            return self._lazy_model().imgsz
+        return 640, 640
+
+    def _lazy_model(self) -> "YOLO | OnnxYolo":
         if self._model is None:
-            self._model = YOLO(self.weights_path)
+            with span("yolo.load"):
+                if self.is_onnx:
+                    self._model = OnnxYolo(self.weights_path)
+                else:
+                    self._model = _import_yolo()(self.weights_path)
         return self._model
 
-    def detect(self, img_path: str, conf: float = 0.25) -> List[Tuple[int, int, int, int]]:
-        model = self._lazy_model()
-        res = model.predict(source=img_path, conf=conf, verbose=False)[0]
-
-        rois: List[Tuple[int, int, int, int]] = []
-        for box in res.boxes:
-            x1, y1, x2, y2 = box.xyxy[0].tolist()
-            x = max(0, int(round(x1)))
-            y = max(0, int(round(y1)))
-            w = max(1, int(round(x2 - x1)))
-            h = max(1, int(round(y2 - y1)))
-            rois.append((x, y, w, h))
+    # ---------- caché ----------
+    def image_key(self, path: str) -> Optional[str]:
+        """Hash del contenido de la imagen para la caché (None sin caché o si no se puede leer)."""
+        if self.cache is None:
+            return None
+        try:
+            return self.cache.image_key(path)
+        except OSError:
+            return None
+
+    def _weights_key(self) -> str:
+        if self._weights_hash is None:
+            self._weights_hash = self.cache.image_key(self.weights_path)
+            self.cache.bind_weights(self.weights_path, self._weights_hash)
+        return self._weights_hash
+
+    def _cached(self, key: Optional[str], conf: float) -> Optional[List[Roi]]:
+        if key is None:
+            return None
+        return self.cache.get(key, self._weights_key(), conf)
+
+    def _remember(self, rows: List[Tuple[Optional[str], List[Roi]]], conf: float) -> None:
+        rows = [(k, rois) for k, rois in rows if k is not None]
+        if rows:
+            self.cache.put_many(rows, self._weights_key(), conf)
+
+    # ---------- detección ----------
+    def detect(self, img_path: str, conf: float = 0.25) -> List[Roi]:
+        key = self.image_key(img_path)
+        hit = self._cached(key, conf)
+        if hit is not None:
+            return hit
+        if self.is_onnx:
+            img = _decode_bgr(img_path)
+            if img is None:
+                raise OSError(f"No se pudo abrir la imagen: {img_path}")
+            rois = self._predict([img], conf)[0]
+        else:
+            model = self._lazy_model()
+            with span("yolo.detect"):
+                res = model.predict(source=img_path, conf=conf, verbose=False)[0]
+            rois = _rois_from_result(res)
+        self._remember([(key, rois)], conf)
         return rois
 
+    def iter_detect(
+        self,
+        paths: Iterable[str],
+        conf: float = 0.25,
+        batch_size: int = 8,
+        workers: Optional[int] = None,
+    ) -> Iterator[List[Tuple[str, Optional[List[Roi]]]]]:
+        """
+        Detecta en muchas imágenes, `batch_size` por llamada al modelo. Mientras
+        YOLO procesa un lote, un pool de hilos decodifica el siguiente.
+        Entrega por lote [(ruta, rois)], en el orden de entrada; rois es None
+        si la imagen no se pudo abrir.
+        Se decodifica con PIL sin rotar por EXIF, como CropView y save_crops:
+        las coordenadas valen tal cual para recortar. Las imágenes que ya están
+        en la caché no se decodifican ni pasan por el modelo.
+        """
+        paths = list(paths)
+        size = max(1, int(batch_size))
+        chunks = [paths[i:i + size] for i in range(0, len(paths), size)]
+        if not chunks:
+            return
+
+        n_workers = max(1, min(size, workers or os.cpu_count() or 1))
+        with ThreadPoolExecutor(max_workers=n_workers, thread_name_prefix="yolo-decode") as pool:
+            pending = [pool.submit(self._load, p, conf) for p in chunks[0]]
+            for k, chunk in enumerate(chunks):
+                with span("decode"):
+                    loaded = [f.result() for f in pending]
+                pending = [pool.submit(self._load, p, conf) for p in chunks[k + 1]] if k + 1 < len(chunks) else []
+
+                miss = [i for i, (_, hit, im) in enumerate(loaded) if hit is None and im is not None]
+                found = self._predict([loaded[i][2] for i in miss], conf)
+                self._remember([(loaded[i][0], rois) for i, rois in zip(miss, found)], conf)
+                out = [hit for _, hit, _ in loaded]
+                for i, rois in zip(miss, found):
+                    out[i] = rois
+                yield list(zip(chunk, out))
+
+    def _load(self, path: str, conf: float) -> Tuple[Optional[str], Optional[List[Roi]], Optional[np.ndarray]]:
+        """(clave, rois de la caché, imagen BGR): la imagen sólo se decodifica si no hubo acierto."""
+        key = self.image_key(path)
+        hit = self._cached(key, conf)
+        return key, hit, (_decode_bgr(path) if hit is None else None)
+
+    def detect_arrays(
+        self,
+        images: Sequence[np.ndarray],
+        conf: float = 0.25,
+        keys: Optional[Sequence[Optional[str]]] = None,
+        scales: Optional[Sequence[Tuple[float, float]]] = None,
+    ) -> List[List[Roi]]:
+        """
+        Detecta en imágenes ya decodificadas (HxWx3, BGR), todas en una llamada
+        al modelo. Con `keys` (image_key de cada una) se usa la caché. Si una
+        imagen es una versión reducida del archivo (draft), `scales` da por
+        imagen (ancho, alto) original / decodificado y los ROIs salen en
+        píxeles del original.
+        """
+        keys = list(keys) if keys is not None else [None] * len(images)
+        out = [self._cached(k, conf) for k in keys]
+        miss = [i for i, rois in enumerate(out) if rois is None]
+        found = self._predict([images[i] for i in miss], conf,
+                              [scales[i] for i in miss] if scales is not None else None)
+        self._remember([(keys[i], rois) for i, rois in zip(miss, found)], conf)
+        for i, rois in zip(miss, found):
+            out[i] = rois
+        return out
+
+    def _predict(self, images: Sequence[np.ndarray], conf: float,
+                 scales: Optional[Sequence[Tuple[float, float]]] = None) -> List[List[Roi]]:
+        if not images:
+            return []
+        model = self._lazy_model()
+        with span("yolo.detect"):
+            if self.is_onnx:
+                found = [boxes.tolist() for boxes in model.detect(images, conf)]
+            else:
+                results = model.predict(source=[np.ascontiguousarray(im) for im in images], conf=conf, verbose=False)
+                found = [[box.xyxy[0].tolist() for box in r.boxes] for r in results]
+        if scales is None:
+            return [[_roi_from_xyxy(*b) for b in boxes] for boxes in found]
+        # se escala antes de redondear: el error no crece con el factor del draft
+        return [[_roi_from_xyxy(x1 * sx, y1 * sy, x2 * sx, y2 * sy) for x1, y1, x2, y2 in boxes]
+                for boxes, (sx, sy) in zip(found, scales)]
+
+    def detect_many(self, paths: Iterable[str], conf: float = 0.25,
+                    batch_size: int = 8) -> List[Tuple[str, Optional[List[Roi]]]]:
+        """Igual que iter_detect, pero devuelve todo junto."""
+        return [item for chunk in self.iter_detect(paths, conf, batch_size) for item in chunk]
+
+
+def _decode_bgr(path: str) -> Optional[np.ndarray]:
+    """Imagen HxWx3 en BGR (lo que espera ultralytics para arrays), o None si falla."""
+    try:
+        with Image.open(path) as im:
+            rgb = np.asarray(im.convert("RGB"))
+    except (OSError, ValueError):
+        return None
+    return np.ascontiguousarray(rgb[:, :, ::-1])
 
-def default_eyes_detector() -> EyesDetector:
+
+def _roi_from_xyxy(x1: float, y1: float, x2: float, y2: float) -> Roi:
+    x = max(0, int(round(x1)))
+    y = max(0, int(round(y1)))
+    w = max(1, int(round(x2 - x1)))
+    h = max(1, int(round(y2 - y1)))
+    return (x, y, w, h)
+
+
+def _rois_from_result(res) -> List[Roi]:
+    return [_roi_from_xyxy(*box.xyxy[0].tolist()) for box in res.boxes]
+
+
+def default_eyes_detector(cfg: Optional["AppConfig"] = None) -> EyesDetector:
     """
     Crea el detector usando el archivo eyes_yolov8n_best.pt
     ubicado en alguna de las rutas soportadas por _resolve_weights_path().
+    Con `cfg`, usa la caché de detecciones compartida (si cfg.detection_cache).
     """
     weights = _resolve_weights_path()
-    return EyesDetector(weights)
\ No newline at end of file
+    return EyesDetector(weights, open_detection_cache(cfg) if cfg is not None else None)
+
+
+def export_detector_onnx(weights_path: str | Path, out_path: Optional[str | Path] = None,
+                         imgsz: int = 640, dynamic: bool = True) -> Path:
+    """
+    Exporta el .pt a ONNX con ultralytics (necesita torch sólo aquí, una vez).
+    Con dynamic=True el lote es variable y iter_detect manda varias imágenes
+    por llamada. Devuelve la ruta del .onnx.
+    """
+    model = _import_yolo()(str(weights_path))
+    out = Path(model.export(format="onnx", imgsz=imgsz, dynamic=dynamic, verbose=False))
+    if out_path is not None and Path(out_path).resolve() != out.resolve():
+        Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+        out = Path(out.replace(out_path))
+    return out
\ No newline at end of file
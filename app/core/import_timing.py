@@ -0,0 +1,132 @@
+"""
+import_timing.py — Desglose de tiempos de importación al arrancar (estilo
+`python -X importtime`, pero disponible también en el .exe congelado).
+
+Uso (lo hace app/main.py con --import-times o IRFL_IMPORT_TIMES=1):
+    import_timing.install()      # antes de los imports pesados
+    ...
+    import_timing.mark("ventana visible")
+    print(import_timing.report())
+
+Sólo usa la biblioteca estándar: tiene que poder importarse antes que nada.
+"""
+
+from __future__ import annotations
+import sys
+import threading
+import time
+from typing import List, Optional, Tuple
+
+_T0 = time.perf_counter()
+
+
+class _TimingFinder:
+    """
+    Finder en sys.meta_path que delega en los demás y envuelve exec_module del
+    loader encontrado para medir cuánto tarda en ejecutarse cada módulo.
+    """
+
+    def __init__(self):
+        self._tls = threading.local()
+        self._lock = threading.Lock()
+        self.records: List[Tuple[str, float, float]] = []  # (módulo, propio s, acumulado s)
+
+    def find_spec(self, name, path=None, target=None):
+        if getattr(self._tls, "finding", False):
+            return None
+        self._tls.finding = True
+        try:
+            spec = None
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(name, path, target)
+                if spec is not None:
+                    break
+        finally:
+            self._tls.finding = False
+        if spec is None:
+            return None
+        loader = spec.loader
+        # los importadores de clase (builtins, frozen) se comparten: no se tocan
+        if loader is not None and not isinstance(loader, type) and hasattr(loader, "exec_module"):
+            self._wrap(loader, name)
+        return spec
+
+    def _wrap(self, loader, name: str) -> None:
+        orig = loader.exec_module
+        tls = self._tls
+
+        def exec_module(module):
+            stack = tls.__dict__.setdefault("stack", [])
+            stack.append(0.0)
+            t0 = time.perf_counter()
+            try:
+                orig(module)
+            finally:
+                total = time.perf_counter() - t0
+                children = stack.pop()
+                if stack:
+                    stack[-1] += total
+                with self._lock:
+                    self.records.append((name, total - children, total))
+
+        try:
+            loader.exec_module = exec_module
+        except (AttributeError, TypeError):  # loaders con __slots__ u objetos de C
+            pass
+
+
+_finder: Optional[_TimingFinder] = None
+_marks: List[Tuple[str, float]] = []
+
+
+def install() -> None:
+    """Empieza a medir las importaciones siguientes (idempotente)."""
+    global _finder
+    if _finder is None:
+        _finder = _TimingFinder()
+        sys.meta_path.insert(0, _finder)
+
+
+def uninstall() -> None:
+    global _finder
+    if _finder is not None and _finder in sys.meta_path:
+        sys.meta_path.remove(_finder)
+    _finder = None
+
+
+def enabled() -> bool:
+    return _finder is not None
+
+
+def mark(label: str) -> None:
+    """Hito de arranque (segundos desde que se importó este módulo)."""
+    _marks.append((label, time.perf_counter() - _T0))
+
+
+def report(top: int = 25) -> str:
+    """Hitos + los `top` módulos más lentos (acumulado) y la suma por paquete raíz."""
+    lines = ["== Arranque =="]
+    for label, t in _marks:
+        lines.append(f"{t * 1000:10.0f} ms  {label}")
+    if _finder is None:
+        return "\n".join(lines)
+
+    with _finder._lock:
+        records = list(_finder.records)
+
+    per_pkg: dict = {}
+    for name, self_s, _ in records:
+        root = name.split(".")[0]
+        per_pkg[root] = per_pkg.get(root, 0.0) + self_s
+
+    lines.append(f"== Paquetes (tiempo propio, {len(records)} módulos) ==")
+    for root, s in sorted(per_pkg.items(), key=lambda kv: -kv[1])[:top]:
+        lines.append(f"{s * 1000:10.0f} ms  {root}")
+
+    lines.append("== Módulos ==")
+    lines.append(f"{'propio ms':>10} {'acum. ms':>10}  módulo")
+    for name, self_s, cum_s in sorted(records, key=lambda r: -r[2])[:top]:
+        lines.append(f"{self_s * 1000:10.1f} {cum_s * 1000:10.1f}  {name}")
+    return "\n".join(lines)
@@ -0,0 +1,129 @@
+"""
+model_cache.py — Caché LRU de modelos cargados, acotada por número de modelos
+y/o por bytes estimados (parámetros × tamaño del dtype).
+
+Al desalojar un modelo se suelta la referencia y se recolecta. No se llama a
+tf.keras.backend.clear_session(): el desalojo ocurre en hilos del pool, con
+otros modelos cargados y quizá una inferencia en curso, y clear_session
+reinicia el grafo global de Keras para todos.
+"""
+
+from __future__ import annotations
+import gc
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .model_loader import LoadedModel
+
+
+@dataclass
+class ModelCacheStats:
+    models: int = 0
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    resident_bytes: int = 0
+
+
+def estimate_model_bytes(lm: LoadedModel) -> int:
+    """Pesos del modelo Keras (parámetros × dtype); para TFLite/ONNX, tamaño del archivo."""
+    if lm.model is not None:
+        total = 0
+        for w in lm.model.weights:
+            n = 1
+            for d in w.shape:
+                n *= int(d or 1)
+            total += n * int(w.dtype.size)
+        return total
+    try:
+        return Path(lm.path).stat().st_size
+    except OSError:
+        return 0
+
+
+def _reclaim() -> None:
+    """Tras soltar las referencias: recolecta (ciclos de Keras incluidos)."""
+    gc.collect()
+
+
+class ModelCache:
+    """
+    LRU thread-safe por clave (ruta absoluta del modelo).
+    max_models / max_bytes en None o 0 = sin límite. El modelo recién insertado
+    nunca se desaloja, aunque por sí solo exceda el presupuesto.
+    """
+
+    def __init__(self, max_models: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.max_models = int(max_models) if max_models else None
+        self.max_bytes = int(max_bytes) if max_bytes else None
+        self._items: "OrderedDict[str, Tuple[LoadedModel, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = ModelCacheStats()
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._items
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    def get(self, key: str) -> Optional[LoadedModel]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self._stats.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self._stats.hits += 1
+            return item[0]
+
+    def fits(self, nbytes: int) -> bool:
+        """¿Cabe un modelo más de `nbytes` sin desalojar nada?"""
+        with self._lock:
+            if self.max_models is not None and len(self._items) >= self.max_models:
+                return False
+            return self.max_bytes is None or self._stats.resident_bytes + nbytes <= self.max_bytes
+
+    def put(self, key: str, lm: LoadedModel) -> List[str]:
+        """Inserta (o refresca) `key` y devuelve las claves desalojadas."""
+        nbytes = estimate_model_bytes(lm)
+        evicted: List[Tuple[str, LoadedModel]] = []
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._stats.resident_bytes -= old[1]
+            self._items[key] = (lm, nbytes)
+            self._stats.resident_bytes += nbytes
+            while len(self._items) > 1 and self._over_budget():
+                evicted.append(self._pop_lru())
+        keys = [k for k, _ in evicted]
+        del evicted
+        if keys:
+            _reclaim()
+        return keys
+
+    def _pop_lru(self) -> Tuple[str, LoadedModel]:
+        k, (lm, nbytes) = self._items.popitem(last=False)
+        self._stats.resident_bytes -= nbytes
+        self._stats.evictions += 1
+        return k, lm
+
+    def _over_budget(self) -> bool:
+        if self.max_models is not None and len(self._items) > self.max_models:
+            return True
+        return self.max_bytes is not None and self._stats.resident_bytes > self.max_bytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._stats.resident_bytes = 0
+        _reclaim()
+
+    def stats(self) -> ModelCacheStats:
+        with self._lock:
+            s = self._stats
+            return ModelCacheStats(len(self._items), s.hits, s.misses, s.evictions, s.resident_bytes)
@@ -1,26 +1,40 @@
 """
-model_loader.py — Carga robusta de modelos Keras y clases.
-Valida coherencia entre el .keras y el archivo classes.json.
+model_loader.py — Carga robusta de modelos (Keras, TFLite u ONNX) y clases.
+Valida coherencia entre el modelo y el archivo classes.json.
 """
 
 from __future__ import annotations
 import json
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import TYPE_CHECKING, List, Dict, Any, Callable, Optional, Tuple
 
-import tensorflow as tf
-from tensorflow.keras.models import load_model
+import numpy as np
+
+from .calibrator import load_temperature
+from .config import AppConfig
+from .registry import ModelEntry
+from .utils import file_sha1
+
+if TYPE_CHECKING:  # TensorFlow sólo se importa al cargar un modelo Keras
+    import tensorflow as tf
+
+InferFn = Callable[[np.ndarray], np.ndarray]  # lote float32 [N,S,S,3] -> salidas [N,C]
 
 
 @dataclass(frozen=True)
 class LoadedModel:
-    model: tf.keras.Model
+    model: Optional["tf.keras.Model"]  # None en backends no-Keras (usar infer)
     classes: List[str]           # p.ej. ["-5","-4","-3","-2"]
     class_to_idx: Dict[str, int] # {"-5":0,...}
     idx_to_class: Dict[int, str] # {0:"-5",...}
-    path: str                    # ruta del .keras
+    path: str                    # ruta del .keras (o .tflite / .onnx)
     classes_path: str            # ruta del classes.json
+    model_hash: str = ""         # sha1 corto del archivo ("" = desconocido, sin caché)
+    infer: Optional[InferFn] = None  # inferencia compilada (None = llamada eager a model)
+    static_batch: bool = False       # infer compila por tamaño de lote (XLA): rellenar lotes cortos
+    output_kind: str = "logits"      # lo que devuelven model/infer: "logits" (el predictor aplica softmax) | "probs"
+    temperature: float = 1.0         # temperature scaling (<modelo>.calibration.json); 1.0 = sin calibrar
 
 
 def _load_classes_json(path: Path) -> List[str]:
@@ -43,7 +57,96 @@ def _load_classes_json(path: Path) -> List[str]:
     raise ValueError("classes.json inválido: se esperaba 'classes' o 'class_to_idx'")
 
 
-def load_keras_model(model_path: str, classes_json_path: str) -> LoadedModel:
+def _softmax_head(model: "tf.keras.Model") -> Optional[str]:
+    """
+    ¿Termina el modelo en softmax? "activation" si la última capa la lleva como
+    activation=..., "layer" si es una capa Softmax/Activation aparte, None si no.
+    """
+    import tensorflow as tf
+
+    last = model.layers[-1] if model.layers else None
+    if last is None:
+        return None
+    if isinstance(last, tf.keras.layers.Softmax):
+        return "layer"
+    act = getattr(last, "activation", None)
+    if getattr(act, "__name__", "") == "softmax":
+        return "layer" if isinstance(last, tf.keras.layers.Activation) else "activation"
+    return None
+
+
+def _strip_softmax(model: "tf.keras.Model", head: str) -> "tf.keras.Model":
+    """Devuelve el modelo con salida en logits (sin la softmax final)."""
+    import tensorflow as tf
+
+    if head == "activation":
+        # Keras vuelve a ejecutar call() de cada capa: basta con cambiar la activación
+        model.layers[-1].activation = tf.keras.activations.linear
+        return model
+    return tf.keras.Model(model.inputs, model.layers[-1].input, name=f"{model.name}_logits")
+
+
+def _resolve_output(model: "tf.keras.Model", declared: str, strip_softmax: bool) -> Tuple["tf.keras.Model", str]:
+    """(modelo, output_kind) según lo declarado en registry.yaml y lo detectado."""
+    if declared == "logits":
+        return model, "logits"
+    head = _softmax_head(model)
+    if head and strip_softmax:
+        return _strip_softmax(model, head), "logits"
+    if head or declared == "probs":
+        return model, "probs"
+    return model, "logits"
+
+
+def keras_output_kind(keras_path: str, declared: str = "auto") -> str:
+    """
+    "probs" o "logits": lo que devuelve el .keras tal cual (con su softmax, si
+    la tiene). Es lo que hay que declarar como `output` al registrar un
+    artefacto convertido (tflite/onnx), donde "auto" se toma como probs.
+    """
+    if declared != "auto":
+        return declared
+    from tensorflow.keras.models import load_model
+
+    return _resolve_output(load_model(keras_path, compile=False), declared, strip_softmax=False)[1]
+
+
+def compile_inference(model: "tf.keras.Model", image_size: int, jit_compile: bool = False) -> InferFn:
+    """
+    Envuelve el modelo en un tf.function con firma fija [None,S,S,3] (se traza
+    una sola vez) y, opcionalmente, compilado con XLA. Con XLA cada tamaño de
+    lote concreto compila aparte, por eso el predictor rellena el último lote.
+    """
+    import tensorflow as tf
+
+    spec = tf.TensorSpec([None, image_size, image_size, 3], tf.float32)
+
+    @tf.function(input_signature=[spec], jit_compile=bool(jit_compile))
+    def _infer(x):
+        return model(x, training=False)
+
+    def run(batch: np.ndarray) -> np.ndarray:
+        return _infer(tf.convert_to_tensor(batch, dtype=tf.float32)).numpy()
+
+    return run
+
+
+def load_keras_model(
+    model_path: str,
+    classes_json_path: str,
+    image_size: Optional[int] = None,
+    jit_compile: bool = False,
+    output: str = "auto",
+    strip_softmax: bool = False,
+) -> LoadedModel:
+    """
+    Carga el .keras y sus clases. Si se pasa image_size, agrega además la
+    función de inferencia compilada (LoadedModel.infer).
+    `output` ("auto" | "probs" | "logits") dice qué devuelve el modelo; con
+    strip_softmax, una softmax final se quita y el modelo expone logits.
+    """
+    from tensorflow.keras.models import load_model
+
     mp = Path(model_path).resolve()
     cp = Path(classes_json_path).resolve()
 
@@ -61,6 +164,8 @@ def load_keras_model(model_path: str, classes_json_path: str) -> LoadedModel:
             f"Incompatibilidad modelo↔clases: salidas={num_outputs} vs clases={len(classes)}"
         )
 
+    model, output_kind = _resolve_output(model, output, strip_softmax)
+
     class_to_idx = {c: i for i, c in enumerate(classes)}
     idx_to_class = {i: c for c, i in class_to_idx.items()}
 
@@ -71,4 +176,65 @@ def load_keras_model(model_path: str, classes_json_path: str) -> LoadedModel:
         idx_to_class=idx_to_class,
         path=str(mp),
         classes_path=str(cp),
-    )
\ No newline at end of file
+        model_hash=file_sha1(str(mp)),
+        infer=compile_inference(model, image_size, jit_compile) if image_size else None,
+        static_batch=bool(image_size and jit_compile),
+        output_kind=output_kind,
+    )
+
+
+def load_runtime_model(model_path: str, classes_json_path: str, backend: str,
+                       num_threads: Optional[int] = None, output: str = "auto") -> LoadedModel:
+    """
+    Carga un artefacto .tflite / .onnx; la inferencia va por LoadedModel.infer.
+    Sin `output` declarado se asume "probs" (se convierten desde .keras con softmax).
+    """
+    from .backends import TFLiteRunner, OnnxRunner
+
+    mp = Path(model_path).resolve()
+    cp = Path(classes_json_path).resolve()
+    if not mp.is_file():
+        raise FileNotFoundError(f"Modelo {backend} no encontrado: {mp}")
+
+    classes = _load_classes_json(cp)
+    runner = TFLiteRunner(str(mp), num_threads) if backend == "tflite" else OnnxRunner(str(mp), num_threads)
+    if runner.num_outputs != len(classes):
+        raise ValueError(
+            f"Incompatibilidad modelo↔clases: salidas={runner.num_outputs} vs clases={len(classes)}"
+        )
+
+    class_to_idx = {c: i for i, c in enumerate(classes)}
+    return LoadedModel(
+        model=None,
+        classes=classes,
+        class_to_idx=class_to_idx,
+        idx_to_class={i: c for c, i in class_to_idx.items()},
+        path=str(mp),
+        classes_path=str(cp),
+        model_hash=file_sha1(str(mp)),
+        infer=runner,
+        # TFLite reasigna tensores al cambiar de lote: mejor rellenar el último
+        static_batch=(backend == "tflite"),
+        output_kind="logits" if output == "logits" else "probs",
+    )
+
+
+def load_entry(entry: ModelEntry, cfg: AppConfig) -> LoadedModel:
+    """
+    Carga un modelo del registry (según su backend) con las opciones de cfg, y
+    su temperatura calibrada si existe (y cfg.apply_calibration).
+    """
+    if entry.backend in ("tflite", "onnx"):
+        lm = load_runtime_model(entry.path, entry.classes_path, entry.backend, cfg.tf_num_threads,
+                                output=entry.output)
+    else:
+        lm = load_keras_model(
+            entry.path,
+            entry.classes_path,
+            image_size=cfg.image_size if cfg.tf_compile_inference else None,
+            jit_compile=cfg.tf_jit_compile,
+            output=entry.output,
+            strip_softmax=cfg.strip_softmax,
+        )
+    t = load_temperature(lm.path, lm.model_hash) if cfg.apply_calibration else None
+    return replace(lm, temperature=t) if t else lm
\ No newline at end of file
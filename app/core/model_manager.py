@@ -1,39 +1,100 @@
 # app/core/model_manager.py
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Dict, Optional, Callable
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set
 from pathlib import Path
 
-from PySide6.QtCore import QObject, Signal, QRunnable, Slot, QThreadPool
+from PySide6.QtCore import QObject, Signal, QRunnable, Slot, QThread, QThreadPool
 
 from .registry import ModelEntry
 from . import model_loader
-from core.config import load_app_config
-
-
-@dataclass
-class CachedModel:
-    loaded: model_loader.LoadedModel
+from .model_cache import ModelCache, ModelCacheStats, estimate_model_bytes
+from .predictor import inference_activity
+from .profiling import span
+from core.config import load_app_config, AppConfig
 
 
 class _LoadTask(QRunnable):
     def __init__(self, entry: ModelEntry, on_ok: Callable[[model_loader.LoadedModel], None],
-                 on_err: Callable[[str], None], do_warmup: bool, warmup_size: int):
+                 on_err: Callable[[str], None], cfg: AppConfig):
         super().__init__()
         self.entry = entry
         self.on_ok = on_ok
         self.on_err = on_err
-        self.do_warmup = do_warmup
-        self.warmup_size = warmup_size
+        self.cfg = cfg
 
     @Slot()
     def run(self):
         try:
-            lm = model_loader.load_keras_model(self.entry.path, self.entry.classes_path)
-            if self.do_warmup:
-                import tensorflow as tf
-                dummy = tf.zeros((1, self.warmup_size, self.warmup_size, 3), dtype=tf.float32)
+            lm = self._load()
+            if self.cfg.tf_warmup_on_start:
+                self._warmup(lm)
+            self.on_ok(lm)
+        except Exception as e:
+            self.on_err(str(e))
+
+    def _load(self) -> model_loader.LoadedModel:
+        with span("model.load"):
+            return model_loader.load_entry(self.entry, self.cfg)
+
+    def _warmup(self, lm: model_loader.LoadedModel) -> None:
+        # traza (y con XLA compila, al tamaño de lote del predictor) una vez aquí
+        import numpy as np
+        size = int(self.cfg.image_size)
+        n = max(1, int(self.cfg.batch_size)) if lm.static_batch else 1
+        dummy = np.zeros((n, size, size, 3), dtype=np.float32)
+        with span("model.warmup"):
+            if lm.infer is not None:
+                _ = lm.infer(dummy)
+            else:
                 _ = lm.model(dummy, training=False)
+
+
+class _EngineTask(QRunnable):
+    """Importa TensorFlow e inicializa la sesión (hilos, memory growth) fuera del hilo de UI."""
+
+    def __init__(self, cfg: AppConfig, on_done: Callable[[str], None]):
+        super().__init__()
+        self.cfg = cfg
+        self.on_done = on_done
+
+    @Slot()
+    def run(self):
+        try:
+            from .tf_session import init_tf_session
+            init_tf_session(self.cfg)
+            self.on_done("")
+        except Exception as e:
+            self.on_done(str(e))
+
+
+class _PrefetchTask(_LoadTask):
+    """
+    Carga de fondo: espera a que no haya predicciones en curso y pregunta a
+    `on_start` si todavía hace falta (cancelada, tomada en primer plano o sin
+    presupuesto en la caché) antes de cargar. Si al terminar la carga hay una
+    predicción en curso, se omite el warmup: la primera inferencia real traza
+    el modelo, y mientras tanto no se compite por CPU con el usuario.
+    """
+
+    def __init__(self, entry: ModelEntry, on_start: Callable[[], bool],
+                 on_ok: Callable[[model_loader.LoadedModel], None],
+                 on_err: Callable[[str], None], cfg: AppConfig, cancel: threading.Event):
+        super().__init__(entry, on_ok, on_err, cfg)
+        self.on_start = on_start
+        self.cancel = cancel
+
+    @Slot()
+    def run(self):
+        while not inference_activity.wait_idle(0.25):
+            if self.cancel.is_set():
+                break
+        if not self.on_start():
+            return
+        try:
+            lm = self._load()
+            if self.cfg.tf_warmup_on_start and not inference_activity.busy and not self.cancel.is_set():
+                self._warmup(lm)
             self.on_ok(lm)
         except Exception as e:
             self.on_err(str(e))
@@ -43,21 +104,57 @@ class ModelManager(QObject):
     # mantenemos la señal con model_key para no romper MainWindow
     sig_loaded = Signal(str, object)   # model_key, LoadedModel
     sig_error  = Signal(str, str)      # model_key, error
+    sig_engine_ready = Signal(str)     # "" = ok; si no, mensaje de error
 
     def __init__(self):
         super().__init__()
-        # cache por ruta absoluta del .keras
-        self._cache: Dict[str, CachedModel] = {}
         self._pool = QThreadPool.globalInstance()
         self._cfg = load_app_config()
+        # precarga: un solo hilo de baja prioridad, separado del pool principal
+        self._prefetch_pool = QThreadPool(self)
+        self._prefetch_pool.setMaxThreadCount(1)
+        self._prefetch_pool.setThreadPriority(QThread.Priority.LowPriority)
+        self._prefetch_cancel = threading.Event()
+        # cargas en curso: clave -> model_keys que esperan el resultado (vacía = sólo precarga)
+        self._lock = threading.Lock()
+        self._pending: Dict[str, List[str]] = {}
+        self._queued: Set[str] = set()   # precargas aún no iniciadas
+        # motor (TensorFlow): hasta que esté listo, sólo se recuerda la última carga pedida
+        self._engine_ready = False
+        self._deferred: Optional[tuple] = None  # (model_key, entry)
+        # LRU por ruta absoluta del modelo, acotada por número y/o MB estimados
+        self._cache = ModelCache(
+            max_models=self._cfg.model_cache_max_models,
+            max_bytes=self._cfg.model_cache_max_mb * 2**20,
+        )
+
+    # ---------- motor ----------
+
+    @property
+    def engine_ready(self) -> bool:
+        return self._engine_ready
+
+    def start_engine(self) -> None:
+        """Inicializa TensorFlow en segundo plano; las cargas esperan a que termine."""
+        self._pool.start(_EngineTask(self._cfg, self._on_engine_done))
+
+    def _on_engine_done(self, err: str) -> None:
+        with self._lock:
+            self._engine_ready = True
+            deferred, self._deferred = self._deferred, None
+        self.sig_engine_ready.emit(err)
+        if deferred is not None:
+            self.load_async(*deferred)
 
     def _cache_key_for(self, entry: ModelEntry) -> str:
         return str(Path(entry.path).resolve())
 
     def get_cached(self, entry: ModelEntry) -> Optional[model_loader.LoadedModel]:
-        key = self._cache_key_for(entry)
-        c = self._cache.get(key)
-        return c.loaded if c else None
+        return self._cache.get(self._cache_key_for(entry))
+
+    def cache_stats(self) -> ModelCacheStats:
+        """Aciertos, desalojos y bytes residentes (diagnóstico)."""
+        return self._cache.stats()
 
     def load_async(self, model_key: str, entry: ModelEntry):
         # usa caché por ruta: si la ruta es la misma, reutiliza; si es distinta, recarga
@@ -66,19 +163,100 @@ class ModelManager(QObject):
             self.sig_loaded.emit(model_key, cached)
             return
 
-        def _ok(lm: model_loader.LoadedModel):
-            key = self._cache_key_for(entry)
-            self._cache[key] = CachedModel(loaded=lm)
-            self.sig_loaded.emit(model_key, lm)
-
-        def _err(msg: str):
-            self.sig_error.emit(model_key, msg)
+        key = self._cache_key_for(entry)
+        with self._lock:
+            if not self._engine_ready:
+                self._deferred = (model_key, entry)
+                return
+            if key in self._pending and key not in self._queued:
+                # ya se está cargando (p.ej. en la precarga): esperamos ese resultado
+                self._pending[key].append(model_key)
+                return
+            self._queued.discard(key)  # una precarga en cola cede el paso
+            self._pending[key] = [model_key]
 
         task = _LoadTask(
             entry=entry,
-            on_ok=_ok,
-            on_err=_err,
-            do_warmup=bool(self._cfg.tf_warmup_on_start),
-            warmup_size=int(self._cfg.image_size),
+            on_ok=lambda lm: self._finish(key, lm),
+            on_err=lambda msg: self._fail(key, msg),
+            cfg=self._cfg,
         )
-        self._pool.start(task)
\ No newline at end of file
+        self._pool.start(task)
+
+    # ---------- precarga ----------
+
+    def prefetch(self, entries: Iterable[ModelEntry]) -> int:
+        """
+        Precarga en segundo plano los modelos que aún no están en caché, uno a
+        uno y sólo mientras no haya predicciones en curso. Nunca desaloja: si un
+        modelo no cabe en el presupuesto de la caché, se omite. Reemplaza (cancela)
+        cualquier precarga anterior. Devuelve cuántas cargas se encolaron.
+        """
+        self.cancel_prefetch()
+        if not self._engine_ready:
+            return 0
+        cancel = self._prefetch_cancel = threading.Event()
+        n = 0
+        for entry in entries:
+            key = self._cache_key_for(entry)
+            if key in self._cache:
+                continue
+            with self._lock:
+                if key in self._pending:
+                    continue
+                self._pending[key] = []
+                self._queued.add(key)
+            task = _PrefetchTask(
+                entry=entry,
+                on_start=lambda key=key, entry=entry: self._claim_prefetch(key, entry, cancel),
+                on_ok=lambda lm, key=key: self._finish(key, lm, cancel),
+                on_err=lambda msg, key=key: self._fail(key, msg),
+                cfg=self._cfg,
+                cancel=cancel,
+            )
+            self._prefetch_pool.start(task)
+            n += 1
+        return n
+
+    def cancel_prefetch(self) -> None:
+        """Descarta las precargas pendientes; una ya iniciada termina pero no se guarda."""
+        self._prefetch_cancel.set()
+        self._prefetch_pool.clear()
+        with self._lock:
+            for key in self._queued:
+                if not self._pending.get(key):
+                    self._pending.pop(key, None)
+            self._queued.clear()
+
+    def _claim_prefetch(self, key: str, entry: ModelEntry, cancel: threading.Event) -> bool:
+        with self._lock:
+            if key not in self._queued:
+                return False  # cancelada o tomada por una carga en primer plano
+            self._queued.discard(key)
+            try:
+                size = Path(entry.path).stat().st_size
+            except OSError:
+                size = 0
+            if cancel.is_set() or not self._cache.fits(size):
+                self._pending.pop(key, None)
+                return False
+            return True
+
+    # ---------- resultados ----------
+
+    def _finish(self, key: str, lm: model_loader.LoadedModel,
+                cancel: Optional[threading.Event] = None) -> None:
+        with self._lock:
+            waiters = self._pending.pop(key, [])
+        if waiters:
+            self._cache.put(key, lm)
+        elif not (cancel is not None and cancel.is_set()) and self._cache.fits(estimate_model_bytes(lm)):
+            self._cache.put(key, lm)
+        for model_key in waiters:
+            self.sig_loaded.emit(model_key, lm)
+
+    def _fail(self, key: str, msg: str) -> None:
+        with self._lock:
+            waiters = self._pending.pop(key, [])
+        for model_key in waiters:
+            self.sig_error.emit(model_key, msg)
\ No newline at end of file
@@ -0,0 +1,167 @@
+"""
+pipeline.py — Modo detectar → clasificar, sin el paso interactivo de CropView.
+
+Un hilo productor decodifica cada imagen una sola vez, pasa el lote por
+EyesDetector y recorta los ROIs en memoria; el hilo que consume los
+clasifica. Entre ambos hay una cola acotada: YOLO trabaja sobre el lote k+1
+mientras el clasificador procesa el k, y la memoria no crece si uno de los
+dos es más lento.
+
+Cada resultado lleva como `file` crops.crop_label(imagen, i, roi), así que la
+imagen de origen y las coordenadas del ROI quedan en los exports. Si el
+detector tiene caché, las imágenes ya vistas no pasan otra vez por YOLO.
+
+Con cfg.jpeg_draft_decode los JPEG se decodifican ya reducidos (escalado
+DCT) al tamaño de entrada del detector, que de todos modos los achica a ese
+tamaño; los recortes salen de esa misma imagen si alcanza la resolución, y
+si no se vuelve a leer el archivo como en crops.decode_crops.
+"""
+
+from __future__ import annotations
+import math
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from .config import AppConfig
+from .crops import crops_from_image
+from .eyes_detector import EyesDetector
+from .model_loader import LoadedModel
+from .predictor import PredictionBatch, inference_activity, predict_batch
+from .preprocessor import _resolve_workers
+
+_DONE = object()
+
+
+@dataclass
+class PipelineStats:
+    images: int = 0         # imágenes que ya pasaron por el detector
+    with_rois: int = 0
+    no_detections: int = 0
+    failed: int = 0         # no se pudieron abrir
+    crops: int = 0
+    no_detection_paths: List[str] = field(default_factory=list)  # en orden, para marcarlas procesadas
+
+
+def _decode_rgb(path: str, fit: Optional[Tuple[int, int]] = None) -> Optional[Tuple[Image.Image, Tuple[int, int]]]:
+    """
+    (imagen RGB, (ancho, alto) del original), o None si no se puede abrir. Con
+    fit=(alto, ancho) un JPEG se decodifica reducido, sin bajar de lo que
+    necesita un letterbox a ese tamaño.
+    """
+    try:
+        with Image.open(path) as im:
+            w0, h0 = im.size
+            if fit is not None:
+                gain = min(fit[0] / h0, fit[1] / w0)
+                if gain < 1.0:
+                    im.draft("RGB", (math.ceil(w0 * gain), math.ceil(h0 * gain)))
+            return im.convert("RGB"), (w0, h0)  # sin rotar por EXIF, como CropView y save_crops
+    except (OSError, ValueError):
+        return None
+
+
+def iter_pipeline_chunks(
+    lm: LoadedModel,
+    cfg: AppConfig,
+    detector: EyesDetector,
+    paths: Iterable[str],
+    batch_size: Optional[int] = None,
+    save_dir: Optional[str | Path] = None,
+    stats: Optional[PipelineStats] = None,
+    queue_size: int = 2,
+) -> Iterator[PredictionBatch]:
+    """
+    Detecta ojos en `paths` (en lotes de cfg.yolo_batch_size, con cfg.yolo_conf)
+    y entrega las clasificaciones de sus ROIs en lotes de `batch_size` (por
+    defecto cfg.batch_size). Las imágenes sin detecciones no producen filas;
+    se cuentan y se listan en `stats`. Con save_dir se guardan además los
+    recortes.
+    """
+    size = max(1, int(batch_size or cfg.batch_size))
+    det_size = max(1, int(cfg.yolo_batch_size))
+    stats = stats if stats is not None else PipelineStats()
+    paths = list(paths)
+    if save_dir is not None:
+        Path(save_dir).mkdir(parents=True, exist_ok=True)
+    fit = detector.input_size() if cfg.jpeg_draft_decode and paths else None
+
+    def _decode(path: str) -> Optional[Tuple[Image.Image, Tuple[int, int]]]:
+        return _decode_rgb(path, fit)
+
+    q: "queue.Queue" = queue.Queue(maxsize=max(1, int(queue_size)))
+    stop = threading.Event()
+
+    def _put(item) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce() -> None:
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, _resolve_workers(cfg.decode_workers)),
+                                    thread_name_prefix="pipeline-decode") as pool:
+                for k in range(0, len(paths), det_size):
+                    if stop.is_set():
+                        return
+                    chunk = paths[k:k + det_size]
+                    decoded = list(pool.map(_decode, chunk))
+                    ok = [(p, *d) for p, d in zip(chunk, decoded) if d is not None]
+                    keys = list(pool.map(detector.image_key, [p for p, _, _ in ok]))
+                    found = detector.detect_arrays(
+                        [np.asarray(im)[:, :, ::-1] for _, im, _ in ok], cfg.yolo_conf, keys,  # BGR
+                        [(w0 / im.width, h0 / im.height) for _, im, (w0, h0) in ok])
+
+                    labels: List[str] = []
+                    arrays: List[np.ndarray] = []
+                    for (p, im, full), rois in zip(ok, found):
+                        if not rois:
+                            stats.no_detections += 1
+                            stats.no_detection_paths.append(p)
+                            continue
+                        lab, arr = crops_from_image(im, p, rois, cfg.image_size, save_dir, full_size=full)
+                        labels.extend(lab)
+                        arrays.append(arr)
+                        stats.with_rois += 1
+                    stats.failed += len(chunk) - len(ok)
+                    if labels and not _put((labels, np.concatenate(arrays, axis=0))):
+                        return
+                    stats.crops += len(labels)
+                    stats.images += len(chunk)
+            _put(_DONE)
+        except BaseException as e:  # se re-lanza en el hilo que consume
+            _put(e)
+
+    producer = threading.Thread(target=_produce, name="pipeline-detect", daemon=True)
+    labels: List[str] = []
+    arrays: List[np.ndarray] = []
+    with inference_activity:
+        producer.start()
+        try:
+            while True:
+                item = q.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                lab, arr = item
+                labels.extend(lab)
+                arrays.extend(arr)
+                while len(labels) >= size:
+                    yield predict_batch(lm, cfg, labels[:size], np.stack(arrays[:size], axis=0), size)
+                    del labels[:size], arrays[:size]
+            if labels:
+                yield predict_batch(lm, cfg, labels, np.stack(arrays, axis=0), size)
+        finally:
+            stop.set()
+            producer.join()
@@ -0,0 +1,176 @@
+"""
+prediction_cache.py — Caché persistente de salidas del modelo por imagen.
+Clave: hash del contenido de la imagen + hash del modelo + firma del
+preprocesado. Se guarda la salida cruda del modelo (float32 [C]) y no las
+probabilidades finales, así que cambiar umbrales o la normalización no
+invalida nada.
+
+Si el archivo del modelo cambia (otro hash para la misma ruta), sus entradas
+viejas se borran en bind_model().
+"""
+
+from __future__ import annotations
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from .config import AppConfig
+from .utils import file_digest
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outputs (
+    image_hash TEXT NOT NULL,
+    model_hash TEXT NOT NULL,
+    prep       TEXT NOT NULL,
+    raw        BLOB NOT NULL,
+    PRIMARY KEY (image_hash, model_hash, prep)
+);
+CREATE INDEX IF NOT EXISTS outputs_model ON outputs(model_hash);
+CREATE TABLE IF NOT EXISTS models (
+    model_path TEXT PRIMARY KEY,
+    model_hash TEXT NOT NULL
+);
+"""
+
+# Memo de hashes de archivos, compartido con detection_cache
+FILES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path     TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size     INTEGER NOT NULL,
+    digest   TEXT NOT NULL
+);
+"""
+
+
+def memo_file_digest(con: sqlite3.Connection, lock: threading.Lock, path: str) -> str:
+    """
+    Hash del contenido de `path`, memorizado en la tabla files por
+    (ruta, mtime, tamaño) para no releer archivos que no cambiaron.
+    """
+    p = Path(path).resolve()
+    st = p.stat()
+    with lock:
+        row = con.execute(
+            "SELECT mtime_ns, size, digest FROM files WHERE path = ?", (str(p),)
+        ).fetchone()
+    if row and row[0] == st.st_mtime_ns and row[1] == st.st_size:
+        return row[2]
+
+    digest = file_digest(str(p))
+    with lock:
+        con.execute(
+            "INSERT OR REPLACE INTO files(path, mtime_ns, size, digest) VALUES (?,?,?,?)",
+            (str(p), st.st_mtime_ns, st.st_size, digest),
+        )
+        con.commit()
+    return digest
+
+
+class PredictionCache:
+    def __init__(self, db_path: str | Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.executescript(_SCHEMA + FILES_SCHEMA)
+        self._con.commit()
+
+    # ---------- claves ----------
+    def image_key(self, path: str) -> str:
+        """Hash del contenido de la imagen (ver memo_file_digest)."""
+        return memo_file_digest(self._con, self._lock, path)
+
+    # ---------- lectura / escritura ----------
+    def get(self, image_hash: str, model_hash: str, prep: str) -> Optional[np.ndarray]:
+        with self._lock:
+            row = self._con.execute(
+                "SELECT raw FROM outputs WHERE image_hash = ? AND model_hash = ? AND prep = ?",
+                (image_hash, model_hash, prep),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return np.frombuffer(row[0], dtype=np.float32)
+
+    def put_many(self, rows: Iterable[Tuple[str, np.ndarray]], model_hash: str, prep: str) -> None:
+        """Guarda (image_hash, salida cruda [C]) en una sola transacción."""
+        data = [
+            (h, model_hash, prep, np.asarray(raw, dtype=np.float32).tobytes())
+            for h, raw in rows
+        ]
+        if not data:
+            return
+        with self._lock:
+            self._con.executemany(
+                "INSERT OR REPLACE INTO outputs(image_hash, model_hash, prep, raw) VALUES (?,?,?,?)",
+                data,
+            )
+            self._con.commit()
+
+    # ---------- invalidación ----------
+    def bind_model(self, model_path: str, model_hash: str) -> int:
+        """
+        Registra el hash actual del modelo en `model_path`. Si antes había otro
+        hash para esa ruta, el archivo cambió: borra sus entradas y devuelve
+        cuántas eran.
+        """
+        key = str(Path(model_path).resolve())
+        with self._lock:
+            row = self._con.execute(
+                "SELECT model_hash FROM models WHERE model_path = ?", (key,)
+            ).fetchone()
+            removed = 0
+            if row and row[0] != model_hash:
+                removed = self._con.execute(
+                    "DELETE FROM outputs WHERE model_hash = ?", (row[0],)
+                ).rowcount
+            self._con.execute(
+                "INSERT OR REPLACE INTO models(model_path, model_hash) VALUES (?,?)",
+                (key, model_hash),
+            )
+            self._con.commit()
+        return removed
+
+    def invalidate_model(self, model_hash: str) -> int:
+        with self._lock:
+            n = self._con.execute("DELETE FROM outputs WHERE model_hash = ?", (model_hash,)).rowcount
+            self._con.commit()
+        return n
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            (entries,) = self._con.execute("SELECT COUNT(*) FROM outputs").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": int(entries)}
+
+    def close(self) -> None:
+        with self._lock:
+            self._con.close()
+
+
+_OPEN: Dict[str, PredictionCache] = {}
+_OPEN_LOCK = threading.Lock()
+
+
+def open_prediction_cache(cfg: AppConfig) -> Optional[PredictionCache]:
+    """
+    Devuelve la caché compartida (en <runs_dir>/cache/predictions.sqlite),
+    o None si cfg.prediction_cache está desactivada.
+    """
+    if not cfg.prediction_cache:
+        return None
+    path = str(Path(cfg.runs_dir).expanduser().resolve() / "cache" / "predictions.sqlite")
+    with _OPEN_LOCK:
+        cache = _OPEN.get(path)
+        if cache is None:
+            cache = PredictionCache(path)
+            _OPEN[path] = cache
+        return cache
@@ -5,14 +5,19 @@ Top-1/Top-2, y métricas auxiliares.
 """
 
 from __future__ import annotations
+import threading
+from collections import deque
 from dataclasses import dataclass
-from typing import List, Dict, Iterable
+from typing import List, Dict, Iterable, Iterator, Optional, Sequence, Tuple
 import numpy as np
-import tensorflow as tf
 
-from .preprocessor import batch_from_paths
+from .crops import CropSource, iter_crop_batches
+from .preprocessor import iter_batches, preprocess_signature
+from .tensor_cache import open_tensor_cache
+from .prediction_cache import open_prediction_cache
 from .model_loader import LoadedModel
 from .config import AppConfig
+from .profiling import span
 
 
 @dataclass(frozen=True)
@@ -27,20 +32,388 @@ class Prediction:
     gap_pp: float                 # diferencia top1-top2 en puntos porcentuales (0..1)
 
 
+class InferenceActivity:
+    """
+    Cuenta las predicciones en curso. Las tareas de fondo (precarga de modelos)
+    esperan con wait_idle() para no competir por CPU con el usuario.
+    """
+
+    def __init__(self):
+        self._n = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Event()
+        self._idle.set()
+
+    def __enter__(self) -> "InferenceActivity":
+        with self._lock:
+            self._n += 1
+            self._idle.clear()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        with self._lock:
+            self._n -= 1
+            if self._n == 0:
+                self._idle.set()
+
+    @property
+    def busy(self) -> bool:
+        return not self._idle.is_set()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        return self._idle.wait(timeout)
+
+
+inference_activity = InferenceActivity()
+
+
+CONFIDENCE_LABELS = ("high", "ambiguous", "low")  # códigos 0, 1, 2 de PredictionBatch.confidence
+
+
+class PredictionRow:
+    """
+    Vista de la fila i de un PredictionBatch, con la misma interfaz de lectura
+    que Prediction; no copia nada (full_probs se arma al pedirlo).
+    """
+    __slots__ = ("_b", "_i")
+
+    def __init__(self, batch: "PredictionBatch", i: int):
+        self._b = batch
+        self._i = i
+
+    @property
+    def file(self) -> str:
+        return self._b.files[self._i]
+
+    @property
+    def top1_class(self) -> str:
+        return self._b.classes[int(self._b.top1[self._i])]
+
+    @property
+    def top1_prob(self) -> float:
+        return float(self._b.top1_prob[self._i])
+
+    @property
+    def top2_class(self) -> str | None:
+        t2 = int(self._b.top2[self._i])
+        return self._b.classes[t2] if t2 >= 0 else None
+
+    @property
+    def top2_prob(self) -> float | None:
+        return float(self._b.top2_prob[self._i]) if self._b.top2[self._i] >= 0 else None
+
+    @property
+    def gap_pp(self) -> float:
+        return self.top1_prob - float(self._b.top2_prob[self._i])
+
+    @property
+    def confidence(self) -> str:
+        return CONFIDENCE_LABELS[int(self._b.confidence[self._i])]
+
+    @property
+    def probs(self) -> np.ndarray:
+        return self._b.probs[self._i]
+
+    @property
+    def full_probs(self) -> Dict[str, float]:
+        if not self._b.full_probs:
+            return {}
+        return dict(zip(self._b.classes, self._b.probs[self._i].tolist()))
+
+    def to_prediction(self) -> Prediction:
+        return Prediction(self.file, self.top1_class, self.top1_prob, self.top2_class, self.top2_prob,
+                          self.full_probs, self.confidence, self.gap_pp)
+
+
+@dataclass(frozen=True)
+class PredictionBatch:
+    """
+    Resultados de N imágenes en arrays (≈ 4·C + 13 bytes por imagen, más la
+    ruta): probabilidades [N,C] float32 y top-1/top-2/confianza calculados
+    para todo el lote de una vez. Indexar o iterar devuelve PredictionRow
+    (vistas con __slots__); Prediction se crea sólo con to_prediction().
+    """
+    files: List[str]           # ruta de cada fila
+    classes: Tuple[str, ...]
+    probs: np.ndarray          # [N,C] float32
+    top1: np.ndarray           # [N] int16, índice de clase
+    top1_prob: np.ndarray      # [N] float32
+    top2: np.ndarray           # [N] int16 (-1 si sólo hay una clase)
+    top2_prob: np.ndarray      # [N] float32 (0 si sólo hay una clase)
+    confidence: np.ndarray     # [N] uint8, índice en CONFIDENCE_LABELS
+    full_probs: bool = True    # exportar/mostrar el vector completo
+
+    @classmethod
+    def from_probs(cls, files: Sequence[str], probs: np.ndarray, classes: Sequence[str],
+                   cfg: AppConfig) -> "PredictionBatch":
+        probs = np.asarray(probs, dtype=np.float32)
+        n, c = probs.shape
+        rows = np.arange(n)
+        if c > 1:
+            # argpartition: las dos mayores en las posiciones 0 y 1 (ya ordenadas), O(C)
+            part = np.argpartition(-probs, 1, axis=1)
+            top1, top2 = part[:, 0], part[:, 1]
+            p2 = probs[rows, top2]
+        else:
+            top1 = np.zeros(n, dtype=np.intp)
+            top2 = np.full(n, -1, dtype=np.intp)
+            p2 = np.zeros(n, dtype=np.float32)
+        p1 = probs[rows, top1]
+
+        gap = p1.astype(np.float64) - p2.astype(np.float64)
+        high = (p1 >= cfg.confidence_threshold) & (gap >= cfg.top2_margin_pp)
+        confidence = np.where(high, 0, np.where(gap < cfg.top2_margin_pp, 1, 2)).astype(np.uint8)
+
+        return cls(list(files), tuple(classes), probs, top1.astype(np.int16), p1,
+                   top2.astype(np.int16), p2, confidence, cfg.export_full_prob_vector)
+
+    @classmethod
+    def concat(cls, batches: Sequence["PredictionBatch"]) -> "PredictionBatch":
+        """Une lotes del mismo modelo (mismas clases) en uno solo."""
+        if not batches:
+            raise ValueError("No hay lotes que unir")
+        first = batches[0]
+        if any(b.classes != first.classes for b in batches):
+            raise ValueError("No se pueden unir resultados de modelos con clases distintas")
+        if len(batches) == 1:
+            return first
+        files: List[str] = []
+        for b in batches:
+            files.extend(b.files)
+        return cls(
+            files, first.classes,
+            *(np.concatenate([getattr(b, f) for b in batches])
+              for f in ("probs", "top1", "top1_prob", "top2", "top2_prob", "confidence")),
+            full_probs=first.full_probs,
+        )
+
+    @property
+    def gap(self) -> np.ndarray:
+        """top1 - top2 por fila (float64, igual que Prediction.gap_pp)."""
+        return self.top1_prob.astype(np.float64) - self.top2_prob.astype(np.float64)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes de los arrays (sin contar las rutas)."""
+        return sum(a.nbytes for a in (self.probs, self.top1, self.top1_prob,
+                                      self.top2, self.top2_prob, self.confidence))
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def __getitem__(self, i: int) -> PredictionRow:
+        if not -len(self.files) <= i < len(self.files):
+            raise IndexError(i)
+        return PredictionRow(self, i % len(self.files))
+
+    def __iter__(self) -> Iterator[PredictionRow]:
+        for i in range(len(self.files)):
+            yield PredictionRow(self, i)
+
+    def to_predictions(self) -> List[Prediction]:
+        return [row.to_prediction() for row in self]
+
+
 def _softmax(x: np.ndarray) -> np.ndarray:
-    # Por si el modelo ya devuelve probs, lo dejamos idempotente
     x = x - np.max(x, axis=-1, keepdims=True)
     ex = np.exp(x)
     return ex / np.sum(ex, axis=-1, keepdims=True)
 
 
-def _confidence_label(p1: float, p2: float, cfg: AppConfig) -> str:
-    gap = p1 - p2
-    if p1 >= cfg.confidence_threshold and gap >= cfg.top2_margin_pp:
-        return "high"
-    if gap < cfg.top2_margin_pp:
-        return "ambiguous"
-    return "low"
+def as_logits(lm: LoadedModel, raw: np.ndarray) -> np.ndarray:
+    """
+    Salida cruda -> logits. Si el modelo da probs, log(p) difiere de los logits
+    sólo en una constante por fila, que la softmax ignora.
+    """
+    if lm.output_kind == "probs":
+        return np.log(np.clip(np.asarray(raw, dtype=np.float32), 1e-12, None))
+    return raw
+
+
+def _normalize(lm: LoadedModel, raw: np.ndarray) -> np.ndarray:
+    """
+    Salida del modelo -> probabilidades, con una sola normalización: softmax
+    (con la temperatura calibrada) si son logits; si ya son probs y no hay
+    calibración, aplicar otra softmax las aplanaría, así que sólo se
+    renormaliza la suma.
+    """
+    t = lm.temperature
+    if lm.output_kind == "probs" and t == 1.0:
+        raw = np.asarray(raw, dtype=np.float32)
+        return raw / np.maximum(np.sum(raw, axis=-1, keepdims=True), 1e-12)
+    z = as_logits(lm, raw)
+    return _softmax(z / t if t != 1.0 else z)
+
+
+def _run_model(lm: LoadedModel, batch: np.ndarray, pad_to: int) -> np.ndarray:
+    """
+    Ejecuta el modelo sobre un lote [n,H,W,3]. Si la inferencia compilada
+    depende del tamaño de lote (XLA), un lote final incompleto se rellena con
+    ceros hasta `pad_to` para no recompilar, y esas filas se descartan.
+    """
+    if lm.infer is None:
+        return lm.model(batch, training=False).numpy()
+    n = batch.shape[0]
+    if lm.static_batch and n < pad_to:
+        pad = np.zeros((pad_to - n,) + batch.shape[1:], dtype=batch.dtype)
+        batch = np.concatenate([batch, pad], axis=0)
+    return np.asarray(lm.infer(batch))[:n]
+
+
+def _build_predictions(
+    lm: LoadedModel,
+    cfg: AppConfig,
+    paths: List[str],
+    probs: np.ndarray,
+) -> PredictionBatch:
+    return PredictionBatch.from_probs(paths, probs, lm.classes, cfg)
+
+
+def _drain_ready(slots: deque, size: int) -> Iterator[Tuple[List[str], np.ndarray]]:
+    """
+    Entrega en lotes de hasta `size` los slots [ruta, clave, salida cruda] del
+    frente que ya tienen salida; se detiene en el primero que sigue pendiente.
+    """
+    while slots and slots[0][2] is not None:
+        taken = []
+        while slots and len(taken) < size and slots[0][2] is not None:
+            taken.append(slots.popleft())
+        yield [s[0] for s in taken], np.stack([s[2] for s in taken], axis=0)
+
+
+def _raw_chunks(
+    lm: LoadedModel,
+    cfg: AppConfig,
+    files: Iterable[str],
+    size: int,
+) -> Iterator[Tuple[List[str], np.ndarray]]:
+    """
+    (rutas, salida cruda [n,C]) por lote, en el orden de `files`, pasando por
+    la caché de predicciones. Cada entrada es un slot propio (una ruta repetida
+    se resuelve dos veces); los aciertos esperan a los fallos que van antes.
+    """
+    # la caché guarda la salida cruda: logits y probs del mismo archivo no se mezclan
+    prep = f"{preprocess_signature(cfg.image_size, cfg.jpeg_draft_decode)}|out={lm.output_kind}"
+
+    pcache = open_prediction_cache(cfg) if lm.model_hash else None
+    if pcache is not None:
+        pcache.bind_model(lm.path, lm.model_hash)
+    slots: deque = deque()    # [ruta, clave, salida cruda | None], en el orden de entrada
+    waiting: deque = deque()  # slots sin salida, en el orden en que van al modelo
+
+    def _misses() -> Iterator[str]:
+        for path in files:
+            key = raw = None
+            if pcache is not None:
+                key = pcache.image_key(path)
+                raw = pcache.get(key, lm.model_hash, prep)
+            slot = [path, key, raw]
+            slots.append(slot)
+            if raw is None:
+                waiting.append(slot)
+                yield path
+
+    # el pool de decodificación prepara el lote k+1 mientras el modelo procesa el k
+    batches = iter_batches(_misses(), cfg.image_size, size, cfg.decode_workers,
+                           fast_decode=cfg.jpeg_draft_decode, cache=open_tensor_cache(cfg))
+    for chunk, batch in batches:
+        # inferencia
+        with span("model.call"):
+            raw: np.ndarray = _run_model(lm, batch, size)  # [n,C], según lm.output_kind
+        done = [waiting.popleft() for _ in chunk]  # iter_batches respeta el orden
+        for slot, r in zip(done, raw):
+            slot[2] = r
+        if pcache is not None:
+            pcache.put_many(((slot[1], r) for slot, r in zip(done, raw)), lm.model_hash, prep)
+        yield from _drain_ready(slots, size)
+
+    yield from _drain_ready(slots, size)
+
+
+def iter_raw_outputs(
+    lm: LoadedModel,
+    cfg: AppConfig,
+    files: Iterable[str],
+    batch_size: Optional[int] = None,
+) -> Iterator[Tuple[List[str], np.ndarray]]:
+    """
+    Salidas crudas del modelo (sin normalizar ni calibrar) por lote. Usa la
+    misma caché que la predicción: recalibrar sobre imágenes ya vistas no
+    vuelve a pasar por el modelo.
+    """
+    size = max(1, int(batch_size or cfg.batch_size))
+    with inference_activity:
+        yield from _raw_chunks(lm, cfg, files, size)
+
+
+def iter_prediction_chunks(
+    lm: LoadedModel,
+    cfg: AppConfig,
+    files: Iterable[str],
+    batch_size: Optional[int] = None,
+) -> Iterator[PredictionBatch]:
+    """
+    Predice en trozos de `batch_size` (por defecto cfg.batch_size) y entrega
+    el PredictionBatch de cada trozo en cuanto está listo.
+    La memoria pico queda acotada a dos lotes (el actual y el que se está
+    decodificando), sin importar cuántas rutas haya.
+
+    Con la caché de predicciones activa (y lm.model_hash conocido), las
+    imágenes ya vistas con este modelo no pasan por el modelo; la salida
+    conserva el orden de entrada.
+    """
+    size = max(1, int(batch_size or cfg.batch_size))
+    with inference_activity:
+        for chunk, raw in _raw_chunks(lm, cfg, files, size):
+            with span("postprocess"):
+                preds = _build_predictions(lm, cfg, chunk, _normalize(lm, raw))
+            yield preds
+
+
+def iter_crop_prediction_chunks(
+    lm: LoadedModel,
+    cfg: AppConfig,
+    sources: Iterable[CropSource],
+    batch_size: Optional[int] = None,
+    save_dir: Optional[str] = None,
+) -> Iterator[PredictionBatch]:
+    """
+    Como iter_prediction_chunks, pero sobre ROIs de imágenes [(ruta, rois)]:
+    los recortes pasan en memoria al modelo, sin JPEG intermedio. El campo
+    `file` de cada resultado es crops.crop_label(ruta, i, roi). Con save_dir
+    se guardan además los recortes (auditoría).
+    """
+    size = max(1, int(batch_size or cfg.batch_size))
+    with inference_activity:
+        batches = iter_crop_batches(sources, cfg.image_size, size, cfg.decode_workers,
+                                    fast_decode=cfg.jpeg_draft_decode, save_dir=save_dir)
+        for labels, batch in batches:
+            yield predict_batch(lm, cfg, labels, batch, size)
+
+
+def predict_batch(
+    lm: LoadedModel,
+    cfg: AppConfig,
+    files: Sequence[str],
+    batch: np.ndarray,
+    pad_to: Optional[int] = None,
+) -> PredictionBatch:
+    """Clasifica un lote ya preprocesado [n,S,S,3] (sin cachés); `files` etiqueta cada fila."""
+    with span("model.call"):
+        raw = _run_model(lm, batch, pad_to or len(files))
+    with span("postprocess"):
+        return _build_predictions(lm, cfg, list(files), _normalize(lm, raw))
+
+
+def iter_predictions(
+    lm: LoadedModel,
+    cfg: AppConfig,
+    files: Iterable[str],
+    batch_size: Optional[int] = None,
+) -> Iterator[Prediction]:
+    """Igual que iter_prediction_chunks, pero entrega Prediction una a una."""
+    for chunk in iter_prediction_chunks(lm, cfg, files, batch_size):
+        yield from chunk.to_predictions()
 
 
 def predict_files(
@@ -48,44 +421,5 @@ def predict_files(
     cfg: AppConfig,
     files: Iterable[str],
 ) -> List[Prediction]:
-    paths = list(files)
-    if not paths:
-        return []
-
-    # lote en memoria (si necesitas chunking, puedes dividir aquí)
-    batch = batch_from_paths(paths, cfg.image_size)
-
-    # inferencia
-    logits_or_probs: np.ndarray = lm.model(batch, training=False).numpy()  # [N,C]
-    # forzamos softmax por robustez
-    probs = _softmax(logits_or_probs)
-
-    preds: List[Prediction] = []
-    for i, path in enumerate(paths):
-        pv = probs[i]
-        order = np.argsort(-pv)  # desc
-        t1, t2 = order[0], (order[1] if pv.shape[0] > 1 else None)
-
-        top1_c = lm.idx_to_class[int(t1)]
-        top1_p = float(pv[int(t1)])
-        top2_c = (lm.idx_to_class[int(t2)] if t2 is not None else None)
-        top2_p = (float(pv[int(t2)]) if t2 is not None else None)
-
-        conf = _confidence_label(top1_p, top2_p or 0.0, cfg)
-        gap_pp = top1_p - (top2_p or 0.0)
-
-        full = {lm.idx_to_class[j]: float(pv[j]) for j in range(len(pv))}
-
-        preds.append(
-            Prediction(
-                file=path,
-                top1_class=top1_c,
-                top1_prob=top1_p,
-                top2_class=top2_c,
-                top2_prob=top2_p,
-                full_probs=full if cfg.export_full_prob_vector else {},
-                confidence=conf,
-                gap_pp=gap_pp,
-            )
-        )
-    return preds
\ No newline at end of file
+    with span("predict_files"):
+        return list(iter_predictions(lm, cfg, files))
@@ -5,34 +5,143 @@ y preprocess_enetv2.
 """
 
 from __future__ import annotations
+import os
+from collections import deque
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import Iterable, List
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Tuple
 
 import numpy as np
 from PIL import Image, ImageOps
-import tensorflow as tf
-from tensorflow.keras.applications.efficientnet_v2 import preprocess_input as preprocess_enetv2
+
+from .profiling import span
+
+
+if TYPE_CHECKING:
+    from .tensor_cache import TensorCache
 
 
 IMG_EXTS = (".jpg", ".jpeg", ".png", ".bmp", ".JPG", ".JPEG", ".PNG", ".BMP")
 
+# Subir si cambia cualquier paso de load_and_preprocess (invalida las cachés)
+PREPROCESS_VERSION = 1
+
+
+@lru_cache(maxsize=None)
+def _preprocess_enetv2():
+    # TensorFlow se importa al preprocesar la primera imagen, no al importar el módulo
+    from tensorflow.keras.applications.efficientnet_v2 import preprocess_input
+    return preprocess_input
+
 
-def load_and_preprocess(path: str, image_size: int) -> np.ndarray:
+def preprocess_signature(image_size: int, fast_decode: bool = True) -> str:
+    """Identifica la configuración de preprocesado (para claves de caché)."""
+    return f"v{PREPROCESS_VERSION}|s{int(image_size)}|draft{int(bool(fast_decode))}"
+
+
+def load_and_preprocess(path: str, image_size: int, fast_decode: bool = True) -> np.ndarray:
     p = Path(path)
     if not p.is_file():
         raise FileNotFoundError(f"Imagen no encontrada: {p}")
 
-    img = Image.open(p)
-    img = ImageOps.exif_transpose(img).convert("RGB")
+    with span("decode"):
+        img = Image.open(p)
+        if fast_decode:
+            # JPEG: libjpeg decodifica directamente a 1/2, 1/4 o 1/8 (escalado DCT),
+            # eligiendo la mayor reducción que no quede por debajo de image_size.
+            # En otros formatos es un no-op.
+            img.draft("RGB", (image_size, image_size))
+        img = ImageOps.exif_transpose(img).convert("RGB")
+    with span("preprocess"):
+        return preprocess_image(img, image_size)
+
+
+def preprocess_image(img: Image.Image, image_size: int) -> np.ndarray:
+    """Imagen RGB ya decodificada -> tensor (S,S,3) float32 listo para el modelo."""
     img = img.resize((image_size, image_size), Image.Resampling.BILINEAR)
     arr = np.asarray(img, dtype=np.float32)  # [H,W,3] en [0..255]
-    arr = preprocess_enetv2(arr)             # EfficientNetV2 espera float [0..255] luego normaliza
-    return arr  # shape (H,W,3), float32
+    return _preprocess_enetv2()(arr)         # EfficientNetV2 espera float [0..255] luego normaliza
+
 
+def load_cached(
+    path: str,
+    image_size: int,
+    fast_decode: bool = True,
+    cache: Optional["TensorCache"] = None,
+) -> np.ndarray:
+    """load_and_preprocess pasando antes por la caché de tensores (si hay)."""
+    if cache is None:
+        return load_and_preprocess(path, image_size, fast_decode)
+    key = cache.key_for(path, preprocess_signature(image_size, fast_decode))
+    arr = cache.get(key)
+    if arr is None:
+        arr = load_and_preprocess(path, image_size, fast_decode)
+        cache.put(key, arr)
+    return arr
 
-def batch_from_paths(paths: Iterable[str], image_size: int) -> np.ndarray:
-    arrays: List[np.ndarray] = [load_and_preprocess(p, image_size) for p in paths]
+
+def batch_from_paths(paths: Iterable[str], image_size: int, fast_decode: bool = True) -> np.ndarray:
+    arrays: List[np.ndarray] = [load_and_preprocess(p, image_size, fast_decode) for p in paths]
     if not arrays:
         raise ValueError("Lista de paths vacía")
     batch = np.stack(arrays, axis=0)  # [N,H,W,3]
-    return batch.astype(np.float32)
\ No newline at end of file
+    return batch.astype(np.float32)
+
+
+def _resolve_workers(workers: Optional[int]) -> int:
+    if workers is None:
+        return os.cpu_count() or 1
+    return max(0, int(workers))
+
+
+def iter_batches(
+    paths: Iterable[str],
+    image_size: int,
+    batch_size: int,
+    workers: Optional[int] = None,
+    prefetch: int = 1,
+    fast_decode: bool = True,
+    cache: Optional["TensorCache"] = None,
+) -> Iterator[Tuple[List[str], np.ndarray]]:
+    """
+    Entrega (rutas, lote [n,H,W,3]) en el mismo orden que `paths`.
+    `paths` se consume de forma perezosa, un lote a la vez.
+
+    La decodificación corre en un pool de hilos (PIL libera el GIL al decodificar
+    y redimensionar) y va `prefetch` lotes por delante: mientras el consumidor
+    pasa el lote k por el modelo, el pool ya prepara el k+1.
+    Con workers=0 se decodifica en serie en el hilo que consume.
+    Si se pasa `cache`, las imágenes ya vistas se leen de disco sin decodificar.
+    """
+    size = max(1, int(batch_size))
+    it = iter(paths)
+    chunks = iter(lambda: list(islice(it, size)), [])
+    n_workers = _resolve_workers(workers)
+
+    if n_workers == 0:
+        for chunk in chunks:
+            arrays = [load_cached(p, image_size, fast_decode, cache) for p in chunk]
+            yield chunk, np.stack(arrays, axis=0).astype(np.float32, copy=False)
+        return
+
+    pool = ThreadPoolExecutor(max_workers=n_workers, thread_name_prefix="decode")
+    pending: deque = deque()
+
+    def _submit_next() -> None:
+        chunk = next(chunks, None)
+        if chunk is not None:
+            futures = [pool.submit(load_cached, p, image_size, fast_decode, cache) for p in chunk]
+            pending.append((chunk, futures))
+
+    try:
+        for _ in range(max(1, int(prefetch))):
+            _submit_next()
+        while pending:
+            chunk, futures = pending.popleft()
+            batch = np.stack([f.result() for f in futures], axis=0).astype(np.float32, copy=False)
+            _submit_next()  # el siguiente lote se decodifica mientras se consume este
+            yield chunk, batch
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
\ No newline at end of file
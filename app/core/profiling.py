@@ -0,0 +1,194 @@
+"""
+profiling.py — Medición de tiempos por etapa (decodificación, preprocesado,
+modelo, post-proceso, CSV, YOLO, carga de modelos).
+
+    from .profiling import span
+    with span("decode"):
+        ...
+
+Desactivado (por defecto) `span()` devuelve siempre el mismo objeto vacío:
+el coste es una comprobación de un booleano. Activado, cada etapa acumula un
+histograma de duraciones y, opcionalmente, eventos para un trace de Chrome
+(chrome://tracing o https://ui.perfetto.dev).
+"""
+
+from __future__ import annotations
+import bisect
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# límites superiores de los cubos del histograma, en ms
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_enabled = False
+_trace = False
+_max_events = 200_000
+_lock = threading.Lock()
+_stats: Dict[str, "_Stage"] = {}
+_events: List[tuple] = []   # (nombre, inicio ns, duración ns, tid)
+_t0_ns = time.perf_counter_ns()
+
+
+class _Stage:
+    __slots__ = ("count", "total", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)  # el último: > 10 s
+
+    def add(self, ms: float) -> None:
+        self.count += 1
+        self.total += ms
+        self.min = min(self.min, ms)
+        self.max = max(self.max, ms)
+        self.buckets[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+
+    def percentile(self, q: float) -> float:
+        """Aproximado: límite superior del cubo donde cae el percentil q."""
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target and n:
+                return min(BUCKETS_MS[i], self.max) if i < len(BUCKETS_MS) else self.max
+        return self.max
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        t1 = time.perf_counter_ns()
+        _record(self.name, self.t0, t1 - self.t0)
+        return False
+
+
+def span(name: str):
+    """Context manager que mide la etapa `name` (no-op si el perfilado está apagado)."""
+    return _Span(name) if _enabled else _NULL
+
+
+def _record(name: str, start_ns: int, dur_ns: int) -> None:
+    with _lock:
+        st = _stats.get(name)
+        if st is None:
+            st = _stats[name] = _Stage()
+        st.add(dur_ns / 1e6)
+        if _trace and len(_events) < _max_events:
+            _events.append((name, start_ns, dur_ns, threading.get_ident()))
+
+
+# ---------- control ----------
+
+def enable(trace: bool = True, max_events: int = 200_000) -> None:
+    """Activa el perfilado; con trace=True también guarda eventos (acotados) para Chrome."""
+    global _enabled, _trace, _max_events
+    _trace = bool(trace)
+    _max_events = int(max_events)
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def reset() -> None:
+    with _lock:
+        _stats.clear()
+        _events.clear()
+
+
+# ---------- resultados ----------
+
+def summary() -> Dict[str, Dict[str, Any]]:
+    """{etapa: {count, total_ms, mean_ms, min_ms, max_ms, p50_ms, p95_ms, histogram}}"""
+    out: Dict[str, Dict[str, Any]] = {}
+    with _lock:
+        for name, st in sorted(_stats.items(), key=lambda kv: -kv[1].total):
+            labels = [f"<={b}ms" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+            out[name] = {
+                "count": st.count,
+                "total_ms": round(st.total, 3),
+                "mean_ms": round(st.total / st.count, 3),
+                "min_ms": round(st.min, 3),
+                "max_ms": round(st.max, 3),
+                "p50_ms": st.percentile(0.50),
+                "p95_ms": st.percentile(0.95),
+                "histogram": {lab: n for lab, n in zip(labels, st.buckets) if n},
+            }
+    return out
+
+
+def format_summary() -> str:
+    rows = summary()
+    lines = [f"{'etapa':<20}{'n':>8}{'total ms':>12}{'media ms':>10}{'p95 ms':>10}{'máx ms':>10}"]
+    for name, r in rows.items():
+        lines.append(f"{name:<20}{r['count']:>8}{r['total_ms']:>12.1f}{r['mean_ms']:>10.2f}"
+                     f"{r['p95_ms']:>10.1f}{r['max_ms']:>10.1f}")
+    return "\n".join(lines)
+
+
+def export_json(path: str | Path) -> Path:
+    """Histogramas por etapa en JSON (para comparar máquinas o versiones)."""
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    with _lock:
+        dropped = _trace and len(_events) >= _max_events
+    data = {"pid": os.getpid(), "events_truncated": dropped, "stages": summary()}
+    p.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+    return p
+
+
+def export_chrome_trace(path: str | Path) -> Path:
+    """Eventos completos ("ph": "X") en formato Trace Event de Chrome/Perfetto."""
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    pid = os.getpid()
+    with _lock:
+        events = list(_events)
+    trace = [
+        {"name": name, "cat": "irfl", "ph": "X", "pid": pid, "tid": tid,
+         "ts": (start - _t0_ns) / 1000.0, "dur": dur / 1000.0}
+        for name, start, dur, tid in events
+    ]
+    p.write_text(json.dumps({"traceEvents": trace, "displayTimeUnit": "ms"}), encoding="utf-8")
+    return p
+
+
+def export_all(out_dir: str | Path, stem: Optional[str] = None) -> List[Path]:
+    """<stem>.json (histogramas) y <stem>.trace.json (Chrome) en out_dir."""
+    stem = stem or time.strftime("profile_%Y%m%d_%H%M%S")
+    base = Path(out_dir)
+    return [export_json(base / f"{stem}.json"), export_chrome_trace(base / f"{stem}.trace.json")]
@@ -0,0 +1,58 @@
+"""
+quantizer.py — Variantes cuantizadas (TFLite) de un modelo .keras registrado:
+  - dynamic : pesos int8, activaciones float (no necesita datos)
+  - int8    : entero completo, calibrado con una carpeta de imágenes
+  - float16 : pesos float16
+La entrada y salida siguen en float32, así que el predictor no cambia.
+"""
+
+from __future__ import annotations
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+from .preprocessor import load_and_preprocess
+
+QUANT_MODES = ("dynamic", "int8", "float16")
+
+
+def quantize_keras(
+    keras_path: str,
+    mode: str,
+    out_path: Optional[str] = None,
+    calib_paths: Optional[Sequence[str]] = None,
+    image_size: int = 224,
+    fast_decode: bool = True,
+) -> Path:
+    """Genera <stem>_<mode>.tflite junto al .keras (o en out_path)."""
+    import tensorflow as tf
+    from tensorflow.keras.models import load_model
+
+    if mode not in QUANT_MODES:
+        raise ValueError(f"Modo de cuantización no soportado: {mode} (usa {', '.join(QUANT_MODES)})")
+
+    src = Path(keras_path).resolve()
+    if not src.is_file():
+        raise FileNotFoundError(f"Modelo .keras no encontrado: {src}")
+    out = Path(out_path).resolve() if out_path else src.with_name(f"{src.stem}_{mode}.tflite")
+    out.parent.mkdir(parents=True, exist_ok=True)
+
+    model = load_model(src, compile=False)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if mode == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif mode == "int8":
+        paths: List[str] = list(calib_paths or [])
+        if not paths:
+            raise ValueError("La cuantización int8 completa necesita imágenes de calibración")
+
+        def _representative():
+            for p in paths:
+                yield [load_and_preprocess(p, image_size, fast_decode)[None, ...]]
+
+        converter.representative_dataset = _representative
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+
+    out.write_bytes(converter.convert())
+    return out
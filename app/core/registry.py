@@ -6,10 +6,14 @@ Soporta ejecución 'dev' y 'frozen' (PyInstaller).
 from __future__ import annotations
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Dict, List
+import os
 import sys
 import yaml
 
+BACKENDS = ("keras", "tflite", "onnx")
+OUTPUTS = ("auto", "probs", "logits")   # qué devuelve el modelo; "auto" = detectar
+
 def _bases_to_search() -> list[Path]:
     bases: list[Path] = []
 
@@ -60,6 +64,8 @@ class ModelEntry:
     path: str
     classes_path: str
     description: str | None = None
+    backend: str = "keras"   # "keras" | "tflite" | "onnx"
+    output: str = "auto"     # "auto" | "probs" | "logits"
 
 
 @dataclass(frozen=True)
@@ -108,12 +114,28 @@ class Registry:
                 if not c_path.is_absolute():
                     c_path = (base_for_rel / c_path)
 
+                backend = str(mval.get("backend", "keras")).lower()
+                if backend not in BACKENDS:
+                    raise ValueError(
+                        f"registry.yaml: modelo '{skey}/{mkey}' con backend desconocido '{backend}' "
+                        f"(válidos: {', '.join(BACKENDS)})"
+                    )
+
+                output = str(mval.get("output", "auto")).lower()
+                if output not in OUTPUTS:
+                    raise ValueError(
+                        f"registry.yaml: modelo '{skey}/{mkey}' con output desconocido '{output}' "
+                        f"(válidos: {', '.join(OUTPUTS)})"
+                    )
+
                 model_entries[mkey] = ModelEntry(
                     key=mkey,
                     name=mval.get("name", mkey),
                     path=str(m_path),            # 👈 NO forzamos .resolve() para no “encementar” tu PC
                     classes_path=str(c_path),
                     description=mval.get("description"),
+                    backend=backend,
+                    output=output,
                 )
 
             result[skey] = SpeciesEntry(key=skey, display_name=disp, models=model_entries)
@@ -134,4 +156,56 @@ class Registry:
         sp = self.get_species(species_key)
         if model_key not in sp.models:
             raise KeyError(f"Modelo '{model_key}' no existe para especie '{species_key}'")
-        return sp.models[model_key]
\ No newline at end of file
+        return sp.models[model_key]
+
+
+def _yaml_rel(path: str | Path, base: Path) -> str:
+    """Ruta relativa a la carpeta del YAML si cae dentro; si no, absoluta."""
+    p = Path(path).resolve()
+    try:
+        return p.relative_to(base.resolve()).as_posix()
+    except ValueError:
+        return str(p)
+
+
+def register_model(
+    yaml_path: str | Path,
+    species_key: str,
+    model_key: str,
+    path: str | Path,
+    classes_path: str | Path,
+    name: str | None = None,
+    backend: str = "keras",
+    description: str | None = None,
+    **extra: Any,
+) -> None:
+    """
+    Agrega (o reemplaza) el modelo `model_key` de `species_key` en registry.yaml.
+    Nota: al reescribir el YAML se pierden los comentarios.
+    """
+    yaml_path = Path(yaml_path)
+    with yaml_path.open("r", encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+
+    species = data.setdefault("species", {})
+    if species_key not in species:
+        raise KeyError(f"Especie no registrada: {species_key}")
+    models = species[species_key].setdefault("models", {})
+
+    base = yaml_path.parent
+    entry: Dict[str, Any] = {
+        "name": name or model_key,
+        "path": _yaml_rel(path, base),
+        "classes": _yaml_rel(classes_path, base),
+    }
+    if description:
+        entry["description"] = description
+    if backend != "keras":
+        entry["backend"] = backend
+    entry.update(extra)
+    models[model_key] = entry
+
+    tmp = yaml_path.with_suffix(yaml_path.suffix + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        yaml.safe_dump(data, f, sort_keys=False, allow_unicode=True)
+    os.replace(tmp, yaml_path)
\ No newline at end of file
@@ -0,0 +1,386 @@
+"""
+results_store.py — Base SQLite de resultados (reemplaza al predictions.csv global).
+
+Tablas:
+  runs         una por corrida: especie, modelo, hash, clases (orden de probs), origen
+  images       una por ruta de imagen
+  predictions  top-1/top-2, confianza y probs completas (float32 en un BLOB)
+  empty_images imágenes que una corrida procesó sin detecciones (pipeline)
+
+En modo WAL y con una transacción por lote. Los CSV se generan como vista
+(export_csv) y los CSV viejos se importan con import_csv; el predictions.csv
+de runs_dir se migra solo la primera vez que se abre la base. Las filas mal
+formadas se saltan (y se cuentan); una migración fallida no impide abrir la
+base, se reintenta la próxima vez.
+"""
+
+from __future__ import annotations
+import csv
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .config import AppConfig
+from .predictor import CONFIDENCE_LABELS, PredictionBatch
+from .profiling import span
+from .storage import CSV_HEADER, Results, _safe_runs_dir, _timestamp
+
+log = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id         INTEGER PRIMARY KEY,
+    started_at TEXT NOT NULL,
+    species    TEXT NOT NULL,
+    model_key  TEXT NOT NULL,
+    model_hash TEXT NOT NULL,
+    classes    TEXT NOT NULL,          -- JSON: orden de las columnas de probs
+    source     TEXT NOT NULL DEFAULT 'app'
+);
+CREATE INDEX IF NOT EXISTS runs_model ON runs(species, model_key);
+CREATE TABLE IF NOT EXISTS images (
+    id   INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS predictions (
+    id         INTEGER PRIMARY KEY,
+    run_id     INTEGER NOT NULL REFERENCES runs(id),
+    image_id   INTEGER NOT NULL REFERENCES images(id),
+    ts         TEXT NOT NULL,
+    top1       TEXT NOT NULL,
+    top1_prob  REAL NOT NULL,
+    top2       TEXT,
+    top2_prob  REAL,
+    gap        REAL NOT NULL,
+    confidence TEXT NOT NULL,
+    probs      BLOB                    -- float32 [C] en el orden de runs.classes
+);
+CREATE INDEX IF NOT EXISTS predictions_run ON predictions(run_id);
+CREATE INDEX IF NOT EXISTS predictions_image ON predictions(image_id);
+CREATE INDEX IF NOT EXISTS predictions_top1_ts ON predictions(top1, ts);
+CREATE INDEX IF NOT EXISTS predictions_ts ON predictions(ts);
+CREATE TABLE IF NOT EXISTS empty_images (
+    run_id   INTEGER NOT NULL REFERENCES runs(id),
+    image_id INTEGER NOT NULL REFERENCES images(id),
+    PRIMARY KEY (run_id, image_id)
+);
+CREATE TABLE IF NOT EXISTS imports (
+    path     TEXT PRIMARY KEY,
+    size     INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    rows     INTEGER NOT NULL
+);
+"""
+
+_INSERT = (
+    "INSERT INTO predictions(run_id, image_id, ts, top1, top1_prob, top2, top2_prob, gap, confidence, probs) "
+    "VALUES (?, (SELECT id FROM images WHERE path = ?), ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def _parse_full_probs(text: str) -> Tuple[Tuple[str, ...], Optional[bytes]]:
+    """'ef1:0.1;ef2:0.9' -> (clases, blob float32)."""
+    if not text:
+        return (), None
+    pairs = [kv.rsplit(":", 1) for kv in text.split(";") if kv]
+    classes = tuple(k for k, _ in pairs)
+    return classes, np.asarray([float(v) for _, v in pairs], dtype=np.float32).tobytes()
+
+
+def _opt_float(text: str) -> Optional[float]:
+    return float(text) if text not in ("", None) else None
+
+
+class ResultsStore:
+    def __init__(self, db_path: str | Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA synchronous=NORMAL")
+        self._con.executescript(_SCHEMA)
+        self._con.commit()
+        self.skipped_rows = 0  # filas mal formadas en el último import_csv
+
+    # ---------- escritura ----------
+    def start_run(self, species: str, model_key: str, model_hash: str,
+                  classes: Sequence[str], source: str = "app", started_at: Optional[str] = None) -> int:
+        with self._lock:
+            cur = self._con.execute(
+                "INSERT INTO runs(started_at, species, model_key, model_hash, classes, source) "
+                "VALUES (?,?,?,?,?,?)",
+                (started_at or _timestamp(), species, model_key, model_hash,
+                 json.dumps(list(classes), ensure_ascii=False), source),
+            )
+            self._con.commit()
+            return int(cur.lastrowid)
+
+    def add_predictions(self, run_id: int, preds: Results) -> int:
+        """Agrega un lote de resultados a la corrida en una sola transacción."""
+        rows = list(self._rows(preds))
+        with self._lock:
+            with self._con:
+                self._con.executemany("INSERT OR IGNORE INTO images(path) VALUES (?)", ((r[0],) for r in rows))
+                self._con.executemany(_INSERT, ((run_id, *r) for r in rows))
+        return len(rows)
+
+    def add_empty_images(self, run_id: int, paths: Sequence[str]) -> int:
+        """Marca `paths` como procesadas por la corrida sin recortes que clasificar."""
+        with self._lock:
+            with self._con:
+                self._con.executemany("INSERT OR IGNORE INTO images(path) VALUES (?)", ((p,) for p in paths))
+                self._con.executemany(
+                    "INSERT OR IGNORE INTO empty_images(run_id, image_id) "
+                    "VALUES (?, (SELECT id FROM images WHERE path = ?))",
+                    ((run_id, p) for p in paths),
+                )
+        return len(paths)
+
+    @staticmethod
+    def _rows(preds: Results) -> Iterator[tuple]:
+        """
+        (ruta, ts, top1, p1, top2, p2, gap, confianza, probs) por resultado. Como
+        en el CSV, probs sólo se guarda con export_full_prob_vector.
+        """
+        ts = _timestamp()
+        if isinstance(preds, PredictionBatch):
+            b = preds
+            top1 = [b.classes[i] for i in b.top1.tolist()]
+            top2 = [b.classes[i] if i >= 0 else None for i in b.top2.tolist()]
+            conf = [CONFIDENCE_LABELS[c] for c in b.confidence.tolist()]
+            p2 = b.top2_prob.tolist()
+            probs = np.ascontiguousarray(b.probs, dtype=np.float32) if b.full_probs else None
+            for i, (f, p1, g) in enumerate(zip(b.files, b.top1_prob.tolist(), b.gap.tolist())):
+                yield (f, ts, top1[i], p1, top2[i], p2[i] if top2[i] else None, g, conf[i],
+                       probs[i].tobytes() if probs is not None else None)
+            return
+        for p in preds:
+            blob = np.asarray(list(p.full_probs.values()), dtype=np.float32).tobytes() if p.full_probs else None
+            yield (p.file, ts, p.top1_class, p.top1_prob, p.top2_class, p.top2_prob,
+                   p.gap_pp, p.confidence, blob)
+
+    # ---------- consultas ----------
+    def query(
+        self,
+        species: Optional[str] = None,
+        model_key: Optional[str] = None,
+        top1: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        run_id: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Resultados filtrados (todos los filtros son opcionales), en orden de
+        inserción. since/until: "YYYY-MM-DD[ HH:MM:SS]", until exclusivo.
+        """
+        where: List[str] = []
+        args: List[Any] = []
+        for cond, val in (("r.species = ?", species), ("r.model_key = ?", model_key),
+                          ("p.top1 = ?", top1), ("p.ts >= ?", since), ("p.ts < ?", until),
+                          ("p.run_id = ?", run_id)):
+            if val is not None:
+                where.append(cond)
+                args.append(val)
+        sql = (
+            "SELECT p.ts, r.species, r.model_key, r.model_hash, i.path, p.top1, p.top1_prob, "
+            "p.top2, p.top2_prob, p.gap, p.confidence, p.probs, r.classes "
+            "FROM predictions p JOIN runs r ON r.id = p.run_id JOIN images i ON i.id = p.image_id"
+            + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY p.id"
+        )
+        with self._lock:
+            rows = self._con.execute(sql, args).fetchall()
+        classes_cache: Dict[str, List[str]] = {}
+        for ts, sp, mk, mh, path, t1, p1, t2, p2, gap, conf, blob, classes in rows:
+            cls = classes_cache.get(classes)
+            if cls is None:
+                cls = classes_cache[classes] = json.loads(classes)
+            probs = np.frombuffer(blob, dtype=np.float32) if blob is not None else None
+            yield {
+                "timestamp": ts, "species": sp, "model_key": mk, "model_hash": mh, "file": path,
+                "top1_class": t1, "top1_prob": p1, "top2_class": t2, "top2_prob": p2,
+                "gap_pp": gap, "confidence": conf,
+                "full_probs": dict(zip(cls, probs.tolist())) if probs is not None else {},
+            }
+
+    def empty_images(self, source: str) -> List[str]:
+        """Imágenes sin detecciones en las corridas con ese origen (para reanudar)."""
+        with self._lock:
+            rows = self._con.execute(
+                "SELECT DISTINCT i.path FROM empty_images e JOIN runs r ON r.id = e.run_id "
+                "JOIN images i ON i.id = e.image_id WHERE r.source = ?", (source,),
+            ).fetchall()
+        return [p for (p,) in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return int(self._con.execute("SELECT COUNT(*) FROM predictions").fetchone()[0])
+
+    # ---------- CSV ----------
+    def export_csv(self, path: str | Path, **filters: Any) -> int:
+        """Escribe el formato CSV de siempre con los resultados filtrados (ver query)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        n = 0
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(CSV_HEADER)
+            for r in self.query(**filters):
+                full = ";".join(f"{k}:{v:.6f}" for k, v in r["full_probs"].items())
+                w.writerow([
+                    r["timestamp"], r["species"], r["model_key"], r["model_hash"], r["file"],
+                    r["top1_class"], f"{r['top1_prob']:.6f}", r["top2_class"] or "",
+                    f"{(r['top2_prob'] or 0.0):.6f}", f"{r['gap_pp']:.6f}", r["confidence"], full,
+                ])
+                n += 1
+        return n
+
+    def import_csv(self, path: str | Path, force: bool = False) -> int:
+        """
+        Importa un CSV de resultados (con o sin encabezado: el predictions.csv
+        viejo no lo tenía). Una corrida por (especie, modelo, hash, clases).
+        Un archivo ya importado sin cambios se salta salvo con force.
+        Las filas mal formadas (columnas de menos, números o probs que no se
+        leen) se saltan; cuántas queda en self.skipped_rows.
+        Devuelve cuántas filas se importaron.
+        """
+        self.skipped_rows = 0
+        p = Path(path).resolve()
+        st = p.stat()
+        with self._lock:
+            row = self._con.execute("SELECT size, mtime_ns FROM imports WHERE path = ?", (str(p),)).fetchone()
+        if row and not force and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return 0
+
+        groups: Dict[tuple, List[tuple]] = {}
+        skipped = 0
+        with open(p, "r", newline="", encoding="utf-8", errors="replace") as f:
+            reader = csv.reader(f)
+            while True:
+                try:
+                    rec = next(reader)
+                except StopIteration:
+                    break
+                except csv.Error:  # p.ej. un byte NUL o comillas sin cerrar
+                    skipped += 1
+                    continue
+                if not rec or rec[: len(CSV_HEADER)] == CSV_HEADER:
+                    continue
+                try:
+                    ts, sp, mk, mh, file, t1, p1, t2, p2, gap, conf, full = rec[: len(CSV_HEADER)]
+                    classes, blob = _parse_full_probs(full)
+                    row = (file, ts, t1, float(p1), t2 or None, _opt_float(p2) if t2 else None,
+                           float(gap), conf, blob)
+                except ValueError:  # columnas de menos o valores que no se leen
+                    skipped += 1
+                    continue
+                groups.setdefault((sp, mk, mh, classes), []).append(row)
+        self.skipped_rows = skipped
+        if skipped:
+            log.warning("%s: %d filas mal formadas omitidas", p, skipped)
+
+        n = 0
+        with self._lock:
+            with self._con:
+                for (sp, mk, mh, classes), rows in groups.items():
+                    cur = self._con.execute(
+                        "INSERT INTO runs(started_at, species, model_key, model_hash, classes, source) "
+                        "VALUES (?,?,?,?,?,?)",
+                        (min(r[1] for r in rows), sp, mk, mh, json.dumps(list(classes), ensure_ascii=False),
+                         f"csv:{p.name}"),
+                    )
+                    run_id = cur.lastrowid
+                    self._con.executemany("INSERT OR IGNORE INTO images(path) VALUES (?)", ((r[0],) for r in rows))
+                    self._con.executemany(_INSERT, ((run_id, *r) for r in rows))
+                    n += len(rows)
+                self._con.execute(
+                    "INSERT OR REPLACE INTO imports(path, size, mtime_ns, rows) VALUES (?,?,?,?)",
+                    (str(p), st.st_size, st.st_mtime_ns, n),
+                )
+        return n
+
+    def close(self) -> None:
+        with self._lock:
+            self._con.close()
+
+
+_OPEN: Dict[str, ResultsStore] = {}
+_OPEN_LOCK = threading.Lock()
+
+
+def open_results_store(cfg: AppConfig) -> ResultsStore:
+    """
+    Base compartida en <runs_dir>/results.sqlite. La primera vez importa el
+    predictions.csv acumulado que hubiera en runs_dir; si esa migración falla,
+    se registra y la base se abre igual (se reintenta al volver a abrirla).
+    """
+    base = _safe_runs_dir(cfg.runs_dir)
+    path = str((base / "results.sqlite").resolve())
+    with _OPEN_LOCK:
+        store = _OPEN.get(path)
+        if store is None:
+            store = ResultsStore(path)
+            legacy = base / "predictions.csv"
+            if legacy.is_file():
+                try:
+                    store.import_csv(legacy)
+                except Exception:
+                    log.exception("No se pudo migrar %s a la base de resultados", legacy)
+            _OPEN[path] = store
+        return store
+
+
+def record_results(
+    cfg: AppConfig,
+    species: str,
+    model_key: str,
+    model_hash: str,
+    preds: Results,
+    run_id: Optional[int] = None,
+    source: str = "app",
+) -> int:
+    """
+    Guarda un lote en la base de resultados. Sin run_id abre una corrida nueva;
+    devuelve el run_id para los lotes siguientes.
+    """
+    with span("results.write"):
+        store = open_results_store(cfg)
+        if run_id is None:
+            if isinstance(preds, PredictionBatch):
+                classes = preds.classes
+            else:
+                preds = list(preds)
+                classes = tuple(preds[0].full_probs) if preds else ()
+            run_id = store.start_run(species, model_key, model_hash, classes, source)
+        store.add_predictions(run_id, preds)
+        return run_id
+
+
+def record_empty_images(
+    cfg: AppConfig,
+    species: str,
+    model_key: str,
+    model_hash: str,
+    classes: Sequence[str],
+    paths: Sequence[str],
+    run_id: Optional[int] = None,
+    source: str = "app",
+) -> Optional[int]:
+    """
+    Como record_results, para imágenes sin detecciones: no dan filas pero
+    quedan procesadas en la corrida. Devuelve el run_id (None si no había
+    nada que guardar ni corrida abierta).
+    """
+    if not paths:
+        return run_id
+    with span("results.write"):
+        store = open_results_store(cfg)
+        if run_id is None:
+            run_id = store.start_run(species, model_key, model_hash, classes, source)
+        store.add_empty_images(run_id, paths)
+        return run_id
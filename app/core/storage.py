@@ -1,15 +1,17 @@
 """
-storage.py — Persistencia de resultados: CSV acumulado y export por corrida.
+storage.py — Persistencia de resultados en CSV: formato de filas, CSV por
+corrida y export. El acumulado global vive en results_store (SQLite).
 """
 
 from __future__ import annotations
 import csv
 from datetime import datetime
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Iterable, Iterator, Optional, Set, Union
 
 from .config import AppConfig
-from .predictor import Prediction
+from .predictor import CONFIDENCE_LABELS, Prediction, PredictionBatch
+from .profiling import span
 
 
 def _timestamp() -> str:
@@ -38,35 +40,77 @@ def ensure_runs_dirs(cfg: AppConfig) -> None:
     (base / "exports").mkdir(parents=True, exist_ok=True)
 
 
-# ---------- Escritura de CSV global acumulado ----------
+# ---------- Filas CSV ----------
+
+CSV_HEADER = [
+    "timestamp", "species", "model_key", "model_hash",
+    "file", "top1_class", "top1_prob", "top2_class", "top2_prob", "gap_pp",
+    "confidence", "full_probs_json"
+]
+
+
+def _csv_row(species: str, model_key: str, model_hash: str, p: Prediction) -> list:
+    full_json = ";".join(f"{k}:{v:.6f}" for k, v in p.full_probs.items())
+    return [
+        _timestamp(), species, model_key, model_hash,
+        p.file, p.top1_class, f"{p.top1_prob:.6f}",
+        p.top2_class or "", f"{(p.top2_prob or 0.0):.6f}",
+        f"{p.gap_pp:.6f}", p.confidence, full_json
+    ]
+
+
+def _batch_rows(species: str, model_key: str, model_hash: str, b: PredictionBatch) -> Iterator[list]:
+    """Mismas filas que _csv_row, formateadas por columnas desde los arrays del lote."""
+    ts = _timestamp()
+    top1 = [b.classes[i] for i in b.top1.tolist()]
+    top2 = [b.classes[i] if i >= 0 else "" for i in b.top2.tolist()]
+    p1 = ["%.6f" % v for v in b.top1_prob.tolist()]
+    p2 = ["%.6f" % v for v in b.top2_prob.tolist()]
+    gap = ["%.6f" % v for v in b.gap.tolist()]
+    conf = [CONFIDENCE_LABELS[c] for c in b.confidence.tolist()]
+    if b.full_probs:
+        fmt = ";".join(f"{k.replace('%', '%%')}:%.6f" for k in b.classes)
+        full = [fmt % tuple(r) for r in b.probs.tolist()]
+    else:
+        full = [""] * len(b)
+    for i, f in enumerate(b.files):
+        yield [ts, species, model_key, model_hash, f, top1[i], p1[i], top2[i], p2[i], gap[i], conf[i], full[i]]
 
-def append_to_global_csv(
-    cfg: AppConfig,
+
+Results = Union[PredictionBatch, Iterable[Prediction]]
+
+
+def _rows(species: str, model_key: str, model_hash: str, preds: Results) -> Iterator[list]:
+    if isinstance(preds, PredictionBatch):
+        return _batch_rows(species, model_key, model_hash, preds)
+    return (_csv_row(species, model_key, model_hash, p) for p in preds)
+
+
+def append_predictions_csv(
+    path: str | Path,
     species: str,
     model_key: str,
     model_hash: str,
-    preds: Iterable[Prediction],
+    preds: Results,
 ) -> None:
-    ensure_runs_dirs(cfg)
-    base = _safe_runs_dir(cfg.runs_dir)
-    path = base / "predictions.csv"
+    """Agrega filas a `path` (con encabezado si el archivo es nuevo)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
     new_file = not path.exists()
-    with open(path, "a", newline="", encoding="utf-8") as f:
+    with span("csv.write"), open(path, "a", newline="", encoding="utf-8") as f:
         w = csv.writer(f)
         if new_file:
-            w.writerow([
-                "timestamp", "species", "model_key", "model_hash",
-                "file", "top1_class", "top1_prob", "top2_class", "top2_prob", "gap_pp",
-                "confidence", "full_probs_json"
-            ])
-        for p in preds:
-            full_json = ";".join(f"{k}:{v:.6f}" for k, v in p.full_probs.items())
-            w.writerow([
-                _timestamp(), species, model_key, model_hash,
-                p.file, p.top1_class, f"{p.top1_prob:.6f}",
-                p.top2_class or "", f"{(p.top2_prob or 0.0):.6f}",
-                f"{p.gap_pp:.6f}", p.confidence, full_json
-            ])
+            w.writerow(CSV_HEADER)
+        w.writerows(_rows(species, model_key, model_hash, preds))
+
+
+def read_csv_files(path: str | Path) -> Set[str]:
+    """Rutas ya presentes en la columna 'file' de un CSV de resultados (para reanudar)."""
+    path = Path(path)
+    if not path.is_file():
+        return set()
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        return {row["file"] for row in csv.DictReader(f) if row.get("file")}
 
 
 # ---------- Exportación por corrida (a carpeta elegida por el usuario) ----------
@@ -76,7 +120,7 @@ def export_run_csv(
     species: str,
     model_key: str,
     model_hash: str,
-    preds: Iterable[Prediction],
+    preds: Results,
     dest_dir: Optional[str] = None,  # <- NUEVO: carpeta de destino opcional
 ) -> str:
     """
@@ -86,6 +130,23 @@ def export_run_csv(
 
     Devuelve la ruta absoluta del archivo creado.
     """
+    path = run_csv_path(cfg, species, model_key, dest_dir)
+
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(CSV_HEADER)
+        w.writerows(_rows(species, model_key, model_hash, preds))
+
+    return str(path.resolve())
+
+
+def run_csv_path(
+    cfg: AppConfig,
+    species: str,
+    model_key: str,
+    dest_dir: Optional[str] = None,
+) -> Path:
+    """Ruta <dest_dir|runs_dir/exports>/<species>_<model>_<timestamp>.csv (crea la carpeta)."""
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
 
     if dest_dir:
@@ -95,22 +156,4 @@ def export_run_csv(
         ensure_runs_dirs(cfg)
         base = _safe_runs_dir(cfg.runs_dir) / "exports"
 
-    path = base / f"{species}_{model_key}_{ts}.csv"
-
-    with open(path, "w", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        w.writerow([
-            "timestamp", "species", "model_key", "model_hash",
-            "file", "top1_class", "top1_prob", "top2_class", "top2_prob", "gap_pp",
-            "confidence", "full_probs_json"
-        ])
-        for p in preds:
-            full_json = ";".join(f"{k}:{v:.6f}" for k, v in p.full_probs.items())
-            w.writerow([
-                _timestamp(), species, model_key, model_hash,
-                p.file, p.top1_class, f"{p.top1_prob:.6f}",
-                p.top2_class or "", f"{(p.top2_prob or 0.0):.6f}",
-                f"{p.gap_pp:.6f}", p.confidence, full_json
-            ])
-
-    return str(path.resolve())
\ No newline at end of file
+    return base / f"{species}_{model_key}_{ts}.csv"
\ No newline at end of file
@@ -0,0 +1,155 @@
+"""
+tensor_cache.py — Caché en disco de imágenes ya preprocesadas.
+Guarda la salida float32 [S,S,3] de load_and_preprocess como .npy (se lee con
+mmap, sin copiar), con tope de tamaño y expulsión LRU.
+
+La clave combina ruta absoluta + mtime + tamaño del archivo con la firma del
+preprocesado (image_size, versión, decodificación rápida), así que editar la
+imagen o cambiar el preprocesado invalida la entrada sin hacer nada más.
+"""
+
+from __future__ import annotations
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .config import AppConfig
+
+
+class TensorCache:
+    def __init__(self, root: str | Path, max_bytes: int):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[str, int]" = OrderedDict()  # clave -> bytes (más antiguo primero)
+        self._total = 0
+        self._scan()
+
+    # ---------- índice ----------
+    def _scan(self) -> None:
+        """Reconstruye el índice LRU a partir de los archivos (mtime = último uso)."""
+        found = []
+        for sub in self.root.iterdir():
+            if not sub.is_dir():
+                continue
+            for f in sub.glob("*.npy"):
+                try:
+                    st = f.stat()
+                except OSError:
+                    continue
+                found.append((st.st_mtime, f.stem, st.st_size))
+        for _, key, size in sorted(found):
+            self._index[key] = size
+            self._total += size
+
+    def _file_for(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.npy"
+
+    @staticmethod
+    def key_for(path: str, signature: str) -> str:
+        """Clave por ruta+mtime+tamaño y la firma del preprocesado."""
+        p = Path(path).resolve()
+        st = p.stat()
+        raw = f"{p}|{st.st_mtime_ns}|{st.st_size}|{signature}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    # ---------- API ----------
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+
+        f = self._file_for(key)
+        try:
+            arr = np.load(f, mmap_mode="r")
+            os.utime(f)  # marca de último uso para el LRU entre sesiones
+        except (OSError, ValueError):
+            # archivo borrado o corrupto: se trata como fallo
+            with self._lock:
+                size = self._index.pop(key, None)
+                if size is not None:
+                    self._total -= size
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return arr
+
+    def put(self, key: str, arr: np.ndarray) -> None:
+        if self.max_bytes <= 0:
+            return
+        f = self._file_for(key)
+        f.parent.mkdir(parents=True, exist_ok=True)
+        tmp = f.with_name(f"{key}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp, "wb") as fh:
+                np.save(fh, np.ascontiguousarray(arr, dtype=np.float32))
+            os.replace(tmp, f)
+            size = f.stat().st_size
+        except OSError:
+            # caché best-effort: un disco lleno o sin permisos no debe romper la inferencia
+            tmp.unlink(missing_ok=True)
+            return
+        with self._lock:
+            old = self._index.pop(key, 0)
+            self._index[key] = size
+            self._total += size - old
+            self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        while self._total > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self._total -= size
+            self.evictions += 1
+            try:
+                self._file_for(key).unlink(missing_ok=True)
+            except OSError:
+                # en Windows un .npy mapeado en memoria no se puede borrar todavía
+                pass
+
+    @property
+    def resident_bytes(self) -> int:
+        return self._total
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._index):
+                self._file_for(key).unlink(missing_ok=True)
+            self._index.clear()
+            self._total = 0
+
+
+_OPEN: Dict[Tuple[str, int], TensorCache] = {}
+_OPEN_LOCK = threading.Lock()
+
+
+def open_tensor_cache(cfg: AppConfig) -> Optional[TensorCache]:
+    """
+    Devuelve la caché compartida para esta configuración, o None si está
+    desactivada (tensor_cache_mb <= 0). Vive en <runs_dir>/cache/tensors.
+    """
+    if int(cfg.tensor_cache_mb or 0) <= 0:
+        return None
+    root = str(Path(cfg.runs_dir).expanduser().resolve() / "cache" / "tensors")
+    max_bytes = int(cfg.tensor_cache_mb) * 1024 * 1024
+    with _OPEN_LOCK:
+        cache = _OPEN.get((root, max_bytes))
+        if cache is None:
+            cache = TensorCache(root, max_bytes)
+            _OPEN[(root, max_bytes)] = cache
+        return cache
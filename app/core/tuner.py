@@ -0,0 +1,155 @@
+"""
+tuner.py — Ajuste automático de batch_size y tf_num_threads para la máquina local.
+
+Cada configuración de hilos se mide en un subproceso propio (TensorFlow sólo
+acepta fijar hilos antes de inicializarse). Dentro de cada subproceso se
+recorren los tamaños de lote de menor a mayor, midiendo imágenes/s de punta a
+punta (decodificación en el pool + modelo, como en predict) y el pico de
+memoria residente (RSS) del proceso. Sin imágenes propias se usan JPEG
+sintéticos del tamaño de una foto de cámara.
+"""
+
+from __future__ import annotations
+import json
+import os
+import subprocess
+import sys
+import time
+from dataclasses import replace
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .config import AppConfig
+from .registry import ModelEntry
+
+SYNTHETIC_SIZE = (1600, 1200)  # ancho x alto de los JPEG sintéticos
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Pico de RSS del proceso actual (None si no se puede medir)."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return int(peak) if sys.platform == "darwin" else int(peak) * 1024  # Linux: KiB
+    except ImportError:
+        pass
+    try:
+        import psutil  # Windows: no hay módulo resource
+        info = psutil.Process().memory_info()
+        return int(getattr(info, "peak_wset", 0) or info.rss)
+    except ImportError:
+        return None
+
+
+def synthetic_jpegs(root: str | Path, n: int, size=SYNTHETIC_SIZE, seed: int = 0) -> List[str]:
+    """n JPEG con contenido tipo foto (gradiente + ruido), para que decodificar cueste lo real."""
+    from PIL import Image
+
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    w, h = size
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:h, 0:w].astype(np.float32)
+    base = np.stack([xx / w * 200, yy / h * 200, (xx + yy) / (w + h) * 120], axis=-1)
+    paths = []
+    for i in range(n):
+        p = root / f"tune_{i:03d}.jpg"
+        img = np.clip(base + rng.normal(0, 12, base.shape), 0, 255).astype(np.uint8)
+        Image.fromarray(img).save(p, quality=90)
+        paths.append(str(p))
+    return paths
+
+
+def measure_batch_sizes(
+    entry: ModelEntry,
+    cfg: AppConfig,
+    batch_sizes: Sequence[int],
+    files: Sequence[str],
+    min_seconds: float = 2.0,
+) -> List[Dict]:
+    """
+    Mide en este proceso (con los hilos ya fijados en cfg) cada tamaño de lote,
+    pasando `files` por iter_prediction_chunks: decodificación en el pool de
+    cfg.decode_workers y modelo, sin cachés (cada pasada decodifica de nuevo).
+    Al ir de menor a mayor, el pico de RSS tras cada medición corresponde al
+    lote más grande visto hasta ese momento.
+    """
+    from .model_loader import load_entry
+    from .predictor import iter_prediction_chunks
+
+    if not files:
+        raise ValueError("No hay imágenes para medir")
+    cfg = replace(cfg, prediction_cache=False, tensor_cache_mb=0)
+    lm = load_entry(entry, cfg)
+    out: List[Dict] = []
+    for bs in sorted(set(int(b) for b in batch_sizes if int(b) > 0)):
+        # varios lotes por pasada, para que el pool decodifique mientras el modelo trabaja
+        k = max(4 * bs, 16)
+        run = [files[i % len(files)] for i in range(k)]
+        for _ in iter_prediction_chunks(lm, cfg, run[:bs], batch_size=bs):
+            pass  # trazado / compilación fuera de la medición
+        n, t0 = 0, time.perf_counter()
+        while True:
+            for chunk in iter_prediction_chunks(lm, cfg, run, batch_size=bs):
+                n += len(chunk)
+            elapsed = time.perf_counter() - t0
+            if elapsed >= min_seconds:
+                break
+        rss = peak_rss_bytes()
+        out.append({
+            "batch_size": bs,
+            "threads": cfg.tf_num_threads,
+            "images_per_s": n / elapsed,
+            "peak_rss_mb": (rss / 2**20) if rss else None,
+        })
+    return out
+
+
+def pick_best(results: List[Dict], max_rss_mb: Optional[float] = None) -> Optional[Dict]:
+    """
+    Mayor imágenes/s dentro del presupuesto de memoria (si se da). Con
+    presupuesto, las filas sin RSS medido no cuentan como dentro.
+    """
+    ok = [
+        r for r in results
+        if max_rss_mb is None or (r.get("peak_rss_mb") is not None and r["peak_rss_mb"] <= max_rss_mb)
+    ]
+    return max(ok, key=lambda r: r["images_per_s"]) if ok else None
+
+
+def run_tuning(
+    registry_path: str | Path,
+    species: str,
+    model: str,
+    batch_sizes: Sequence[int],
+    thread_options: Sequence[Optional[int]],
+    images: Sequence[str],
+    min_seconds: float = 2.0,
+    log=print,
+) -> List[Dict]:
+    """Lanza un subproceso `cli.py tune-worker` por cada opción de hilos."""
+    cli_path = Path(__file__).resolve().parents[1] / "cli.py"
+    results: List[Dict] = []
+    for threads in thread_options:
+        cmd = [
+            sys.executable, str(cli_path), "--registry", str(registry_path), "tune-worker",
+            "--species", species, "--model", model,
+            "--threads", str(threads or 0),
+            "--min-seconds", str(min_seconds),
+            "--batch-sizes", *[str(b) for b in batch_sizes],
+            "--images", *[str(p) for p in images],
+        ]
+        label = threads if threads else "auto"
+        log(f"Midiendo con tf_num_threads={label}…")
+        proc = subprocess.run(cmd, capture_output=True, text=True, env=dict(os.environ))
+        if proc.returncode != 0:
+            log(f"  falló (threads={label}): {proc.stderr.strip().splitlines()[-1:] or ''}")
+            continue
+        rows = json.loads(proc.stdout.strip().splitlines()[-1])
+        for r in rows:
+            rss = f"{r['peak_rss_mb']:.0f} MB" if r.get("peak_rss_mb") else "—"
+            log(f"  bs={r['batch_size']:>3}  {r['images_per_s']:7.1f} img/s  RSS pico {rss}")
+        results.extend(rows)
+    return results
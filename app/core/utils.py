@@ -37,7 +37,8 @@ def iter_images_in_paths(paths: Iterable[str]) -> list[str]:
     return uniq
 
 
-def file_sha1(path: str, chunk: int = 1 << 20) -> str:
+def file_digest(path: str, chunk: int = 1 << 20) -> str:
+    """SHA-1 completo (hex) del contenido del archivo."""
     h = hashlib.sha1()
     with open(path, "rb") as f:
         while True:
@@ -45,4 +46,8 @@ def file_sha1(path: str, chunk: int = 1 << 20) -> str:
             if not b:
                 break
             h.update(b)
-    return h.hexdigest()[:10]
\ No newline at end of file
+    return h.hexdigest()
+
+
+def file_sha1(path: str, chunk: int = 1 << 20) -> str:
+    return file_digest(path, chunk)[:10]
\ No newline at end of file
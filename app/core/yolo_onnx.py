@@ -0,0 +1,173 @@
+"""
+yolo_onnx.py — Detector YOLOv8 exportado a ONNX, sin torch ni ultralytics.
+
+Reproduce lo que hace ultralytics en predict:
+  - letterbox a imgsz (relleno gris 114, imagen centrada), RGB/255 en NCHW,
+    con el INTER_LINEAR de cv2 (sin antialias; en NumPy, bit a bit igual, si
+    cv2 no está instalado);
+  - salida [N, 4+C, A]: (cx, cy, w, h) y un puntaje por clase para cada ancla;
+  - filtro por conf, NMS por clase (IoU 0.7, máx. 300 cajas) en NumPy;
+  - cajas de vuelta a píxeles de la imagen original (xyxy).
+
+Si onnxruntime trae el proveedor de OpenVINO (onnxruntime-openvino) se usa;
+si no, CPU.
+"""
+
+from __future__ import annotations
+import ast
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import cv2
+except ImportError:  # opcional: resize_linear da el mismo resultado
+    cv2 = None
+
+PAD_VALUE = 114
+_MAX_WH = 7680.0  # desplazamiento por clase para hacer NMS de todas de una vez (como ultralytics)
+_COEF_BITS = 11   # punto fijo de cv2 para uint8 (INTER_RESIZE_COEF_BITS)
+
+
+def _linear_coeffs(n_src: int, n_dst: int, clamp: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Índices (i0, i1) y pesos enteros (a0, a1) por salida, con centros de píxel como cv2."""
+    f = ((np.arange(n_dst) + 0.5) * (n_src / n_dst) - 0.5).astype(np.float32)
+    i0 = np.floor(f).astype(np.int64)
+    f -= i0
+    if clamp:  # en x cv2 no interpola fuera del borde; en y repite la fila
+        f[(i0 < 0) | (i0 >= n_src - 1)] = 0
+    one = np.float32(1 << _COEF_BITS)
+    a0 = np.rint((np.float32(1) - f) * one).astype(np.int32)
+    a1 = np.rint(f * one).astype(np.int32)
+    return np.clip(i0, 0, n_src - 1), np.clip(i0 + 1, 0, n_src - 1), a0, a1
+
+
+def resize_linear(img: np.ndarray, nw: int, nh: int) -> np.ndarray:
+    """cv2.resize(img, (nw, nh), INTER_LINEAR) para HxWx3 uint8, en NumPy con la misma aritmética."""
+    h, w = img.shape[:2]
+    x0, x1, a0, a1 = _linear_coeffs(w, nw, True)
+    y0, y1, b0, b1 = _linear_coeffs(h, nh, False)
+    src = np.asarray(img, dtype=np.int32)
+
+    def _rows(ys: np.ndarray) -> np.ndarray:
+        r = src[ys]
+        return (r[:, x0] * a0[None, :, None] + r[:, x1] * a1[None, :, None]) >> 4
+
+    out = ((b0[:, None, None] * _rows(y0)) >> 16) + ((b1[:, None, None] * _rows(y1)) >> 16)
+    return ((out + 2) >> 2).astype(np.uint8)
+
+
+def letterbox(img: np.ndarray, size: Tuple[int, int]) -> Tuple[np.ndarray, float, Tuple[float, float]]:
+    """
+    Escala HxWx3 (uint8) para que entre en size=(alto, ancho) sin deformar y
+    rellena el resto. Devuelve (imagen, escala, (pad_x, pad_y)).
+    """
+    h, w = img.shape[:2]
+    gain = min(size[0] / h, size[1] / w)
+    nw, nh = int(round(w * gain)), int(round(h * gain))
+    dw, dh = (size[1] - nw) / 2, (size[0] - nh) / 2
+    if (nw, nh) != (w, h):
+        img = np.ascontiguousarray(img)
+        if cv2 is not None:
+            img = cv2.resize(img, (nw, nh), interpolation=cv2.INTER_LINEAR)
+        else:
+            img = resize_linear(img, nw, nh)
+    top, left = int(round(dh - 0.1)), int(round(dw - 0.1))
+    out = np.full((size[0], size[1], 3), PAD_VALUE, dtype=np.uint8)
+    out[top:top + nh, left:left + nw] = img
+    return out, gain, (float(left), float(top))
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou: float) -> np.ndarray:
+    """NMS voraz sobre cajas xyxy; índices conservados, de mayor a menor puntaje."""
+    order = np.argsort(-scores, kind="stable")
+    areas = np.clip(boxes[:, 2] - boxes[:, 0], 0, None) * np.clip(boxes[:, 3] - boxes[:, 1], 0, None)
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        xx1 = np.maximum(boxes[i, 0], boxes[rest, 0])
+        yy1 = np.maximum(boxes[i, 1], boxes[rest, 1])
+        xx2 = np.minimum(boxes[i, 2], boxes[rest, 2])
+        yy2 = np.minimum(boxes[i, 3], boxes[rest, 3])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        union = areas[i] + areas[rest] - inter
+        order = rest[inter <= iou * np.maximum(union, 1e-9)]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def decode(pred: np.ndarray, conf: float, iou: float = 0.7, max_det: int = 300) -> Tuple[np.ndarray, np.ndarray]:
+    """Salida de una imagen [4+C, A] -> (cajas xyxy [n,4] en el espacio del letterbox, puntajes [n])."""
+    pred = np.asarray(pred, dtype=np.float32).T  # [A, 4+C]
+    cls_scores = pred[:, 4:]
+    cls = cls_scores.argmax(axis=1)
+    scores = cls_scores[np.arange(len(pred)), cls]
+    m = scores > conf
+    xywh, scores, cls = pred[m, :4], scores[m], cls[m]
+    boxes = np.concatenate([xywh[:, :2] - xywh[:, 2:] / 2, xywh[:, :2] + xywh[:, 2:] / 2], axis=1)
+    keep = nms(boxes + cls[:, None] * _MAX_WH, scores, iou)[:max_det]
+    return boxes[keep], scores[keep]
+
+
+def scale_boxes(boxes: np.ndarray, gain: float, pad: Tuple[float, float], shape: Tuple[int, int]) -> np.ndarray:
+    """Deshace el letterbox y recorta a la imagen (alto, ancho)."""
+    out = (boxes - np.array([pad[0], pad[1], pad[0], pad[1]], dtype=np.float32)) / gain
+    out[:, [0, 2]] = out[:, [0, 2]].clip(0, shape[1])
+    out[:, [1, 3]] = out[:, [1, 3]].clip(0, shape[0])
+    return out
+
+
+class OnnxYolo:
+    """Sesión de ONNX Runtime para un YOLOv8 exportado (ultralytics export format=onnx)."""
+
+    def __init__(self, model_path: str, num_threads: Optional[int] = None):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("El detector .onnx requiere onnxruntime (pip install onnxruntime)") from e
+        self.model_path = str(model_path)
+        so = ort.SessionOptions()
+        if num_threads:
+            so.intra_op_num_threads = int(num_threads)
+        providers = [p for p in ("OpenVINOExecutionProvider", "CPUExecutionProvider")
+                     if p in ort.get_available_providers()]
+        self._sess = ort.InferenceSession(self.model_path, so, providers=providers)
+        inp = self._sess.get_inputs()[0]
+        self._in_name = inp.name
+        # lote fijo (export sin dynamic) o variable
+        self._batch = inp.shape[0] if isinstance(inp.shape[0], int) else None
+        self.imgsz = self._read_imgsz(inp.shape)
+
+    def _read_imgsz(self, shape) -> Tuple[int, int]:
+        meta = self._sess.get_modelmeta().custom_metadata_map
+        if "imgsz" in meta:  # ultralytics guarda imgsz en los metadatos
+            sz = ast.literal_eval(meta["imgsz"])
+            return (int(sz[0]), int(sz[1])) if isinstance(sz, (list, tuple)) else (int(sz), int(sz))
+        if isinstance(shape[2], int) and isinstance(shape[3], int):
+            return int(shape[2]), int(shape[3])
+        return 640, 640
+
+    def detect(self, images_bgr: Sequence[np.ndarray], conf: float = 0.25,
+               iou: float = 0.7, max_det: int = 300) -> List[np.ndarray]:
+        """Cajas xyxy [n,4] en píxeles de cada imagen (HxWx3, BGR como en ultralytics)."""
+        if not images_bgr:
+            return []
+        boxed = [letterbox(np.asarray(im)[:, :, ::-1], self.imgsz) for im in images_bgr]
+        x = np.stack([b for b, _, _ in boxed]).transpose(0, 3, 1, 2).astype(np.float32) / 255.0
+
+        step = self._batch or len(x)
+        preds = []
+        for i in range(0, len(x), step):
+            part = x[i:i + step]
+            n = len(part)
+            if n < step:  # lote fijo: se completa con ceros
+                part = np.concatenate([part, np.zeros((step - n,) + part.shape[1:], np.float32)])
+            preds.append(self._sess.run(None, {self._in_name: part})[0][:n])
+        preds = np.concatenate(preds)
+
+        out = []
+        for pred, (_, gain, pad), im in zip(preds, boxed, images_bgr):
+            boxes, _ = decode(pred, conf, iou, max_det)
+            out.append(scale_boxes(boxes, gain, pad, im.shape[:2]))
+        return out
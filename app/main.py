@@ -8,12 +8,16 @@ APP_ROOT = Path(__file__).resolve().parent  # .../app
 if str(APP_ROOT) not in sys.path:
     sys.path.insert(0, str(APP_ROOT))
 
+# --- depuración: desglose de tiempos de importación (antes de cualquier import pesado)
+import os
+from core import import_timing
+if "--import-times" in sys.argv or os.environ.get("IRFL_IMPORT_TIMES", "").lower() in {"1", "true"}:
+    import_timing.install()
+
 from PySide6.QtWidgets import QApplication, QMessageBox
 from PySide6.QtGui import QIcon, QGuiApplication
 from PySide6.QtCore import Qt
 
-from core.config import load_app_config
-from core.tf_session import init_tf_session
 from core.registry import Registry
 from ui.main_window import MainWindow
 
@@ -47,21 +51,15 @@ def main():
         Qt.HighDpiScaleFactorRoundingPolicy.PassThrough
     )
 
-    # 1) Cargar configuración
-    cfg = load_app_config()
-
-    # 2) Inicializar TensorFlow (mem growth, warmup, hilos...)
-    init_tf_session(cfg)
-
-    # 3) Lanzar la app Qt
-    app = QApplication(sys.argv)
+    # 1) Lanzar la app Qt (TensorFlow se inicializa después, en segundo plano)
+    app = QApplication([a for a in sys.argv if a != "--import-times"])
 
     # Icono global (opcional)
     icon_path = APP_ROOT / "assets" / "icons" / "app_icon.png"
     if icon_path.is_file():
         app.setWindowIcon(QIcon(str(icon_path)))
 
-    # 4) Cargar Registry con ruta explícita (junto al .exe o app/config/)
+    # 2) Cargar Registry con ruta explícita (junto al .exe o app/config/)
     try:
         yaml_path = find_registry_yaml()
         registry = Registry(yaml_path)
@@ -69,10 +67,14 @@ def main():
         QMessageBox.critical(None, "IRFLies-App", f"Error cargando registry:\n{e}")
         return 1
 
-    # 5) Ventana principal
+    # 3) Ventana principal: se muestra ya, con el motor "cargando"
     # Si tu MainWindow no acepta el parámetro, cambia a: win = MainWindow()
     win = MainWindow(registry)
     win.show()
+    import_timing.mark("ventana visible")
+
+    # 4) Inicializar TensorFlow (mem growth, warmup, hilos...) fuera del hilo de UI
+    win.start_engine()
 
     return app.exec()
 
@@ -0,0 +1,105 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+import tensorflow as tf
+from PIL import Image
+
+from core.config import AppConfig
+from core.converter import convert_keras
+from core.model_loader import load_entry
+from core.predictor import predict_files, _normalize
+from core.registry import ModelEntry
+
+
+def _keras_project(root: Path) -> ModelEntry:
+    tf.keras.utils.set_random_seed(3)
+    model = tf.keras.Sequential([
+        tf.keras.Input((224, 224, 3)),
+        tf.keras.layers.Conv2D(4, 3, strides=4, activation="relu"),
+        tf.keras.layers.GlobalAveragePooling2D(),
+        tf.keras.layers.Dense(3, activation="softmax"),
+    ])
+    model.save(root / "m.keras")
+    (root / "classes.json").write_text(json.dumps({"classes": ["ef1", "ef2", "ef3"]}), encoding="utf-8")
+    return ModelEntry(key="m", name="m", path=str(root / "m.keras"), classes_path=str(root / "classes.json"))
+
+
+def _images(root: Path, n: int) -> list[str]:
+    rng = np.random.default_rng(0)
+    out = []
+    for i in range(n):
+        p = root / f"img{i}.png"
+        Image.fromarray(rng.integers(0, 255, (120, 160, 3), dtype=np.uint8)).save(p)
+        out.append(str(p))
+    return out
+
+
+def _parity(tmp_path: Path, fmt: str):
+    entry = _keras_project(tmp_path)
+    cfg = AppConfig(batch_size=2)
+    art = convert_keras(entry.path, fmt)
+    alt = ModelEntry(key=f"m_{fmt}", name="m", path=str(art), classes_path=entry.classes_path, backend=fmt)
+
+    keras_lm = load_entry(entry, cfg)
+    alt_lm = load_entry(alt, cfg)
+    assert alt_lm.model is None and alt_lm.infer is not None
+
+    batch = np.random.default_rng(1).uniform(0, 255, (3, 224, 224, 3)).astype(np.float32)
+    # el .keras pierde su softmax final (logits); los artefactos convertidos devuelven probs
+    assert (keras_lm.output_kind, alt_lm.output_kind) == ("logits", "probs")
+    np.testing.assert_allclose(_normalize(alt_lm, alt_lm.infer(batch)),
+                               _normalize(keras_lm, keras_lm.model(batch).numpy()), atol=1e-4)
+
+    paths = _images(tmp_path, 3)
+    for a, b in zip(predict_files(keras_lm, cfg, paths), predict_files(alt_lm, cfg, paths)):
+        assert a.top1_class == b.top1_class
+        assert abs(a.top1_prob - b.top1_prob) < 1e-4
+
+
+def test_tflite_matches_keras(tmp_path):
+    _parity(tmp_path, "tflite")
+
+
+def test_onnx_matches_keras(tmp_path):
+    pytest.importorskip("tf2onnx")
+    pytest.importorskip("onnxruntime")
+    _parity(tmp_path, "onnx")
+
+
+def test_converted_logits_model_is_registered_as_logits(tmp_path):
+    import textwrap
+    from core.converter import convert_entry
+    from core.registry import Registry
+
+    tf.keras.utils.set_random_seed(5)
+    model = tf.keras.Sequential([
+        tf.keras.Input((224, 224, 3)),
+        tf.keras.layers.GlobalAveragePooling2D(),
+        tf.keras.layers.Dense(3),  # sin softmax: logits
+    ])
+    model.save(tmp_path / "raw.keras")
+    (tmp_path / "classes.json").write_text(json.dumps({"classes": ["ef1", "ef2", "ef3"]}), encoding="utf-8")
+    reg = tmp_path / "registry.yaml"
+    reg.write_text(textwrap.dedent("""
+    species:
+      Ceratitis:
+        models:
+          raw:
+            path: "raw.keras"
+            classes: "classes.json"
+    """), encoding="utf-8")
+
+    entry = Registry(str(reg)).get_model("Ceratitis", "raw")
+    convert_entry(reg, "Ceratitis", entry, "tflite", new_key="raw_tflite")
+    alt = Registry(str(reg)).get_model("Ceratitis", "raw_tflite")
+    assert alt.output == "logits"
+
+    cfg = AppConfig(batch_size=2)
+    keras_lm, alt_lm = load_entry(entry, cfg), load_entry(alt, cfg)
+    assert alt_lm.output_kind == "logits"
+    batch = np.random.default_rng(2).uniform(0, 255, (2, 224, 224, 3)).astype(np.float32)
+    probs = _normalize(alt_lm, alt_lm.infer(batch))
+    assert (probs >= 0).all()
+    np.testing.assert_allclose(probs, _normalize(keras_lm, keras_lm.model(batch).numpy()), atol=1e-4)
@@ -0,0 +1,64 @@
+# app/tests/test_calibrator.py
+
+import json
+
+import numpy as np
+from PIL import Image
+
+import cli
+from core.calibrator import TemperatureScaler, calibration_path, nll
+from core.config import load_app_config
+from core.evaluation import collect_logits, labelled_images
+from core.model_loader import load_entry
+from core.predictor import iter_prediction_chunks, _softmax
+from core.prediction_cache import open_prediction_cache
+from core.registry import Registry
+from test_cli import _tiny_project
+
+
+def test_temperature_fit_softens_overconfident_logits():
+    rng = np.random.default_rng(0)
+    y = rng.integers(0, 4, 2000)
+    logits = rng.normal(0, 1, (2000, 4))
+    logits[np.arange(2000), y] += 1.0
+    hot = logits * 4.0  # sobreconfiado: T ideal ≈ 4
+    ts = TemperatureScaler().fit(hot, y)
+    assert 3.0 < ts.T < 5.0
+    assert ts.nll(hot, y) < nll(hot, y)
+
+
+def test_cli_calibrate_sidecar_is_applied_and_refit_uses_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("IRFL_RUNS_DIR", str(tmp_path / "runs"))
+    monkeypatch.setenv("IRFL_PREDICTION_CACHE", "true")
+    monkeypatch.setenv("IRFL_TENSOR_CACHE_MB", "0")
+    reg = _tiny_project(tmp_path)
+
+    val = tmp_path / "val"
+    rng = np.random.default_rng(1)
+    for cls in ("ef8", "ef9", "otra"):
+        (val / cls).mkdir(parents=True)
+        for i in range(3):
+            Image.fromarray(rng.integers(0, 255, (64, 80, 3), dtype=np.uint8)).save(val / cls / f"{i}.png")
+
+    args = ["--registry", str(reg), "calibrate", "--species", "Ceratitis", "--model", "tiny",
+            "--val-dir", str(val)]
+    assert cli.main(args) == 0
+    cfg = load_app_config()
+    cache = open_prediction_cache(cfg)
+    hits = cache.hits
+    assert cli.main(args) == 0
+    assert cache.hits - hits == 6  # el reajuste no vuelve a pasar por el modelo
+
+    entry = Registry(str(reg)).get_model("Ceratitis", "tiny")
+    saved = json.loads(calibration_path(entry.path).read_text(encoding="utf-8"))
+    assert saved["n"] == 6
+
+    lm = load_entry(entry, cfg)
+    assert lm.temperature == saved["temperature"]
+    logits, _ = collect_logits(lm, cfg, labelled_images(val))
+    files = [p for p, c in labelled_images(val) if c != "otra"]
+    got = np.concatenate([b.probs for b in iter_prediction_chunks(lm, cfg, files)])
+    np.testing.assert_allclose(got, _softmax(logits / lm.temperature), rtol=1e-5, atol=1e-6)
+
+    cfg.apply_calibration = False
+    assert load_entry(entry, cfg).temperature == 1.0
@@ -0,0 +1,67 @@
+import csv, json, textwrap
+from pathlib import Path
+
+import tensorflow as tf
+from PIL import Image
+
+import cli
+
+
+def _tiny_project(root: Path) -> Path:
+    """Modelo .keras mínimo + classes.json + registry.yaml en `root`."""
+    model = tf.keras.Sequential([
+        tf.keras.Input((224, 224, 3)),
+        tf.keras.layers.GlobalAveragePooling2D(),
+        tf.keras.layers.Dense(2, activation="softmax"),
+    ])
+    model.save(root / "tiny.keras")
+    (root / "classes.json").write_text(json.dumps({"classes": ["ef8", "ef9"]}), encoding="utf-8")
+    reg = root / "registry.yaml"
+    reg.write_text(textwrap.dedent("""
+    species:
+      Ceratitis:
+        display_name: "Ceratitis capitata"
+        models:
+          tiny:
+            path: "tiny.keras"
+            classes: "classes.json"
+    """), encoding="utf-8")
+    return reg
+
+
+def test_cli_predict_streams_csv_and_resumes(tmp_path, monkeypatch):
+    monkeypatch.setenv("IRFL_RUNS_DIR", str(tmp_path / "runs"))
+    monkeypatch.setenv("IRFL_PREDICTION_CACHE", "false")
+    monkeypatch.setenv("IRFL_TENSOR_CACHE_MB", "0")
+    reg = _tiny_project(tmp_path)
+
+    imgs = tmp_path / "imgs"
+    imgs.mkdir()
+    for i in range(3):
+        Image.new("RGB", (100, 80), color=(50 * i, 60, 70)).save(imgs / f"f{i}.jpg")
+
+    out = tmp_path / "out.csv"
+    args = ["--registry", str(reg), "predict", "--species", "Ceratitis", "--model", "tiny",
+            "--out", str(out), "--batch-size", "2", "--no-global", str(imgs)]
+    assert cli.main(args) == 0
+    with open(out, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 3
+    assert {r["top1_class"] for r in rows} <= {"ef8", "ef9"}
+
+    # una imagen nueva: sólo esa se procesa al reanudar
+    Image.new("RGB", (100, 80), color=(1, 2, 3)).save(imgs / "f3.jpg")
+    assert cli.main(args) == 0
+    with open(out, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 4
+    assert len({r["file"] for r in rows}) == 4
+
+
+def test_cli_does_not_import_qt():
+    import subprocess, sys
+    code = ("import sys, cli, core.predictor, core.storage, core.model_loader, core.tf_session; "
+            "print('PySide6' in sys.modules)")
+    out = subprocess.run([sys.executable, "-c", code], cwd=str(Path(cli.__file__).parent),
+                         capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
@@ -0,0 +1,59 @@
+from PIL import Image
+
+from core.crops import clamp_roi, save_crops
+
+
+def test_save_crops_clamps_rois_to_image(tmp_path):
+    src = tmp_path / "mosca.jpg"
+    Image.new("RGB", (100, 80), color=(10, 20, 30)).save(src)
+    assert clamp_roi((90, 70, 50, 50), 100, 80) == (90, 70, 10, 10)
+    assert clamp_roi((-5, -5, 0, 0), 100, 80) == (0, 0, 1, 1)
+
+    out = save_crops(str(src), [(10, 10, 20, 30), (90, 70, 50, 50)], tmp_path)
+    assert [p.split("__")[1] for p in out] == ["roi1_x10_y10_w20_h30.jpg", "roi2_x90_y70_w10_h10.jpg"]
+    with Image.open(out[0]) as im:
+        assert im.size == (20, 30)
+
+
+def test_in_memory_crops_decode_each_image_once(tmp_path, monkeypatch):
+    import numpy as np
+    from core import crops
+    from core.preprocessor import preprocess_image
+
+    rng = np.random.default_rng(0)
+    srcs = []
+    for i in range(3):
+        p = tmp_path / f"m{i}.png"
+        Image.fromarray(rng.integers(0, 255, (90, 120, 3), dtype=np.uint8)).save(p)
+        srcs.append(str(p))
+    sources = [(srcs[0], [(0, 0, 40, 40), (50, 20, 60, 60)]), (srcs[1], []), (srcs[2], [(10, 10, 30, 50)])]
+
+    opened = []
+    real_open = Image.open
+    monkeypatch.setattr(crops.Image, "open", lambda p, *a, **k: opened.append(p) or real_open(p, *a, **k))
+    out = list(crops.iter_crop_batches(sources, 32, batch_size=2, workers=2, save_dir=tmp_path / "audit"))
+    assert sorted(opened) == [srcs[0], srcs[2]]  # una vez por imagen; la que no tiene ROIs ni se abre
+
+    labels = [x for labs, _ in out for x in labs]
+    assert labels == [f"{srcs[0]}#roi1_x0_y0_w40_h40", f"{srcs[0]}#roi2_x50_y20_w60_h60",
+                      f"{srcs[2]}#roi1_x10_y10_w30_h50"]
+    assert [b.shape[0] for _, b in out] == [2, 1]
+    # sin JPEG intermedio: idéntico a recortar y preprocesar la imagen original
+    with real_open(srcs[0]) as im:
+        want = preprocess_image(im.convert("RGB").crop((50, 20, 110, 80)), 32)
+    np.testing.assert_array_equal(out[0][1][1], want)
+    assert len(list((tmp_path / "audit").iterdir())) == 3
+
+
+def test_draft_decode_keeps_small_roi_at_model_resolution(tmp_path):
+    import numpy as np
+    from core.crops import decode_crops
+
+    src = tmp_path / "grande.jpg"
+    yy, xx = np.mgrid[0:1200, 0:1600]
+    Image.fromarray(np.stack([xx % 256, yy % 256, (xx + yy) % 256], -1).astype(np.uint8)).save(src, quality=95)
+    rois = [(100, 100, 800, 800), (900, 300, 500, 500)]
+    _, fast = decode_crops(str(src), rois, 224, fast_decode=True)
+    _, full = decode_crops(str(src), rois, 224, fast_decode=False)
+    assert fast.shape == full.shape == (2, 224, 224, 3)
+    assert np.abs(fast - full).mean() < 8.0
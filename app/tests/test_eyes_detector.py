@@ -0,0 +1,86 @@
+# app/tests/test_eyes_detector.py
+
+from types import SimpleNamespace
+
+import numpy as np
+from PIL import Image
+
+from core import eyes_detector
+from core.detection_cache import DetectionCache
+from core.eyes_detector import EyesDetector
+
+
+class _FakeYolo:
+    """Imita model.predict de ultralytics: una caja en el cuarto superior izquierdo."""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, source, conf=0.25, verbose=False):
+        sources = source if isinstance(source, list) else [source]
+        self.calls.append(len(sources))
+        out = []
+        for s in sources:
+            h, w = (np.asarray(Image.open(s)).shape if isinstance(s, str) else s.shape)[:2]
+            box = SimpleNamespace(xyxy=[np.array([w / 8, h / 8, w / 2, h / 2])])
+            out.append(SimpleNamespace(boxes=[box] if w > 50 else []))
+        return out
+
+
+def test_iter_detect_batches_and_matches_detect(tmp_path):
+    paths = []
+    for i, w in enumerate([160, 200, 40, 320, 240]):
+        p = tmp_path / f"img{i}.jpg"
+        Image.new("RGB", (w, 120), color=(i * 40, 90, 30)).save(p)
+        paths.append(str(p))
+    broken = tmp_path / "roto.jpg"
+    broken.write_bytes(b"no es una imagen")
+    paths.insert(2, str(broken))
+
+    det = EyesDetector("fake.pt")
+    det._model = _FakeYolo()
+    chunks = list(det.iter_detect(paths, batch_size=4))
+    assert [len(c) for c in chunks] == [4, 2]
+    assert det._model.calls == [3, 2]  # la imagen rota no llega al modelo
+
+    got = dict(item for c in chunks for item in c)
+    assert [p for c in chunks for p, _ in c] == paths
+    assert got[str(broken)] is None
+    assert got[paths[3]] == []  # muy chica: sin detecciones
+    for p in paths:
+        if p != str(broken):
+            assert got[p] == det.detect(p)
+    assert det.detect_many(paths, batch_size=2) == [item for c in chunks for item in c]
+
+
+def test_detection_cache_skips_yolo_across_sessions(tmp_path, monkeypatch):
+    paths = []
+    for i, w in enumerate([160, 40, 240]):
+        p = tmp_path / f"img{i}.jpg"
+        Image.new("RGB", (w, 120), color=(i * 40, 90, 30)).save(p)
+        paths.append(str(p))
+    weights = tmp_path / "eyes.pt"
+    weights.write_bytes(b"pesos v1")
+    db = tmp_path / "cache" / "detections.sqlite"
+
+    loads = []
+    monkeypatch.setattr(eyes_detector, "_import_yolo", lambda: lambda w: loads.append(w) or _FakeYolo())
+    det = EyesDetector(weights, DetectionCache(db))
+    first = det.detect_many(paths, batch_size=2)
+    assert det._model.calls == [2, 1]
+
+    # otra sesión: todo sale de la caché (también la imagen sin detecciones) y YOLO ni se carga
+    det2 = EyesDetector(weights, DetectionCache(db))
+    assert det2.detect_many(paths, batch_size=2) == first
+    assert det2.detect(paths[0]) == first[0][1]
+    assert det2._model is None and len(loads) == 1
+    assert det2.cache.stats() == {"hits": 4, "misses": 0, "entries": 3}
+
+    # otro umbral u otros pesos: se vuelve a detectar
+    assert det2.detect(paths[2], conf=0.5) == first[2][1]
+    assert det2._model.calls == [1]
+    weights.write_bytes(b"pesos v2")
+    det3 = EyesDetector(weights, DetectionCache(db))
+    det3.detect_many(paths)
+    assert det3._model.calls == [3]
+    assert det3.cache.stats()["entries"] == 3  # las de los pesos viejos se borraron
@@ -0,0 +1,44 @@
+import json
+
+import numpy as np
+import tensorflow as tf
+
+from core.model_cache import ModelCache, estimate_model_bytes
+from core.model_loader import load_keras_model
+
+
+def _model(tmp_path, name, units):
+    m = tf.keras.Sequential([
+        tf.keras.Input((8, 8, 3)),
+        tf.keras.layers.GlobalAveragePooling2D(),
+        tf.keras.layers.Dense(units, activation="softmax"),
+    ])
+    path = tmp_path / f"{name}.keras"
+    m.save(path)
+    classes = tmp_path / f"{name}.json"
+    classes.write_text(json.dumps({"classes": [f"c{i}" for i in range(units)]}), encoding="utf-8")
+    return load_keras_model(str(path), str(classes))
+
+
+def test_model_cache_lru_by_count_and_bytes(tmp_path):
+    a, b, c = (_model(tmp_path, n, u) for n, u in (("a", 2), ("b", 3), ("c", 4)))
+    assert estimate_model_bytes(a) == (3 * 2 + 2) * 4  # Dense: kernel + bias en float32
+
+    cache = ModelCache(max_models=2)
+    cache.put("a", a)
+    cache.put("b", b)
+    assert cache.get("a") is a          # "a" pasa a ser el más reciente
+    assert cache.put("c", c) == ["b"]
+    assert "b" not in cache and cache.get("b") is None
+    s = cache.stats()
+    assert (s.models, s.hits, s.misses, s.evictions) == (2, 1, 1, 1)
+    assert s.resident_bytes == estimate_model_bytes(a) + estimate_model_bytes(c)
+
+    # los modelos que siguen en caché funcionan tras desalojar otro
+    assert cache.get("c").model(np.zeros((1, 8, 8, 3), np.float32)).shape == (1, 4)
+
+    budget = ModelCache(max_bytes=estimate_model_bytes(c))
+    budget.put("a", a)
+    assert budget.put("c", c) == ["a"]
+    assert budget.put("b", b) == ["c"]  # el recién insertado nunca se desaloja
+    assert len(budget) == 1
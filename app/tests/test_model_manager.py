@@ -0,0 +1,147 @@
+# app/tests/test_model_manager.py
+
+import importlib
+import sys
+import types
+
+import pytest
+
+from core.predictor import inference_activity
+from core.registry import ModelEntry
+from test_model_cache import _model
+
+
+class _Signal:
+    """Señal mínima: guarda lo emitido y llama a los conectados."""
+
+    def __init__(self, *types_):
+        self.emitted = []
+        self._slots = []
+
+    def __set_name__(self, owner, name):
+        self._name = name
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        bound = obj.__dict__.get(self._name)
+        if bound is None:
+            bound = obj.__dict__[self._name] = _Signal()
+        return bound
+
+    def connect(self, slot):
+        self._slots.append(slot)
+
+    def emit(self, *args):
+        self.emitted.append(args)
+        for slot in self._slots:
+            slot(*args)
+
+
+class _Pool:
+    """QThreadPool que ejecuta las tareas al llamar run_all()."""
+
+    _global = None
+
+    def __init__(self, *a):
+        self.tasks = []
+
+    @classmethod
+    def globalInstance(cls):
+        cls._global = cls._global or cls()
+        return cls._global
+
+    def start(self, task):
+        self.tasks.append(task)
+
+    def run_all(self):
+        while self.tasks:
+            self.tasks.pop(0).run()
+
+    def setMaxThreadCount(self, n):
+        pass
+
+    def setThreadPriority(self, p):
+        pass
+
+    def clear(self):
+        self.tasks.clear()
+
+
+def _qt_stub():
+    qtcore = types.ModuleType("PySide6.QtCore")
+    qtcore.QObject = type("QObject", (), {"__init__": lambda self, *a: None})
+    qtcore.QRunnable = type("QRunnable", (), {"__init__": lambda self, *a: None})
+    qtcore.Signal = _Signal
+    qtcore.Slot = lambda *a, **k: (lambda f: f)
+    qtcore.QThread = types.SimpleNamespace(Priority=types.SimpleNamespace(LowPriority=0))
+    qtcore.QThreadPool = _Pool
+    pyside = types.ModuleType("PySide6")
+    pyside.QtCore = qtcore
+    return {"PySide6": pyside, "PySide6.QtCore": qtcore}
+
+
+def _manager(monkeypatch):
+    try:
+        import PySide6.QtCore  # noqa: F401  (con Qt real no hace falta el stub)
+    except ImportError:
+        for name, mod in _qt_stub().items():
+            monkeypatch.setitem(sys.modules, name, mod)
+    monkeypatch.delitem(sys.modules, "core.model_manager", raising=False)
+    monkeypatch.setenv("IRFL_TF_WARMUP_ON_START", "false")
+    mm = importlib.import_module("core.model_manager")
+    return mm, mm.ModelManager()
+
+
+def test_load_requested_before_engine_ready_is_deferred_then_loaded(tmp_path, monkeypatch):
+    lm = _model(tmp_path, "a", 2)
+    entry = ModelEntry(key="a", name="a", path=lm.path, classes_path=str(tmp_path / "a.json"))
+    mm, manager = _manager(monkeypatch)
+    if not isinstance(manager._pool, _Pool):
+        pytest.skip("con Qt real las tareas corren en otro hilo")
+    monkeypatch.setattr(mm.model_loader, "load_entry", lambda e, cfg: lm)
+
+    manager.load_async("a", entry)  # todavía "Cargando motor…"
+    assert manager._deferred == ("a", entry) and not manager.sig_loaded.emitted
+
+    manager._on_engine_done("")
+    assert manager.sig_engine_ready.emitted == [("",)]
+    manager._pool.run_all()
+    assert manager.sig_loaded.emitted == [("a", lm)]
+
+    cache = manager._cache
+    manager._on_engine_done("")
+    assert manager._cache is cache  # la caché no se recrea
+    manager.load_async("a", entry)
+    assert manager.sig_loaded.emitted[-1] == ("a", lm) and not manager._pool.tasks
+    assert manager.cache_stats().hits == 1
+
+
+def test_prefetch_skips_warmup_if_a_prediction_starts_during_the_load(tmp_path, monkeypatch):
+    a, b = _model(tmp_path, "a", 2), _model(tmp_path, "b", 3)
+    entries = [ModelEntry(key=k, name=k, path=lm.path, classes_path=str(tmp_path / f"{k}.json"))
+               for k, lm in (("a", a), ("b", b))]
+    mm, manager = _manager(monkeypatch)
+    if not isinstance(manager._prefetch_pool, _Pool):
+        pytest.skip("con Qt real las tareas corren en otro hilo")
+    manager._cfg.tf_warmup_on_start = True
+    manager._on_engine_done("")
+
+    warmed = []
+    monkeypatch.setattr(mm._LoadTask, "_warmup", lambda self, lm: warmed.append(lm))
+
+    def load(entry, cfg):
+        if entry.key == "a":
+            inference_activity.__enter__()  # el usuario empieza a predecir mientras carga "a"
+        return a if entry.key == "a" else b
+
+    monkeypatch.setattr(mm.model_loader, "load_entry", load)
+    assert manager.prefetch(entries) == 2
+    first, second = manager._prefetch_pool.tasks
+    try:
+        first.run()
+    finally:
+        inference_activity.__exit__(None, None, None)
+    assert warmed == [] and manager.get_cached(entries[0]) is a  # cargado, sin warmup
+    second.run()
+    assert warmed == [b] and manager.get_cached(entries[1]) is b
@@ -0,0 +1,126 @@
+# app/tests/test_pipeline.py
+
+import csv
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import cli
+from core import eyes_detector
+from core.config import load_app_config
+from core.eyes_detector import EyesDetector
+from core.model_loader import load_entry
+from core.pipeline import PipelineStats, iter_pipeline_chunks
+from core.predictor import iter_crop_prediction_chunks
+from core.registry import Registry
+from core.results_store import open_results_store
+from test_cli import _tiny_project
+from test_eyes_detector import _FakeYolo
+
+
+def _images(root):
+    root.mkdir()
+    rng = np.random.default_rng(0)
+    paths = []
+    for i, w in enumerate([160, 40, 320, 240]):  # la de 40 px no tiene detecciones
+        p = root / f"m{i}.png"
+        Image.fromarray(rng.integers(0, 255, (120, w, 3), dtype=np.uint8)).save(p)
+        paths.append(str(p))
+    (root / "roto.jpg").write_bytes(b"no es una imagen")
+    return paths + [str(root / "roto.jpg")]
+
+
+def test_pipeline_matches_two_step_flow_and_cli_resumes(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("IRFL_RUNS_DIR", str(tmp_path / "runs"))
+    monkeypatch.setenv("IRFL_PREDICTION_CACHE", "false")
+    monkeypatch.setenv("IRFL_TENSOR_CACHE_MB", "0")
+    monkeypatch.setenv("IRFL_YOLO_BATCH_SIZE", "2")
+    monkeypatch.setattr(eyes_detector, "_import_yolo", lambda: lambda weights: _FakeYolo())
+    reg = _tiny_project(tmp_path)
+    paths = _images(tmp_path / "imgs")
+
+    cfg = load_app_config()
+    lm = load_entry(Registry(str(reg)).get_model("Ceratitis", "tiny"), cfg)
+    weights = tmp_path / "fake.pt"
+    weights.write_bytes(b"pesos")
+    det = EyesDetector(weights)
+
+    stats = PipelineStats()
+    got = list(iter_pipeline_chunks(lm, cfg, det, paths, batch_size=2, stats=stats))
+    assert (stats.images, stats.with_rois, stats.no_detections, stats.failed, stats.crops) == (5, 3, 1, 1, 3)
+    assert stats.no_detection_paths == [paths[1]]
+
+    # mismo resultado que detectar en CropView y luego clasificar los ROIs
+    sources = [(p, rois) for p, rois in det.detect_many(paths) if rois]
+    want = list(iter_crop_prediction_chunks(lm, cfg, sources, batch_size=2))
+    assert [f for b in got for f in b.files] == [f for b in want for f in b.files]
+    assert got[0].files[0].startswith(paths[0] + "#roi1_x20_y15_")
+    np.testing.assert_allclose(np.concatenate([b.probs for b in got]),
+                               np.concatenate([b.probs for b in want]), rtol=1e-5, atol=1e-6)
+
+    out = tmp_path / "out.csv"
+    args = ["--registry", str(reg), "pipeline", "--species", "Ceratitis", "--model", "tiny",
+            "--out", str(out), "--weights", str(weights), "--save-crops", str(tmp_path / "recortes"),
+            str(tmp_path / "imgs")]
+    assert cli.main(args) == 0
+    with open(out, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert sorted(r["file"] for r in rows) == sorted(f for b in got for f in b.files)
+    assert len(list((tmp_path / "recortes").iterdir())) == 3
+    # la imagen sin detecciones no tiene filas, pero queda procesada en la base
+    assert open_results_store(cfg).empty_images(f"cli-pipeline:{out.resolve()}") == [paths[1]]
+
+    Image.new("RGB", (200, 100), color=(1, 2, 3)).save(tmp_path / "imgs" / "m9.png")
+    capsys.readouterr()
+    assert cli.main(args) == 0
+    with open(out, newline="", encoding="utf-8") as f:
+        assert len(list(csv.DictReader(f))) == 4  # sólo la imagen nueva
+    assert "4 ya procesadas, 2 pendientes" in capsys.readouterr().err  # m9 y la ilegible
+
+
+def test_pipeline_decodes_jpeg_drafts_sized_for_the_detector(tmp_path, monkeypatch):
+    monkeypatch.setenv("IRFL_RUNS_DIR", str(tmp_path / "runs"))
+    monkeypatch.setenv("IRFL_PREDICTION_CACHE", "false")
+    monkeypatch.setenv("IRFL_TENSOR_CACHE_MB", "0")
+    reg = _tiny_project(tmp_path)
+    cfg = load_app_config()
+    assert cfg.jpeg_draft_decode and cfg.image_size == 224
+    lm = load_entry(Registry(str(reg)).get_model("Ceratitis", "tiny"), cfg)
+
+    paths = []
+    for w, h in ((3200, 2400), (1280, 960)):
+        ramp = np.linspace(0, 255, w, dtype=np.uint8)[None, :, None].repeat(h, 0).repeat(3, 2)
+        p = tmp_path / f"g{w}.jpg"
+        Image.fromarray(ramp).save(p, quality=90)
+        paths.append(str(p))
+
+    det = EyesDetector(tmp_path / "fake.pt")
+    det._model = _FakeYolo()
+    seen = []
+    predict = det._model.predict
+    det._model.predict = lambda source, **k: seen.extend(s.shape[:2] for s in source) or predict(source, **k)
+    got = list(iter_pipeline_chunks(lm, cfg, det, paths))
+
+    # YOLO recibe el draft (1/4 y 1/2) más chico que cubre su entrada de 640, y los ROIs
+    # vuelven en píxeles del original: la caja del doble (w/8, h/8, w/2, h/2)
+    assert seen == [(600, 800), (480, 640)]
+    files = [f for b in got for f in b.files]
+    assert files == [paths[0] + "#roi1_x400_y300_w1200_h900", paths[1] + "#roi1_x160_y120_w480_h360"]
+    # el ROI de la segunda mide 240x180 en el draft (< 224): se vuelve a leer como decode_crops
+    want = list(iter_crop_prediction_chunks(lm, cfg, [(paths[1], [(160, 120, 480, 360)])]))
+    np.testing.assert_allclose(got[0].probs[1], want[0].probs[0], rtol=1e-5, atol=1e-6)
+
+
+def test_pipeline_surfaces_detector_errors(tmp_path, monkeypatch):
+    monkeypatch.setenv("IRFL_RUNS_DIR", str(tmp_path / "runs"))
+    monkeypatch.setenv("IRFL_PREDICTION_CACHE", "false")
+    reg = _tiny_project(tmp_path)
+    cfg = load_app_config()
+    lm = load_entry(Registry(str(reg)).get_model("Ceratitis", "tiny"), cfg)
+
+    det = EyesDetector("fake.pt")
+    det._model = _FakeYolo()
+    det._model.predict = lambda *a, **k: (_ for _ in ()).throw(RuntimeError("yolo roto"))
+    with pytest.raises(RuntimeError, match="yolo roto"):
+        list(iter_pipeline_chunks(lm, cfg, det, _images(tmp_path / "imgs")))
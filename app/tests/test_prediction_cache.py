@@ -0,0 +1,103 @@
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import tensorflow as tf
+from PIL import Image
+
+from core.config import AppConfig
+from core.model_loader import LoadedModel
+from core.prediction_cache import PredictionCache
+from core.predictor import predict_files
+
+
+class CountingModel(tf.keras.Model):
+    def __init__(self, num_classes: int):
+        super().__init__()
+        self.num_classes = num_classes
+        self.calls = 0
+
+    def call(self, inputs, training=False):
+        self.calls += 1
+        # logits dependientes de la imagen: media por canal
+        return tf.reduce_mean(inputs, axis=[1, 2])[:, : self.num_classes] / 50.0
+
+
+def _lm(model, model_hash="m1"):
+    classes = ["a", "b", "c"]
+    return LoadedModel(
+        model=model,
+        classes=classes,
+        class_to_idx={c: i for i, c in enumerate(classes)},
+        idx_to_class={i: c for i, c in enumerate(classes)},
+        path="dummy.keras",
+        classes_path="dummy.json",
+        model_hash=model_hash,
+    )
+
+
+def test_second_run_is_served_from_cache():
+    # la caché compartida queda abierta: en Windows no se puede borrar el .sqlite
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as td:
+        paths = []
+        for i in range(5):
+            p = Path(td) / f"img_{i}.png"
+            Image.new("RGB", (64, 64), color=(40 * i, 200 - 30 * i, 90)).save(p)
+            paths.append(str(p))
+
+        cfg = AppConfig(runs_dir=str(Path(td) / "runs"), prediction_cache=True, batch_size=2)
+        model = CountingModel(3)
+
+        first = predict_files(_lm(model), cfg, paths)
+        calls_after_first = model.calls
+        assert calls_after_first == 3
+
+        second = predict_files(_lm(model), cfg, paths)
+        assert model.calls == calls_after_first  # ninguna llamada nueva al modelo
+        by_file = {p.file: p for p in first}
+        for p in second:
+            assert p.top1_class == by_file[p.file].top1_class
+            np.testing.assert_allclose(p.top1_prob, by_file[p.file].top1_prob, rtol=1e-6)
+
+        # otro hash para el mismo .keras => el modelo cambió, se invalida
+        predict_files(_lm(model, model_hash="m2"), cfg, paths)
+        assert model.calls == calls_after_first + 3
+
+
+def test_counters_and_bind_model():
+    with tempfile.TemporaryDirectory() as td:
+        cache = PredictionCache(Path(td) / "p.sqlite")
+        raw = np.array([0.1, 2.0, -1.0], dtype=np.float32)
+        cache.put_many([("img1", raw)], "m1", "v1")
+
+        assert cache.get("img1", "m1", "v1") is not None
+        assert cache.get("img1", "m1", "v2") is None
+        assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+        assert cache.bind_model("x.keras", "m1") == 0
+        assert cache.bind_model("x.keras", "m2") == 1
+        assert cache.get("img1", "m1", "v1") is None
+        cache.close()
+
+
+def test_cached_run_keeps_input_order_and_duplicates():
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as td:
+        paths = []
+        for i in range(5):
+            p = Path(td) / f"img_{i}.png"
+            Image.new("RGB", (64, 64), color=(40 * i, 200 - 30 * i, 90)).save(p)
+            paths.append(str(p))
+
+        model = CountingModel(3)
+        for bs in (1, 4):
+            cfg = AppConfig(runs_dir=str(Path(td) / f"runs{bs}"), prediction_cache=True, batch_size=bs)
+            # la misma ruta dos veces (en el mismo lote y en lotes distintos)
+            dup = [paths[0], paths[0], paths[1], paths[0]]
+            assert [p.file for p in predict_files(_lm(model), cfg, dup)] == dup
+
+            # aciertos (0, 2) mezclados con fallos (3, 4): el orden de entrada se conserva
+            mixed = [paths[3], paths[0], paths[4], paths[1], paths[0]]
+            preds = predict_files(_lm(model), cfg, mixed)
+            assert [p.file for p in preds] == mixed
+            again = predict_files(_lm(model), cfg, mixed)
+            assert [p.top1_prob for p in again] == [p.top1_prob for p in preds]
@@ -5,8 +5,9 @@ from pathlib import Path
 from PIL import Image
 import tensorflow as tf
 
-from core.predictor import predict_files, Prediction
-from core.model_loader import LoadedModel
+from core.predictor import predict_files, iter_prediction_chunks, inference_activity, Prediction, PredictionBatch
+import numpy as np
+from core.model_loader import LoadedModel, compile_inference
 from core.config import AppConfig
 
 # Modelo Keras minimal que ignora la imagen y devuelve logits fijos
@@ -49,4 +50,130 @@ def test_predictor_pipeline_with_dummy_model():
         assert 0.0 <= p.top1_prob <= 1.0
         assert set(p.full_probs.keys()) == set(classes)
     finally:
-        os.remove(img_path)
\ No newline at end of file
+        os.remove(img_path)
+
+def _dummy_lm(classes):
+    return LoadedModel(
+        model=DummyModel(num_classes=len(classes)),
+        classes=classes,
+        class_to_idx={c: i for i, c in enumerate(classes)},
+        idx_to_class={i: c for i, c in enumerate(classes)},
+        path="dummy.keras",
+        classes_path="dummy.json",
+    )
+
+def test_iter_prediction_chunks_respects_batch_size():
+    classes = ["-8", "-9", "-10"]
+    lm = _dummy_lm(classes)
+    cfg = AppConfig()
+    cfg.batch_size = 2
+
+    paths = [_tmp_image() for _ in range(5)]
+    try:
+        chunks = list(iter_prediction_chunks(lm, cfg, paths))
+        assert [len(c) for c in chunks] == [2, 2, 1]
+        # el orden de salida respeta el de entrada
+        assert [p.file for c in chunks for p in c] == paths
+        assert predict_files(lm, cfg, paths)[0].top1_class == classes[0]
+    finally:
+        for p in paths:
+            os.remove(p)
+
+def test_compiled_inference_matches_eager_with_padding():
+    classes = ["a", "b", "c"]
+    tf.keras.utils.set_random_seed(1)
+    model = tf.keras.Sequential([
+        tf.keras.Input((224, 224, 3)),
+        tf.keras.layers.GlobalAveragePooling2D(),
+        tf.keras.layers.Dense(len(classes)),
+    ])
+    common = dict(
+        classes=classes,
+        class_to_idx={c: i for i, c in enumerate(classes)},
+        idx_to_class={i: c for i, c in enumerate(classes)},
+        path="dummy.keras",
+        classes_path="dummy.json",
+    )
+    eager = LoadedModel(model=model, **common)
+    # static_batch fuerza el relleno del último lote (3 = 2 + 1 relleno a 2)
+    compiled = LoadedModel(model=model, infer=compile_inference(model, 224), static_batch=True, **common)
+
+    cfg = AppConfig()
+    cfg.batch_size = 2
+    paths = [_tmp_image() for _ in range(3)]
+    try:
+        a = predict_files(eager, cfg, paths)
+        b = predict_files(compiled, cfg, paths)
+        assert len(b) == 3
+        for pa, pb in zip(a, b):
+            assert pa.top1_class == pb.top1_class
+            assert abs(pa.top1_prob - pb.top1_prob) < 1e-5
+    finally:
+        for p in paths:
+            os.remove(p)
+
+def test_inference_activity_busy_while_chunks_pending():
+    lm = _dummy_lm(["a", "b"])
+    files = [_tmp_image() for _ in range(3)]
+    cfg = AppConfig()
+    assert not inference_activity.busy
+    gen = iter_prediction_chunks(lm, cfg, files, batch_size=2)
+    next(gen)
+    assert inference_activity.busy and not inference_activity.wait_idle(0.01)
+    list(gen)
+    assert not inference_activity.busy
+
+    gen = iter_prediction_chunks(lm, cfg, files, batch_size=2)
+    next(gen)
+    gen.close()  # abandonar la iteración también libera
+    assert inference_activity.wait_idle(0)
+
+def test_prediction_batch_matches_per_image_reference():
+    cfg = AppConfig()
+    rng = np.random.default_rng(0)
+    for c in (1, 2, 7):
+        classes = [f"c{j}" for j in range(c)]
+        probs = rng.dirichlet(np.ones(c), size=50).astype(np.float32)
+        probs[0] = 1.0 / c  # empate total
+        batch = PredictionBatch.from_probs([f"f{i}" for i in range(50)], probs, classes, cfg)
+        assert len(batch) == 50
+        for i, p in enumerate(batch):
+            pv = probs[i]
+            order = np.argsort(-pv, kind="stable")
+            p1 = float(pv[order[0]])
+            p2 = float(pv[order[1]]) if c > 1 else 0.0
+            assert p.top1_prob == p1 and (p.top2_prob or 0.0) == p2
+            assert pv[classes.index(p.top1_class)] == p1
+            gap = p1 - p2
+            want = ("high" if p1 >= cfg.confidence_threshold and gap >= cfg.top2_margin_pp
+                    else "ambiguous" if gap < cfg.top2_margin_pp else "low")
+            assert p.confidence == want and p.gap_pp == gap
+            assert p.full_probs == {k: float(v) for k, v in zip(classes, pv)}
+def test_softmax_head_gives_model_probs_once(tmp_path):
+    import json
+    from core.model_loader import load_keras_model
+    from core.preprocessor import load_and_preprocess
+    (tmp_path / "classes.json").write_text(json.dumps({"classes": ["a", "b", "c"]}), encoding="utf-8")
+    img = _tmp_image()
+    heads = {
+        "dense": [tf.keras.layers.Dense(3, activation="softmax")],
+        "layer": [tf.keras.layers.Dense(3), tf.keras.layers.Softmax()],
+    }
+    cfg = AppConfig(prediction_cache=False, tensor_cache_mb=0)
+    try:
+        x = load_and_preprocess(img, cfg.image_size, cfg.jpeg_draft_decode)[None, ...]
+        for name, head in heads.items():
+            tf.keras.utils.set_random_seed(0)
+            model = tf.keras.Sequential([tf.keras.Input((224, 224, 3)),
+                                         tf.keras.layers.GlobalAveragePooling2D(), *head])
+            path = tmp_path / f"{name}.keras"
+            model.save(path)
+            ref = model(x, training=False).numpy()[0]
+            for strip, kind in ((False, "probs"), (True, "logits")):
+                lm = load_keras_model(str(path), str(tmp_path / "classes.json"), strip_softmax=strip)
+                assert lm.output_kind == kind
+                got = next(iter_prediction_chunks(lm, cfg, [img]))
+                # misma distribución que la salida del modelo: una sola softmax
+                np.testing.assert_allclose(got.probs[0], ref, rtol=1e-5, atol=1e-6)
+    finally:
+        os.remove(img)
@@ -2,7 +2,7 @@ from PIL import Image
 import numpy as np
 import tempfile, os
 
-from core.preprocessor import load_and_preprocess
+from core.preprocessor import load_and_preprocess, batch_from_paths, iter_batches
 
 def test_preprocess_image():
     fd, path = tempfile.mkstemp(suffix=".jpg")
@@ -24,7 +24,7 @@ from PIL import Image
 import numpy as np
 import tempfile, os
 
-from core.preprocessor import load_and_preprocess
+from core.preprocessor import load_and_preprocess, batch_from_paths, iter_batches
 
 def test_preprocess_image():
     fd, path = tempfile.mkstemp(suffix=".jpg")
@@ -41,4 +41,78 @@ def test_preprocess_image():
         assert arr.min() >= 0.0 and arr.max() <= 255.0
     finally:
         if os.path.exists(path):
-            os.remove(path)
\ No newline at end of file
+            os.remove(path)
+
+def test_iter_batches_parallel_matches_serial():
+    paths = []
+    try:
+        for i in range(7):
+            fd, path = tempfile.mkstemp(suffix=".png")
+            os.close(fd)
+            Image.new("RGB", (320, 240), color=(30 * i, 100, 200 - 20 * i)).save(path)
+            paths.append(path)
+
+        got = list(iter_batches(paths, image_size=64, batch_size=3, workers=4))
+        assert [len(chunk) for chunk, _ in got] == [3, 3, 1]
+        assert [p for chunk, _ in got for p in chunk] == paths
+
+        parallel = np.concatenate([batch for _, batch in got], axis=0)
+        serial = batch_from_paths(paths, image_size=64)
+        assert parallel.dtype == np.float32
+        np.testing.assert_array_equal(parallel, serial)
+    finally:
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _camera_like_jpeg(path: str, seed: int, size=(2400, 1800)) -> None:
+    # Imagen grande con estructura suave + ruido, parecida a una captura de microscopio
+    rng = np.random.default_rng(seed)
+    w, h = size
+    yy, xx = np.mgrid[0:h, 0:w].astype(np.float32)
+    cx, cy = rng.uniform(0.3, 0.7) * w, rng.uniform(0.3, 0.7) * h
+    blob = np.exp(-(((xx - cx) / (0.15 * w)) ** 2 + ((yy - cy) / (0.15 * h)) ** 2))
+    rgb = np.stack([
+        255 * blob * rng.uniform(0.5, 1.0),
+        255 * (xx / w) * rng.uniform(0.3, 1.0),
+        255 * (yy / h) * rng.uniform(0.3, 1.0),
+    ], axis=-1)
+    rgb += rng.normal(0, 8, rgb.shape)
+    Image.fromarray(np.clip(rgb, 0, 255).astype(np.uint8)).save(path, quality=92)
+
+
+def test_jpeg_draft_decode_parity():
+    import tensorflow as tf
+
+    tf.keras.utils.set_random_seed(0)
+    model = tf.keras.Sequential([
+        tf.keras.Input((224, 224, 3)),
+        tf.keras.layers.AveragePooling2D(pool_size=16),
+        tf.keras.layers.Flatten(),
+        tf.keras.layers.Dense(5, kernel_initializer=tf.keras.initializers.RandomNormal(stddev=2e-3, seed=0)),
+        tf.keras.layers.Softmax(),
+    ])
+
+    paths = []
+    try:
+        for seed in range(4):
+            fd, path = tempfile.mkstemp(suffix=".jpg")
+            os.close(fd)
+            _camera_like_jpeg(path, seed)
+            paths.append(path)
+
+        full = batch_from_paths(paths, image_size=224, fast_decode=False)
+        fast = batch_from_paths(paths, image_size=224, fast_decode=True)
+        assert fast.shape == full.shape == (len(paths), 224, 224, 3)
+        # diferencia media por píxel pequeña (escala 0..255)
+        assert float(np.abs(fast - full).mean()) < 2.0
+
+        p_full = model(full, training=False).numpy()
+        p_fast = model(fast, training=False).numpy()
+        np.testing.assert_array_equal(p_full.argmax(axis=1), p_fast.argmax(axis=1))
+        np.testing.assert_allclose(p_fast, p_full, atol=0.02)
+    finally:
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
\ No newline at end of file
@@ -0,0 +1,45 @@
+import json
+
+from PIL import Image
+
+import cli
+from core import profiling
+from test_cli import _tiny_project
+
+
+def test_span_is_noop_when_disabled():
+    profiling.reset()
+    assert not profiling.enabled()
+    assert profiling.span("a") is profiling.span("b")
+    with profiling.span("a"):
+        pass
+    assert profiling.summary() == {}
+
+
+def test_cli_profile_exports_histograms_and_chrome_trace(tmp_path, monkeypatch):
+    monkeypatch.setenv("IRFL_RUNS_DIR", str(tmp_path / "runs"))
+    monkeypatch.setenv("IRFL_PREDICTION_CACHE", "false")
+    monkeypatch.setenv("IRFL_TENSOR_CACHE_MB", "0")
+    reg = _tiny_project(tmp_path)
+    imgs = tmp_path / "imgs"
+    imgs.mkdir()
+    for i in range(3):
+        Image.new("RGB", (100, 80), color=(40 * i, 60, 70)).save(imgs / f"f{i}.jpg")
+
+    prof = tmp_path / "prof"
+    args = ["--registry", str(reg), "--profile", str(prof), "predict", "--species", "Ceratitis",
+            "--model", "tiny", "--out", str(tmp_path / "out.csv"), "--no-global", str(imgs)]
+    try:
+        assert cli.main(args) == 0
+    finally:
+        profiling.reset()
+    assert not profiling.enabled()
+
+    stages = json.loads(next(p for p in prof.glob("*.json") if not p.name.endswith(".trace.json")).read_text(encoding="utf-8"))["stages"]
+    assert stages["decode"]["count"] == 3 and stages["preprocess"]["count"] == 3
+    assert {"model.call", "postprocess", "csv.write"} <= set(stages)
+    assert sum(stages["decode"]["histogram"].values()) == 3
+
+    trace = json.loads(next(prof.glob("*.trace.json")).read_text(encoding="utf-8"))
+    ev = trace["traceEvents"]
+    assert {e["ph"] for e in ev} == {"X"} and len(ev) >= 3 + 3 + 1 + 1 + 1
@@ -0,0 +1,40 @@
+import json
+from pathlib import Path
+
+from PIL import Image
+
+import cli
+from core.registry import Registry
+from test_cli import _tiny_project
+
+
+def test_quantize_registers_variants_with_accuracy_delta(tmp_path, monkeypatch):
+    monkeypatch.setenv("IRFL_RUNS_DIR", str(tmp_path / "runs"))
+    monkeypatch.setenv("IRFL_PREDICTION_CACHE", "false")
+    monkeypatch.setenv("IRFL_TENSOR_CACHE_MB", "0")
+    reg = _tiny_project(tmp_path)
+
+    val = tmp_path / "val"
+    for ci, cls in enumerate(["ef8", "ef9"]):
+        (val / cls).mkdir(parents=True)
+        for i in range(3):
+            Image.new("RGB", (90, 90), color=(200 * ci, 30 * i, 100)).save(val / cls / f"{i}.png")
+
+    args = ["--registry", str(reg), "quantize", "--species", "Ceratitis", "--model", "tiny",
+            "--calib-dir", str(val), "--val-dir", str(val)]
+    assert cli.main(args) == 0
+
+    models = Registry(reg).get_species("Ceratitis").models
+    for mode in ("dynamic", "float16", "int8"):
+        me = models[f"tiny_{mode}"]
+        assert me.backend == "tflite" and Path(me.path).is_file()
+        assert me.output == "probs"  # tiny.keras termina en softmax y la variante la conserva
+        assert "pp" in (me.description or "")
+
+    report = json.loads((tmp_path / "tiny_quant_report.json").read_text(encoding="utf-8"))
+    rows = {r["mode"]: r for r in report["variants"]}
+    assert set(rows) == {"float32", "dynamic", "float16", "int8"}
+    assert report["n_val"] == 6
+    for r in rows.values():
+        assert 0.0 <= r["accuracy"] <= 1.0
+        assert abs(r["delta_pp"] - 100 * (r["accuracy"] - rows["float32"]["accuracy"])) < 1e-6
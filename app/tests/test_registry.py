@@ -1,7 +1,7 @@
 from pathlib import Path
 import textwrap, tempfile
 
-from core.registry import Registry
+from core.registry import Registry, register_model
 
 MINIMAL_REGISTRY = textwrap.dedent("""
 species:
@@ -30,4 +30,33 @@ def test_registry_load_minimal():
         keys = set(reg.species_keys)
         assert {"Ludens", "Ceratitis"}.issubset(keys)
         assert "final" in reg.get_species("Ludens").models
-        assert "final" in reg.get_species("Ceratitis").models
\ No newline at end of file
+        assert "final" in reg.get_species("Ceratitis").models
+
+def test_register_model_adds_backend_entry():
+    with tempfile.TemporaryDirectory() as td:
+        reg_path = Path(td) / "registry.yaml"
+        reg_path.write_text(MINIMAL_REGISTRY, encoding="utf-8")
+
+        register_model(reg_path, "Ceratitis", "final_tflite",
+                       path=Path(td) / "models" / "final.tflite",
+                       classes_path="D:/dummy/classes.json", backend="tflite")
+
+        reg = Registry(str(reg_path))
+        me = reg.get_model("Ceratitis", "final_tflite")
+        assert me.backend == "tflite"
+        assert Path(me.path) == Path(td) / "models" / "final.tflite"
+        assert reg.get_model("Ceratitis", "final").backend == "keras"
+def test_registry_output_kind_is_validated():
+    import pytest
+    with tempfile.TemporaryDirectory() as td:
+        reg_path = Path(td) / "registry.yaml"
+        reg_path.write_text(MINIMAL_REGISTRY.replace(
+            'name: "final"\n', 'name: "final"\n        output: "logits"\n', 1), encoding="utf-8")
+        reg = Registry(str(reg_path))
+        assert reg.get_model("Ludens", "final").output == "logits"
+        assert reg.get_model("Ceratitis", "final").output == "auto"
+
+        reg_path.write_text(MINIMAL_REGISTRY.replace(
+            'name: "final"\n', 'name: "final"\n        output: "raw"\n', 1), encoding="utf-8")
+        with pytest.raises(ValueError):
+            Registry(str(reg_path))
@@ -0,0 +1,111 @@
+# app/tests/test_results_store.py
+
+import csv
+import logging
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from core.config import AppConfig
+from core.predictor import PredictionBatch
+from core.results_store import ResultsStore, open_results_store, record_results
+from core.storage import CSV_HEADER, append_predictions_csv
+
+LEGACY_CSV = Path(__file__).resolve().parents[1] / "runs_app" / "predictions.csv"
+
+
+def _read(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return [row[1:] for row in csv.reader(f)]  # sin timestamp
+
+
+def _batch(n, seed=0, classes=("ef1", "ef2", "ef3")):
+    probs = np.random.default_rng(seed).dirichlet(np.ones(len(classes)), size=n).astype(np.float32)
+    return PredictionBatch.from_probs([f"img_{seed}_{i}.jpg" for i in range(n)], probs, classes, AppConfig())
+
+
+def test_store_export_matches_csv_and_filters(tmp_path):
+    store = ResultsStore(tmp_path / "r.sqlite")
+    a, b = _batch(8, 1), _batch(5, 2)
+    run_a = store.start_run("Ceratitis", "final", "abc", a.classes)
+    store.add_predictions(run_a, a)
+    run_b = store.start_run("Ludens", "refit", "def", b.classes)
+    store.add_predictions(run_b, b.to_predictions())
+    assert store.count() == 13
+
+    append_predictions_csv(tmp_path / "ref.csv", "Ceratitis", "final", "abc", a)
+    assert store.export_csv(tmp_path / "out.csv", run_id=run_a) == 8
+    assert _read(tmp_path / "out.csv") == _read(tmp_path / "ref.csv")
+
+    ef = b.classes[int(b.top1[0])]
+    rows = list(store.query(model_key="refit", top1=ef, since="2000-01-01"))
+    assert rows and all(r["top1_class"] == ef and r["species"] == "Ludens" for r in rows)
+    assert len(rows) == int((b.top1 == b.top1[0]).sum())
+    assert not list(store.query(model_key="refit", until="2000-01-01"))
+    np.testing.assert_allclose(list(rows[0]["full_probs"].values()), b.probs[0], rtol=1e-6)
+
+
+def test_legacy_csv_is_migrated_once(tmp_path):
+    runs = tmp_path / "runs"
+    runs.mkdir()
+    shutil.copy(LEGACY_CSV, runs / "predictions.csv")  # sin encabezado
+    with open(LEGACY_CSV, newline="", encoding="utf-8") as f:
+        legacy = [r for r in csv.reader(f) if r and r != CSV_HEADER]
+
+    cfg = AppConfig(runs_dir=str(runs))
+    store = open_results_store(cfg)
+    assert store.count() == len(legacy)
+    assert store.import_csv(runs / "predictions.csv") == 0  # ya importado
+
+    # el CSV exportado reproduce las filas originales
+    store.export_csv(tmp_path / "all.csv")
+    with open(tmp_path / "all.csv", newline="", encoding="utf-8") as f:
+        exported = list(csv.reader(f))[1:]
+    assert sorted(exported) == sorted(legacy)
+
+    run = record_results(cfg, "Ceratitis", "tiny", "0f0f", _batch(4, 3))
+    assert record_results(cfg, "Ceratitis", "tiny", "0f0f", _batch(2, 4), run_id=run) == run
+    assert len(list(store.query(run_id=run))) == 6
+
+
+def test_malformed_legacy_rows_are_skipped_and_never_block_opening(tmp_path, monkeypatch, caplog):
+    runs = tmp_path / "runs"
+    runs.mkdir()
+    with open(LEGACY_CSV, newline="", encoding="utf-8") as f:
+        good = [r for r in csv.reader(f) if r and r != CSV_HEADER][:3]
+    bad = [
+        good[0][:5],                                   # columnas de menos
+        good[0][:6] + ["no-es-un-número"] + good[0][7:],
+        good[0][:11] + ["ef1:0.5;ef2"],                 # probs sin valor
+    ]
+    with open(runs / "predictions.csv", "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows([good[0], *bad, *good[1:]])
+        f.write('"comillas sin cerrar\x00,\n')
+
+    with caplog.at_level(logging.WARNING, logger="core.results_store"):
+        store = open_results_store(AppConfig(runs_dir=str(runs)))
+    assert store.count() == 3
+    assert store.skipped_rows == 4 and "4 filas mal formadas" in caplog.text
+
+    # un error inesperado en la migración se registra y la base se abre igual
+    other = tmp_path / "otra"
+    other.mkdir()
+    shutil.copy(runs / "predictions.csv", other / "predictions.csv")
+    monkeypatch.setattr(ResultsStore, "import_csv", lambda *a, **k: 1 / 0)
+    store = open_results_store(AppConfig(runs_dir=str(other)))
+    assert store.count() == 0 and "No se pudo migrar" in caplog.text
+
+
+def test_probs_blob_follows_export_full_prob_vector(tmp_path):
+    store = ResultsStore(tmp_path / "r.sqlite")
+    classes = ("ef1", "ef2", "ef3")
+    probs = np.random.default_rng(0).dirichlet(np.ones(3), size=2).astype(np.float32)
+    cfg = AppConfig(export_full_prob_vector=False)
+    b = PredictionBatch.from_probs(["a.jpg", "b.jpg"], probs, classes, cfg)
+    run = store.start_run("Ceratitis", "final", "abc", classes)
+    store.add_predictions(run, b)
+    store.add_predictions(run, b.to_predictions())
+    assert [r["full_probs"] for r in store.query()] == [{}] * 4
+    with store._lock:
+        assert store._con.execute("SELECT COUNT(*) FROM predictions WHERE probs IS NOT NULL").fetchone()[0] == 0
@@ -0,0 +1,32 @@
+import subprocess, sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parents[1]
+
+
+def _run(code: str) -> str:
+    proc = subprocess.run([sys.executable, "-c", code], cwd=APP_DIR,
+                          capture_output=True, text=True, timeout=120)
+    assert proc.returncode == 0, proc.stderr
+    return proc.stdout
+
+
+def test_core_imports_do_not_pull_heavy_frameworks():
+    out = _run(
+        "import sys\n"
+        "import core.predictor, core.model_loader, core.eyes_detector, core.storage, core.model_cache\n"
+        "print(sorted(m for m in ('tensorflow', 'torch', 'ultralytics') if m in sys.modules))\n"
+    )
+    assert out.strip() == "[]"
+
+
+def test_import_timing_report_lists_modules():
+    out = _run(
+        "from core import import_timing as it\n"
+        "it.install()\n"
+        "import colorsys, json.tool\n"
+        "it.mark('listo')\n"
+        "print(it.report())\n"
+    )
+    assert "listo" in out
+    assert "colorsys" in out and "json.tool" in out
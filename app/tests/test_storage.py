@@ -0,0 +1,39 @@
+import csv, sys
+
+import numpy as np
+
+from core.config import AppConfig
+from core.predictor import PredictionBatch
+from core.storage import append_predictions_csv
+
+
+def _read(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return [row[1:] for row in csv.reader(f)]  # sin timestamp
+
+
+def test_batch_and_prediction_rows_write_identical_csv(tmp_path):
+    rng = np.random.default_rng(1)
+    classes = ["-8", "-9", "-10"]
+    probs = rng.dirichlet(np.ones(3), size=20).astype(np.float32)
+    files = [f"img_{i}.jpg" for i in range(20)]
+    a = PredictionBatch.from_probs(files[:12], probs[:12], classes, AppConfig())
+    b = PredictionBatch.from_probs(files[12:], probs[12:], classes, AppConfig())
+    batch = PredictionBatch.concat([a, b])
+    assert len(batch) == 20 and batch[13].file == "img_13.jpg"
+    assert batch[-1].file == "img_19.jpg"
+
+    append_predictions_csv(tmp_path / "batch.csv", "Ceratitis", "m", "abc", batch)
+    append_predictions_csv(tmp_path / "preds.csv", "Ceratitis", "m", "abc", batch.to_predictions())
+    assert _read(tmp_path / "batch.csv") == _read(tmp_path / "preds.csv")
+
+
+def test_prediction_batch_is_much_smaller_than_prediction_objects():
+    n, classes = 2000, [str(-i) for i in range(10, 0, -1)]
+    probs = np.random.default_rng(0).dirichlet(np.ones(10), size=n).astype(np.float32)
+    batch = PredictionBatch.from_probs([f"f{i}" for i in range(n)], probs, classes, AppConfig())
+
+    preds = batch.to_predictions()
+    dict_bytes = sum(sys.getsizeof(p) + sys.getsizeof(p.full_probs)
+                     + sum(sys.getsizeof(v) for v in p.full_probs.values()) for p in preds)
+    assert batch.nbytes * 10 < dict_bytes
@@ -0,0 +1,61 @@
+import os, tempfile
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from core.preprocessor import iter_batches, preprocess_signature
+from core.tensor_cache import TensorCache
+
+
+def _images(folder: Path, n: int) -> list[str]:
+    out = []
+    for i in range(n):
+        p = folder / f"img_{i}.jpg"
+        Image.new("RGB", (300, 200), color=(20 * i, 80, 160)).save(p)
+        out.append(str(p))
+    return out
+
+
+def test_cache_hit_skips_decode_and_matches():
+    with tempfile.TemporaryDirectory() as td:
+        paths = _images(Path(td), 4)
+        cache = TensorCache(Path(td) / "cache", max_bytes=64 << 20)
+
+        first = np.concatenate([b for _, b in iter_batches(paths, 64, 3, workers=2, cache=cache)])
+        assert cache.misses == 4 and cache.hits == 0 and len(cache) == 4
+
+        second = np.concatenate([b for _, b in iter_batches(paths, 64, 3, workers=2, cache=cache)])
+        assert cache.hits == 4
+        np.testing.assert_array_equal(first, second)
+
+        # el índice sobrevive a una nueva sesión
+        assert len(TensorCache(Path(td) / "cache", max_bytes=64 << 20)) == 4
+
+
+def test_key_changes_with_file_and_signature():
+    with tempfile.TemporaryDirectory() as td:
+        path = _images(Path(td), 1)[0]
+        k1 = TensorCache.key_for(path, preprocess_signature(224))
+        assert k1 != TensorCache.key_for(path, preprocess_signature(256))
+        assert k1 != TensorCache.key_for(path, preprocess_signature(224, fast_decode=False))
+
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        assert k1 != TensorCache.key_for(path, preprocess_signature(224))
+
+
+def test_lru_eviction_respects_cap():
+    with tempfile.TemporaryDirectory() as td:
+        arr = np.zeros((32, 32, 3), dtype=np.float32)  # ~12 KB por entrada
+        entry = arr.nbytes + 128
+        cache = TensorCache(td, max_bytes=3 * entry)
+        for k in ("aa1", "bb2", "cc3"):
+            cache.put(k, arr)
+        assert cache.get("aa1") is not None  # "aa1" pasa a ser el más reciente
+        cache.put("dd4", arr)
+
+        assert cache.evictions == 1
+        assert cache.get("bb2") is None
+        assert cache.get("aa1") is not None
+        assert cache.resident_bytes <= 3 * entry
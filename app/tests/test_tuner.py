@@ -0,0 +1,51 @@
+import json
+
+import cli
+from core import tuner
+from core.tuner import pick_best
+from test_cli import _tiny_project
+
+
+def test_pick_best_respects_memory_budget():
+    rows = [
+        {"batch_size": 8, "threads": None, "images_per_s": 50.0, "peak_rss_mb": 900.0},
+        {"batch_size": 32, "threads": 4, "images_per_s": 80.0, "peak_rss_mb": 2500.0},
+    ]
+    assert pick_best(rows)["batch_size"] == 32
+    assert pick_best(rows, max_rss_mb=1000)["batch_size"] == 8
+    assert pick_best(rows, max_rss_mb=100) is None
+
+    # sin RSS medido, la fila no pasa el presupuesto
+    rows.append({"batch_size": 64, "threads": 4, "images_per_s": 99.0, "peak_rss_mb": None})
+    assert pick_best(rows)["batch_size"] == 64
+    assert pick_best(rows, max_rss_mb=1000)["batch_size"] == 8
+
+
+def test_cli_tune_writes_best_config(tmp_path, monkeypatch):
+    monkeypatch.setenv("IRFL_RUNS_DIR", str(tmp_path / "runs"))
+    monkeypatch.setenv("IRFL_CONFIG_DIR", str(tmp_path / "config"))
+    monkeypatch.setenv("IRFL_TENSOR_CACHE_MB", "64")
+    reg = _tiny_project(tmp_path)
+    cfg_path = tmp_path / "config" / "app_config.json"
+    cfg_path.parent.mkdir()
+    original = ('{\r\n  "runs_dir": "app/runs_app",\r\n\r\n  "batch_size": 16,\r\n'
+                '  "tf_num_threads": 2,\r\n  "theme": "dark"\r\n}')
+    cfg_path.write_bytes(original.encode("utf-8"))
+
+    args = ["--registry", str(reg), "tune", "--species", "Ceratitis", "--model", "tiny",
+            "--batch-sizes", "1", "4", "--threads", "0", "--min-seconds", "0.05"]
+    assert cli.main(args) == 0
+    saved = json.loads(cfg_path.read_text(encoding="utf-8"))
+    assert saved["batch_size"] in (1, 4)
+    # sólo cambian esos dos valores: ni rutas resueltas ni IRFL_*, y el formato se mantiene
+    want = original.replace('"batch_size": 16', f'"batch_size": {saved["batch_size"]}')
+    assert cfg_path.read_bytes().decode("utf-8") == want.replace('"tf_num_threads": 2', '"tf_num_threads": null')
+
+
+def test_cli_tune_rejects_rss_budget_it_cannot_measure(tmp_path, monkeypatch):
+    monkeypatch.setenv("IRFL_RUNS_DIR", str(tmp_path / "runs"))
+    monkeypatch.setattr(tuner, "peak_rss_bytes", lambda: None)
+    reg = _tiny_project(tmp_path)
+    args = ["--registry", str(reg), "tune", "--species", "Ceratitis", "--model", "tiny",
+            "--max-rss-mb", "4000"]
+    assert cli.main(args) == 1
@@ -0,0 +1,132 @@
+# app/tests/test_yolo_onnx.py
+
+import os
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from core import eyes_detector, yolo_onnx
+from core.eyes_detector import EyesDetector
+from core.yolo_onnx import decode, letterbox, nms, resize_linear
+
+
+def _fake_yolo_onnx(path, head, imgsz=64):
+    """ONNX con la forma de un YOLOv8 exportado: [N,3,S,S] -> [N,4+C,A] constante (`head`)."""
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+
+    head = np.asarray(head, dtype=np.float32)[None]
+    nodes = [
+        helper.make_node("ReduceMean", ["images"], ["m"], axes=[1, 2, 3], keepdims=1),
+        helper.make_node("Reshape", ["m", "shape"], ["m3"]),
+        helper.make_node("Mul", ["m3", "zero"], ["z"]),
+        helper.make_node("Add", ["z", "head"], ["output0"]),
+    ]
+    graph = helper.make_graph(
+        nodes, "fake_yolo",
+        [helper.make_tensor_value_info("images", TensorProto.FLOAT, ["batch", 3, imgsz, imgsz])],
+        [helper.make_tensor_value_info("output0", TensorProto.FLOAT, None)],
+        [numpy_helper.from_array(np.array([-1, 1, 1], np.int64), "shape"),
+         numpy_helper.from_array(np.zeros(1, np.float32), "zero"),
+         numpy_helper.from_array(head, "head")],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)])
+    model.ir_version = 8
+    helper.set_model_props(model, {"imgsz": f"[{imgsz}, {imgsz}]", "names": "{0: 'ojo'}"})
+    onnx.save(model, str(path))
+
+
+def test_letterbox_decode_and_nms():
+    img = np.zeros((64, 128, 3), np.uint8)
+    out, gain, pad = letterbox(img, (64, 64))
+    assert out.shape == (64, 64, 3) and gain == 0.5 and pad == (0.0, 16.0)
+    assert (out[:16] == 114).all() and (out[16:48] == 0).all()
+
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 11, 11], [20, 20, 30, 30]], np.float32)
+    assert nms(boxes, np.array([0.8, 0.9, 0.5]), 0.5).tolist() == [1, 2]
+
+    # 2 clases, 3 anclas: la segunda ancla no pasa conf
+    pred = np.array([[10, 40, 40], [10, 40, 40], [4, 8, 8], [4, 8, 8],
+                     [0.9, 0.1, 0.2], [0.0, 0.2, 0.7]], np.float32)
+    b, s = decode(pred, 0.25)
+    np.testing.assert_allclose(b, [[8, 8, 12, 12], [36, 36, 44, 44]])
+    np.testing.assert_allclose(s, [0.9, 0.7])
+
+
+def test_letterbox_downscales_non_square_like_cv2_inter_linear(monkeypatch):
+    img = (np.arange(24).reshape(4, 6, 1) * [10, 7, 3]).astype(np.uint8)
+    monkeypatch.setattr(yolo_onnx, "cv2", None)  # el mismo resultado sin cv2
+    out, gain, pad = letterbox(img, (5, 5))
+    assert out.shape == (5, 5, 3) and pad == (0.0, 1.0)
+    assert (out[[0, 4]] == 114).all()
+    # valores de cv2.resize(..., INTER_LINEAR); el BILINEAR de PIL (con antialias) da 20, 32, 43...
+    np.testing.assert_array_equal(out[1:4, :, 0], [[11, 23, 35, 47, 59],
+                                                   [91, 103, 115, 127, 139],
+                                                   [171, 183, 195, 207, 219]])
+    np.testing.assert_array_equal(out[1:4, :, 1], [[8, 16, 24, 33, 41],
+                                                   [64, 72, 81, 89, 97],
+                                                   [120, 128, 136, 145, 153]])
+
+
+def test_resize_linear_matches_cv2():
+    cv2 = pytest.importorskip("cv2")
+    rng = np.random.default_rng(0)
+    for (h, w), (nh, nw) in (((1200, 1600), (480, 640)), ((37, 91), (13, 29)), ((64, 128), (32, 64)),
+                             ((7, 13), (30, 51)), ((999, 1001), (640, 641))):
+        img = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+        np.testing.assert_array_equal(resize_linear(img, nw, nh),
+                                      cv2.resize(img, (nw, nh), interpolation=cv2.INTER_LINEAR))
+
+
+def test_onnx_detector_runs_without_torch(tmp_path):
+    # cajas en el espacio 64x64 del letterbox: (cx, cy, w, h, puntaje)
+    head = np.array([[32, 33, 12], [32, 32, 40], [20, 20, 8], [10, 10, 8], [0.9, 0.8, 0.1]], np.float32)
+    weights = tmp_path / "eyes.onnx"
+    _fake_yolo_onnx(weights, head)
+
+    paths = []
+    for name, size in (("ancha.jpg", (128, 64)), ("cuadrada.png", (64, 64))):
+        Image.new("RGB", size, color=(120, 80, 40)).save(tmp_path / name)
+        paths.append(str(tmp_path / name))
+
+    det = EyesDetector(weights)
+    assert det.is_onnx
+    # la segunda caja se solapa con la primera (NMS) y la tercera no pasa conf
+    assert det.detect(paths[0]) == [(44, 22, 40, 20)]  # (22,27,42,37) -16 en y, /0.5
+    assert det.detect_many(paths, batch_size=2) == [(paths[0], [(44, 22, 40, 20)]),
+                                                    (paths[1], [(22, 27, 20, 10)])]
+    assert eyes_detector._YOLO is None and "torch" not in sys.modules
+
+
+def test_onnx_export_matches_pt_boxes(tmp_path):
+    pytest.importorskip("ultralytics")
+    try:
+        pt = eyes_detector._resolve_weights_path().with_name(eyes_detector.MODEL_FILENAME)
+    except FileNotFoundError:
+        pytest.skip("sin pesos del detector de ojos")
+    if not pt.is_file():
+        pytest.skip("sin eyes_yolov8n_best.pt")
+    onnx_path = eyes_detector.export_detector_onnx(pt, tmp_path / "eyes.onnx")
+
+    # fotos reales si se indican; además imágenes cuadradas de 640 (sin reescalar ni
+    # rellenar) y no cuadradas más grandes, que pasan por el resize y el relleno
+    src = os.environ.get("IRFL_EYES_SAMPLES")
+    paths = [e.path for e in sorted(os.scandir(src), key=lambda e: e.name)][:8] if src else []
+    rng = np.random.default_rng(0)
+    for i, (h, w) in enumerate(((640, 640), (640, 640), (640, 640), (1200, 1600), (900, 500), (481, 1013))):
+        p = tmp_path / f"s{i}.png"
+        Image.fromarray(rng.integers(0, 255, (h, w, 3), dtype=np.uint8)).save(p)
+        paths.append(str(p))
+
+    def iou(a, b):
+        ix = max(0, min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0]))
+        iy = max(0, min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1]))
+        return ix * iy / (a[2] * a[3] + b[2] * b[3] - ix * iy)
+
+    pt_det, onnx_det = EyesDetector(pt), EyesDetector(onnx_path)
+    for strict, loose in ((pt_det, onnx_det), (onnx_det, pt_det)):
+        for (_, want), (_, got) in zip(strict.detect_many(paths, conf=0.3), loose.detect_many(paths, conf=0.2)):
+            for box in want:
+                assert any(iou(box, g) > 0.9 for g in got), (box, got)
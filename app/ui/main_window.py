@@ -5,6 +5,8 @@ from pathlib import Path
 from typing import Optional
 import sys
 import os
+import tempfile
+import time
 
 from PySide6.QtCore import Qt, Signal, Slot
 from PySide6.QtWidgets import (
@@ -14,11 +16,14 @@ from PySide6.QtWidgets import (
 from PySide6.QtGui import QIcon
 from PySide6.QtCore import QStandardPaths
 
+from core import import_timing, profiling
 from core.config import load_app_config, AppConfig
+from core.eyes_detector import EyesDetector, default_eyes_detector
 from core.registry import Registry
 from core.model_loader import LoadedModel
 from core.predictor import predict_files
-from core.storage import append_to_global_csv, export_run_csv
+from core.results_store import record_results
+from core.storage import export_run_csv
 from core.utils import iter_images_in_paths, file_sha1
 
 from core.model_manager import ModelManager
@@ -51,6 +56,8 @@ class MainWindow(QMainWindow):
 
         # Estado básico / config
         self.cfg: AppConfig = load_app_config()
+        if self.cfg.profiling:
+            profiling.enable()
 
         # >>> Importante: NO pisar el Registry autodetectado
         # Usa el que te pasan o crea uno que autodetecta registry.yaml (works en dev y frozen)
@@ -60,6 +67,7 @@ class MainWindow(QMainWindow):
         self.selected_model_key: Optional[str] = None
         self.loaded: Optional[LoadedModel] = None
         self.model_hash: str = ""
+        self._eyes_detector: Optional[EyesDetector] = None  # para "Auto YOLO → clasificar" (carga perezosa)
 
         # Ventana
         self.setWindowTitle("IRFLies - Age Classifier")
@@ -73,6 +81,7 @@ class MainWindow(QMainWindow):
         self.model_manager = ModelManager()
         self.model_manager.sig_loaded.connect(self._on_model_loaded)
         self.model_manager.sig_error.connect(self._on_model_error)
+        self.model_manager.sig_engine_ready.connect(self._on_engine_ready)
 
         # UI
         self._build_topbar()
@@ -81,6 +90,22 @@ class MainWindow(QMainWindow):
         # señales
         self.sig_predict_many.connect(self._on_predict_many)
 
+        self.lbl_status.setText("Cargando motor…")
+
+    def start_engine(self):
+        """Importa e inicializa TensorFlow en segundo plano (la ventana ya está visible)."""
+        self.model_manager.start_engine()
+
+    @Slot(str)
+    def _on_engine_ready(self, err: str):
+        import_timing.mark("motor listo")
+        if import_timing.enabled():
+            print(import_timing.report(), file=sys.stderr, flush=True)
+        if err:
+            QMessageBox.warning(self, "Motor de inferencia", f"No se pudo inicializar TensorFlow:\n{err}")
+        if not self.selected_model_key:
+            self.lbl_status.setText("Listo")
+
     # ---------- UI scaffolding ----------
     def _build_topbar(self):
         top = QWidget()
@@ -96,6 +121,10 @@ class MainWindow(QMainWindow):
         self.btn_open = QPushButton("Abrir imágenes…")
         self.btn_open.clicked.connect(self._open_files)
 
+        self.btn_auto = QPushButton("Auto YOLO → clasificar…")
+        self.btn_auto.setToolTip("Detecta los ojos y clasifica los recortes sin pasar por el editor de ROIs")
+        self.btn_auto.clicked.connect(self._open_files_auto)
+
         self.btn_export = QPushButton("Exportar último lote")
         self.btn_export.setEnabled(False)
         self.btn_export.clicked.connect(self._export_last_batch)
@@ -103,6 +132,7 @@ class MainWindow(QMainWindow):
         lay.addWidget(self.lbl_status, 1, alignment=Qt.AlignLeft)
         lay.addWidget(self.btn_metrics, 0, alignment=Qt.AlignRight)
         lay.addWidget(self.btn_open, 0, alignment=Qt.AlignRight)
+        lay.addWidget(self.btn_auto, 0, alignment=Qt.AlignRight)
         lay.addWidget(self.btn_export, 0, alignment=Qt.AlignRight)
 
         wrapper = QWidget()
@@ -158,7 +188,12 @@ class MainWindow(QMainWindow):
         self.selected_species_key = species_key
         self.selected_model_key = model_key
 
-        self._set_busy(True, f"Cargando modelo {model_key}…")
+        # la carga pedida no compite con precargas de la selección anterior
+        self.model_manager.cancel_prefetch()
+        if self.model_manager.engine_ready:
+            self._set_busy(True, f"Cargando modelo {model_key}…")
+        else:
+            self._set_busy(True, f"Cargando motor… (luego {model_key})")
         self.model_manager.load_async(model_key, me)
 
     @Slot(str, object)
@@ -177,7 +212,7 @@ class MainWindow(QMainWindow):
             return
 
         self.loaded = lm
-        self.model_hash = file_sha1(lm.path)
+        self.model_hash = lm.model_hash or file_sha1(lm.path)
 
         self.lbl_status.setText(
             f"Especie: {self.selected_species_key} | Modelo: {self.selected_model_key} | Clases: {', '.join(lm.classes)}"
@@ -188,6 +223,11 @@ class MainWindow(QMainWindow):
 
         self._set_busy(False)
 
+        if self.cfg.prefetch_variants:
+            # el resto de variantes de la especie, para cambiar de modelo sin esperar
+            sp = self.registry.get_species(self.selected_species_key or "")
+            self.model_manager.prefetch(m for k, m in sp.models.items() if k != self.selected_model_key)
+
     @Slot(str, str)
     def _on_model_error(self, model_key: str, err: str):
         if model_key != (self.selected_model_key or ""):
@@ -209,7 +249,7 @@ class MainWindow(QMainWindow):
         self.home.hide_busy()
 
         self.home.show_prediction(preds[0])
-        append_to_global_csv(
+        record_results(
             self.cfg,
             self.selected_species_key or "",
             self.selected_model_key or "",
@@ -233,6 +273,37 @@ class MainWindow(QMainWindow):
         self.crop.load_images(paths)
         self.stack.setCurrentWidget(self.crop)
 
+    def _open_files_auto(self):
+        # Pipeline: YOLO sobre cada imagen y sus ROIs directo al clasificador
+        if not self.loaded:
+            QMessageBox.information(self, "Selecciona primero", "Elige modelo antes de abrir imágenes.")
+            return
+        files, _ = QFileDialog.getOpenFileNames(
+            self, "Selecciona imágenes", str(Path.home()),
+            "Imágenes (*.jpg *.jpeg *.png *.bmp)"
+        )
+        if not files:
+            return
+        try:
+            if self._eyes_detector is None:
+                self._eyes_detector = default_eyes_detector(self.cfg)
+        except Exception as e:
+            QMessageBox.critical(self, "Detector de ojos", f"No se pudo preparar YOLO:\n{e}")
+            return
+        crops_dir = ""
+        if self.cfg.save_crop_files:
+            crops_dir = str(Path(tempfile.gettempdir()) / "IRFLies" / "crops" / time.strftime("%Y%m%d_%H%M%S"))
+        self.stack.setCurrentWidget(self.batch)
+        self.batch.run_batch(
+            self.loaded,
+            self.selected_species_key or "",
+            self.selected_model_key or "",
+            self.model_hash,
+            iter_images_in_paths(files),
+            crops_dir=crops_dir,
+            detector=self._eyes_detector,
+        )
+
     @Slot(list)
     def _on_predict_many(self, paths: list[str]):
         if not self.loaded:
@@ -312,6 +383,7 @@ class MainWindow(QMainWindow):
                 self.lbl_status.setText("Listo")
         self.btn_metrics.setEnabled(not busy and bool(self.loaded))
         self.btn_open.setEnabled(not busy)
+        self.btn_auto.setEnabled(not busy)
         self.btn_export.setEnabled(not busy and self.btn_export.isEnabled())
         
     def _open_cropper_single(self, path: str):
@@ -328,8 +400,8 @@ class MainWindow(QMainWindow):
         self.crop.load_images(paths)
         self.stack.setCurrentWidget(self.crop)
 
-    def _on_crops_ready(self, crop_paths: list[str]):
-        # Reutilizamos tu flujo batch sin tocar predictor
+    def _on_crops_ready(self, crops: list, crops_dir: str):
+        # Mismo flujo batch; los ROIs van al predictor en memoria
         if not self.loaded:
             QMessageBox.warning(self, "Sin modelo", "Selecciona modelo primero.")
             return
@@ -339,8 +411,18 @@ class MainWindow(QMainWindow):
             self.selected_species_key or "",
             self.selected_model_key or "",
             self.model_hash,
-            crop_paths
+            [],
+            crops=crops,
+            crops_dir=crops_dir,
         )
         if self.batch.has_results():
             self.btn_export.setEnabled(True)
 
+    def closeEvent(self, event):
+        self.model_manager.cancel_prefetch()
+        if profiling.enabled():
+            # histogramas + trace de Chrome, para diagnosticar equipos lentos a distancia
+            out = Path(self.cfg.runs_dir) / "profiles"
+            for path in profiling.export_all(out):
+                print(f"Perfil guardado: {path}", file=sys.stderr, flush=True)
+        super().closeEvent(event)
\ No newline at end of file
@@ -1,36 +1,77 @@
 # app/ui/views/BatchView.py
 
 from __future__ import annotations
-from typing import List
+from typing import List, Optional
 
 from PySide6.QtCore import Qt, Signal, QThread, QObject
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QProgressBar
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QProgressBar, QMessageBox
 
 from core.config import AppConfig
 from core.model_loader import LoadedModel
-from core.predictor import predict_files, Prediction
+from core.crops import CropSource
+from core.eyes_detector import EyesDetector
+from core.pipeline import PipelineStats, iter_pipeline_chunks
+from core.predictor import iter_crop_prediction_chunks, iter_prediction_chunks, PredictionBatch
+from core.results_store import record_results
 
 from ..widgets.BatchTable import BatchTable
 
 
 class Worker(QObject):
     sig_progress = Signal(int, int)           # done, total
-    sig_results = Signal(list)                # List[Prediction]
-
-    def __init__(self, lm: LoadedModel, cfg: AppConfig, paths: List[str]):
+    sig_chunk = Signal(object)                # PredictionBatch de un lote
+    sig_error = Signal(str)
+    sig_finished = Signal()
+
+    def __init__(self, lm: LoadedModel, cfg: AppConfig, paths: List[str],
+                 species: str, model_key: str, model_hash: str,
+                 crops: Optional[List[CropSource]] = None, crops_dir: str = "",
+                 detector: Optional[EyesDetector] = None):
         super().__init__()
         self.lm = lm
         self.cfg = cfg
         self.paths = paths
+        self.crops = crops          # [(imagen, rois)]: se clasifican los recortes en memoria
+        self.crops_dir = crops_dir  # carpeta para guardar los recortes ("" = no guardar)
+        self.detector = detector    # si está: YOLO sobre `paths` y se clasifican sus ROIs (pipeline)
+        self.species = species
+        self.model_key = model_key
+        self.model_hash = model_hash
+        self.run_id = None  # corrida en la base de resultados (se crea con el primer lote)
         self._stop = False
 
     def stop(self):  # opcional
         self._stop = True
 
     def run(self):
-        # Simple: una sola pasada (si necesitas chunks, puedes trocear aquí)
-        preds = predict_files(self.lm, self.cfg, self.paths)
-        self.sig_results.emit(preds)
+        # Por lotes: cada trozo se persiste y se muestra en cuanto sale del modelo
+        stats = None
+        if self.detector is not None:
+            total, stats = len(self.paths), PipelineStats()
+            chunks = iter_pipeline_chunks(self.lm, self.cfg, self.detector, self.paths,
+                                          save_dir=self.crops_dir or None, stats=stats)
+        elif self.crops is not None:
+            total = sum(len(rois) for _, rois in self.crops)
+            chunks = iter_crop_prediction_chunks(self.lm, self.cfg, self.crops, save_dir=self.crops_dir or None)
+        else:
+            total = len(self.paths)
+            chunks = iter_prediction_chunks(self.lm, self.cfg, self.paths)
+        done = 0
+        self.sig_progress.emit(done, total)
+        try:
+            for chunk in chunks:
+                self.run_id = record_results(self.cfg, self.species, self.model_key, self.model_hash,
+                                             chunk, run_id=self.run_id)
+                done += len(chunk)
+                self.sig_chunk.emit(chunk)
+                self.sig_progress.emit(stats.images if stats else done, total)
+                if self._stop:
+                    break
+            if stats:
+                self.sig_progress.emit(total, total)
+        except Exception as e:
+            self.sig_error.emit(str(e))
+        self.sig_finished.emit()
 
 
 class BatchView(QWidget):
@@ -41,7 +82,7 @@ class BatchView(QWidget):
     def __init__(self, cfg: AppConfig):
         super().__init__()
         self.cfg = cfg
-        self._results: List[Prediction] = []
+        self._results: List[PredictionBatch] = []  # un lote por trozo (arrays, no dicts por imagen)
         self._build()
 
     def _build(self):
@@ -67,35 +108,60 @@ class BatchView(QWidget):
         lay.addWidget(self.table)
 
     # ---------- External API ----------
-    def run_batch(self, lm: LoadedModel, species: str, model_key: str, model_hash: str, paths: List[str]):
+    def run_batch(self, lm: LoadedModel, species: str, model_key: str, model_hash: str, paths: List[str],
+                  crops: Optional[List[CropSource]] = None, crops_dir: str = "",
+                  detector: Optional[EyesDetector] = None):
+        """
+        Clasifica `paths`, o los ROIs de `crops` ([(imagen, rois)]) si se pasan.
+        Con `detector`, detecta ojos en `paths` y clasifica esos ROIs en la misma pasada.
+        """
         self._results = []
         self.table.clear_rows()
+        total = sum(len(r) for _, r in crops) if crops is not None and detector is None else len(paths)
+        self.progress.setRange(0, max(1, total))
+        self.progress.setValue(0)
         self.progress.setVisible(True)
 
         self.thread = QThread(self)
-        self.worker = Worker(lm, self.cfg, paths)
+        self.worker = Worker(lm, self.cfg, paths, species, model_key, model_hash, crops, crops_dir, detector)
         self.worker.moveToThread(self.thread)
 
         self.thread.started.connect(self.worker.run)
-        self.worker.sig_results.connect(lambda preds: self._on_results(preds, species, model_key, model_hash))
-        self.worker.sig_results.connect(self.thread.quit)
-        self.worker.sig_results.connect(self.worker.deleteLater)
+        self.worker.sig_chunk.connect(lambda preds: self._on_chunk(preds, species, model_key, model_hash))
+        self.worker.sig_progress.connect(self._on_progress)
+        self.worker.sig_error.connect(self._on_error)
+        self.worker.sig_finished.connect(self._on_finished)
+        self.worker.sig_finished.connect(self.thread.quit)
+        self.worker.sig_finished.connect(self.worker.deleteLater)
         self.thread.finished.connect(lambda: self.progress.setVisible(False))
         self.thread.finished.connect(self.thread.deleteLater)
 
         self.thread.start()
 
-    def _on_results(self, preds: List[Prediction], species: str, model_key: str, model_hash: str):
-        self._results = preds
-        self.table.populate(preds, species, model_key, model_hash)
+    def _on_chunk(self, preds: PredictionBatch, species: str, model_key: str, model_hash: str):
+        self._results.append(preds)
+        self.table.append_rows(preds, species, model_key, model_hash)
+
+    def _on_progress(self, done: int, total: int):
+        self.progress.setRange(0, max(1, total))
+        self.progress.setValue(done)
+        self.lbl_info.setText(f"Procesadas {done} / {total} imágenes")
+
+    def _on_error(self, msg: str):
+        QMessageBox.critical(self, "Error en inferencia", msg)
+
+    def _on_finished(self):
         self.progress.setVisible(False)
-        self.sig_results_ready.emit() 
+        if self._results:
+            self.sig_results_ready.emit()
 
     def has_results(self) -> bool:
-        return len(self._results) > 0
+        return any(len(b) for b in self._results)
 
-    def get_results(self) -> List[Prediction]:
-        return list(self._results)
+    def get_results(self) -> PredictionBatch:
+        # compacta los trozos en un solo lote (y lo conserva así)
+        self._results = [PredictionBatch.concat(self._results)]
+        return self._results[0]
 
     def clear(self):
         self._results = []
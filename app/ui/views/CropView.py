@@ -3,15 +3,15 @@ from __future__ import annotations
 import os, tempfile, time
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 
-from PySide6.QtCore import Qt, Signal
+from PySide6.QtCore import Qt, Signal, QThread, QObject
 from PySide6.QtGui import QPixmap
 from PySide6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QListWidget, QListWidgetItem, QMessageBox
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QListWidget, QListWidgetItem, QMessageBox,
+    QProgressBar
 )
 
-from PIL import Image
 from ..widgets.CropGraphicsView import CropGraphicsView
 from core.eyes_detector import default_eyes_detector, EyesDetector
 
@@ -20,12 +20,52 @@ class _ImgState:
     path: str
     rois: List[Tuple[int,int,int,int]]  # (x,y,w,h)
 
+class _DetectWorker(QObject):
+    """Pasa por YOLO, en lotes, las imágenes (índice, ruta) de la sesión."""
+    sig_chunk = Signal(list)          # [(índice, rois | None)] de un lote
+    sig_progress = Signal(int, int)   # hechas, total
+    sig_error = Signal(str)
+    sig_finished = Signal()
+
+    def __init__(self, det: EyesDetector, targets: List[Tuple[int, str]], conf: float, batch_size: int):
+        super().__init__()
+        self.det = det
+        self.targets = targets
+        self.conf = conf
+        self.batch_size = batch_size
+        self._stop = False
+
+    def stop(self):
+        self._stop = True
+
+    def run(self):
+        done, total = 0, len(self.targets)
+        self.sig_progress.emit(done, total)
+        idx_of = {}
+        for i, p in self.targets:
+            idx_of.setdefault(p, []).append(i)
+        try:
+            chunks = self.det.iter_detect([p for _, p in self.targets], conf=self.conf,
+                                          batch_size=self.batch_size)
+            for chunk in chunks:
+                self.sig_chunk.emit([(i, rois) for p, rois in chunk for i in idx_of[p]])
+                done += len(chunk)
+                self.sig_progress.emit(done, total)
+                if self._stop:
+                    chunks.close()
+                    break
+        except Exception as e:
+            self.sig_error.emit(str(e))
+        self.sig_finished.emit()
+
+
 class CropView(QWidget):
     """
-    Permite recortar 1..N ROIs por imagen (con zoom/pan) y emite rutas de recortes listos para predecir.
+    Permite recortar 1..N ROIs por imagen (con zoom/pan) y emite las imágenes con sus
+    ROIs, que se clasifican en memoria (sin guardar recortes, salvo cfg.save_crop_files).
     """
     sig_cancel = Signal()
-    sig_crops_ready = Signal(list)  # list[str] rutas de recortes
+    sig_crops_ready = Signal(list, str)  # [(ruta, rois)], carpeta para guardar recortes ("" = no)
 
     def __init__(self, cfg=None):
         super().__init__()
@@ -34,6 +74,8 @@ class CropView(QWidget):
         self._idx: int = -1
         self._out_dir = ""  # carpeta temporal para los recortes
         self._eyes_detector: EyesDetector | None = None  # <<< NUEVO
+        self._detect_worker: Optional[_DetectWorker] = None
+        self._detect_stats: Dict[str, int] = {}
         self._build()
 
     # -------- UI --------
@@ -62,6 +104,10 @@ class CropView(QWidget):
         self.list_rois = QListWidget()
         self.btn_auto = QPushButton("Cortes automáticos (YOLO)")
         self.btn_auto.clicked.connect(self._auto_detect_rois)
+        self.btn_auto_all = QPushButton("Detectar en todas (YOLO)")
+        self.btn_auto_all.clicked.connect(self._auto_detect_all)
+        self.detect_progress = QProgressBar()
+        self.detect_progress.setVisible(False)
         self.btn_remove_last = QPushButton("Eliminar último ROI")
         self.btn_clear = QPushButton("Limpiar ROIs")
 
@@ -73,6 +119,8 @@ class CropView(QWidget):
         right.addWidget(QLabel("ROIs (x,y,w,h):"))
         right.addWidget(self.list_rois, 1)
         right.addWidget(self.btn_auto)
+        right.addWidget(self.btn_auto_all)
+        right.addWidget(self.detect_progress)
         right.addWidget(self.btn_remove_last)
         right.addWidget(self.btn_clear)
 
@@ -104,6 +152,7 @@ class CropView(QWidget):
     # -------- API externa --------
     def load_images(self, paths: List[str]):
         """Cargar 1..N imágenes; se reinicia el estado."""
+        self._stop_detection()
         self._images = [_ImgState(path=p, rois=[]) for p in paths]
         self._idx = 0 if self._images else -1
         self._out_dir = ""
@@ -179,44 +228,20 @@ class CropView(QWidget):
             QMessageBox.information(self, "Sin ROIs", "Dibuja al menos un recorte antes de continuar.")
             return
 
-        # Carpeta temporal para esta sesión
-        if not self._out_dir:
+        # Carpeta temporal para esta sesión (sólo si se guardan los recortes)
+        if getattr(self.cfg, "save_crop_files", False) and not self._out_dir:
             base = Path(tempfile.gettempdir()) / "IRFLies" / "crops"
             base.mkdir(parents=True, exist_ok=True)
             self._out_dir = str(base / time.strftime("%Y%m%d_%H%M%S"))
             Path(self._out_dir).mkdir(parents=True, exist_ok=True)
 
-        out_paths: List[str] = []
-        for s in self._images:
-            if not s.rois:
-                continue
-            try:
-                with Image.open(s.path) as im:
-                    w0, h0 = im.size
-                    for i, (x,y,w,h) in enumerate(s.rois, start=1):
-                        # Limitar por seguridad
-                        x2 = max(0, min(x, w0-1))
-                        y2 = max(0, min(y, h0-1))
-                        w2 = max(1, min(w, w0 - x2))
-                        h2 = max(1, min(h, h0 - y2))
-                        crop = im.crop((x2, y2, x2+w2, y2+h2))
-                        name = f"{Path(s.path).stem}__roi{i}_x{x2}_y{y2}_w{w2}_h{h2}.jpg"
-                        out = str(Path(self._out_dir) / name)
-                        crop.save(out, quality=95)
-                        out_paths.append(out)
-            except Exception as e:
-                QMessageBox.critical(self, "Error recortando", f"{s.path}\n\n{e}")
-                return
-
-        if not out_paths:
-            QMessageBox.information(self, "Sin recortes válidos", "No se generaron recortes.")
-            return
-
-        self.sig_crops_ready.emit(out_paths)
+        # los recortes se hacen en memoria al predecir: cada imagen se decodifica una vez
+        sources = [(s.path, list(s.rois)) for s in self._images if s.rois]
+        self.sig_crops_ready.emit(sources, self._out_dir)
         
     def _get_eyes_detector(self) -> EyesDetector:
         if self._eyes_detector is None:
-            self._eyes_detector = default_eyes_detector()
+            self._eyes_detector = default_eyes_detector(self.cfg)
         return self._eyes_detector
     
     def _auto_detect_rois(self):
@@ -237,7 +262,7 @@ class CropView(QWidget):
             return
 
         try:
-            rois = det.detect(img_path, conf=0.25)
+            rois = det.detect(img_path, conf=getattr(self.cfg, "yolo_conf", 0.25))
         except Exception as e:
             QMessageBox.critical(self, "Error en detección", f"{img_path}\n\n{e}")
             return
@@ -250,3 +275,85 @@ class CropView(QWidget):
         # que a su vez actualiza self._images[_idx].rois y la lista de la derecha.
         self.view.set_rois(rois)
 
+    # -------- Detección en todas las imágenes --------
+    def _auto_detect_all(self):
+        """Detecta en segundo plano en todas las imágenes que aún no tienen ROIs."""
+        if self._detect_worker is not None:
+            self._detect_worker.stop()
+            self.btn_auto_all.setEnabled(False)
+            return
+        self._capture_rois_from_view()
+        targets = [(i, s.path) for i, s in enumerate(self._images) if not s.rois]
+        if not targets:
+            QMessageBox.information(self, "Nada que detectar", "Todas las imágenes ya tienen ROIs.")
+            return
+
+        try:
+            det = self._get_eyes_detector()
+        except FileNotFoundError as e:
+            QMessageBox.critical(self, "Modelo no encontrado", str(e))
+            return
+
+        conf = getattr(self.cfg, "yolo_conf", 0.25)
+        batch_size = getattr(self.cfg, "yolo_batch_size", 8)
+        self._detect_stats = {"found": 0, "empty": 0, "failed": 0}
+        self.detect_progress.setRange(0, len(targets))
+        self.detect_progress.setValue(0)
+        self.detect_progress.setVisible(True)
+        self.btn_auto.setEnabled(False)
+        self.btn_auto_all.setText("Detener detección")
+
+        thread = QThread(self)
+        worker = _DetectWorker(det, targets, conf, batch_size)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.sig_chunk.connect(lambda items, w=worker: self._on_detect_chunk(w, items))
+        worker.sig_progress.connect(lambda done, total: self.detect_progress.setValue(done))
+        worker.sig_error.connect(lambda msg: QMessageBox.critical(self, "Error en detección", msg))
+        worker.sig_finished.connect(lambda w=worker: self._on_detect_finished(w))
+        worker.sig_finished.connect(thread.quit)
+        worker.sig_finished.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+        self._detect_worker = worker
+        thread.start()
+
+    def _on_detect_chunk(self, worker: _DetectWorker, items: list):
+        if worker is not self._detect_worker:
+            return  # de una sesión anterior
+        for idx, rois in items:
+            if rois is None:
+                self._detect_stats["failed"] += 1
+            elif not rois:
+                self._detect_stats["empty"] += 1
+            else:
+                self._detect_stats["found"] += 1
+                st = self._images[idx]
+                if st.rois:
+                    continue  # el usuario ya dibujó en esta imagen mientras tanto
+                st.rois = list(rois)
+                if idx == self._idx:
+                    self.view.set_rois(rois)
+
+    def _on_detect_finished(self, worker: _DetectWorker):
+        if worker is not self._detect_worker:
+            return
+        self._detect_worker = None
+        self.detect_progress.setVisible(False)
+        self.btn_auto.setEnabled(True)
+        self.btn_auto_all.setEnabled(True)
+        self.btn_auto_all.setText("Detectar en todas (YOLO)")
+        s = self._detect_stats
+        msg = f"Ojos detectados en {s['found']} imágenes; sin detecciones: {s['empty']}."
+        if s["failed"]:
+            msg += f"\nNo se pudieron abrir: {s['failed']}."
+        QMessageBox.information(self, "Detección terminada", msg)
+
+    def _stop_detection(self):
+        """Detiene (e ignora) una detección en curso, p.ej. al cargar otras imágenes."""
+        if self._detect_worker is not None:
+            self._detect_worker.stop()
+            self._detect_worker = None
+            self.detect_progress.setVisible(False)
+            self.btn_auto.setEnabled(True)
+            self.btn_auto_all.setEnabled(True)
+            self.btn_auto_all.setText("Detectar en todas (YOLO)")
\ No newline at end of file
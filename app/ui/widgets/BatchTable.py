@@ -1,8 +1,10 @@
 from __future__ import annotations
-from typing import List
+from typing import Iterable, Union
 
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QTableWidget, QTableWidgetItem, QSizePolicy
-from core.predictor import Prediction
+from core.predictor import Prediction, PredictionBatch
+
+Results = Union[PredictionBatch, Iterable[Prediction]]
 
 
 class BatchTable(QWidget):
@@ -22,9 +24,16 @@ class BatchTable(QWidget):
     def clear_rows(self):
         self.table.setRowCount(0)
 
-    def populate(self, preds: List[Prediction], species: str, model_key: str, model_hash: str):
-        self.table.setRowCount(len(preds))
-        for r, p in enumerate(preds):
+    def populate(self, preds: Results, species: str, model_key: str, model_hash: str):
+        self.table.setRowCount(0)
+        self.append_rows(preds, species, model_key, model_hash)
+
+    def append_rows(self, preds: Results, species: str, model_key: str, model_hash: str):
+        # PredictionBatch se recorre como filas-vista (PredictionRow), sin copiar el lote
+        preds = preds if isinstance(preds, PredictionBatch) else list(preds)
+        first = self.table.rowCount()
+        self.table.setRowCount(first + len(preds))
+        for r, p in enumerate(preds, start=first):
             probs_txt = "; ".join(f"{k}:{v:.2f}" for k, v in p.full_probs.items())
             vals = [
                 p.file,
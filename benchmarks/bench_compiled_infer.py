@@ -0,0 +1,99 @@
+"""
+bench_compiled_infer.py — Latencia por lote: llamada eager vs tf.function
+(y opcionalmente XLA) en CPU.
+
+Uso:
+  python benchmarks/bench_compiled_infer.py                      # EfficientNetV2B0 sin pesos, 5 clases
+  python benchmarks/bench_compiled_infer.py --species Ceratitis --model refit
+  python benchmarks/bench_compiled_infer.py --batch-sizes 1 8 16 32 --jit --json out.json
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "-1")  # medir en CPU
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "app"))
+
+import numpy as np
+import tensorflow as tf
+
+from core.model_loader import compile_inference
+
+
+def _stand_in_model(image_size: int, num_classes: int) -> tf.keras.Model:
+    return tf.keras.applications.EfficientNetV2B0(
+        weights=None, input_shape=(image_size, image_size, 3), classes=num_classes,
+        classifier_activation="softmax",
+    )
+
+
+def _time_calls(fn, batch: np.ndarray, repeats: int) -> dict:
+    t0 = time.perf_counter()
+    fn(batch)  # primera llamada (traza / compila)
+    first = time.perf_counter() - t0
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn(batch)
+        times.append(time.perf_counter() - t0)
+    med = statistics.median(times)
+    return {
+        "first_call_s": first,
+        "median_s": med,
+        "ms_per_image": 1000.0 * med / batch.shape[0],
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--species", default=None)
+    ap.add_argument("--model", default=None)
+    ap.add_argument("--image-size", type=int, default=224)
+    ap.add_argument("--classes", type=int, default=5)
+    ap.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    ap.add_argument("--repeats", type=int, default=10)
+    ap.add_argument("--jit", action="store_true", help="incluir tf.function con jit_compile=True")
+    ap.add_argument("--json", default=None, help="guardar resultados en este archivo")
+    args = ap.parse_args()
+
+    if args.species and args.model:
+        from core.registry import Registry
+        from core.model_loader import load_keras_model
+        entry = Registry().get_model(args.species, args.model)
+        model = load_keras_model(entry.path, entry.classes_path).model
+        label = f"{args.species}/{args.model}"
+    else:
+        model = _stand_in_model(args.image_size, args.classes)
+        label = "EfficientNetV2B0(weights=None)"
+
+    rows = []
+    rng = np.random.default_rng(0)
+    for bs in args.batch_sizes:
+        batch = rng.uniform(0, 255, (bs, args.image_size, args.image_size, 3)).astype(np.float32)
+        # funciones nuevas por tamaño de lote: first_call_s incluye trazado/compilación
+        fns = {"eager": lambda x: model(x, training=False).numpy()}
+        fns["tf.function"] = compile_inference(model, args.image_size)
+        if args.jit:
+            fns["tf.function+xla"] = compile_inference(model, args.image_size, jit_compile=True)
+        for name, fn in fns.items():
+            r = _time_calls(fn, batch, args.repeats)
+            r.update({"variant": name, "batch_size": bs})
+            rows.append(r)
+            print(f"bs={bs:>3}  {name:<16} first={r['first_call_s']*1000:8.1f} ms  "
+                  f"median={r['median_s']*1000:8.1f} ms  ({r['ms_per_image']:.2f} ms/img)", flush=True)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({"model": label, "results": rows}, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,311 @@
+"""
+bench_pipeline.py — Rendimiento (imágenes/s) y memoria pico de las etapas del
+pipeline sobre un corpus sintético JPEG/PNG reproducible.
+
+Etapas:
+  iter_images       core.utils.iter_images_in_paths sobre la carpeta del corpus
+  batch_from_paths  decodificación + preprocesado (sin caché de tensores)
+  predict_files     extremo a extremo con un modelo Keras mínimo de la misma E/S
+  csv_storage       core.storage.append_predictions_csv
+  results_store     core.results_store.ResultsStore.add_predictions (una transacción por lote)
+  crops             core.crops.save_crops (2 ROIs por imagen)
+  crops_to_tensors  recortes a disco y vueltos a leer (flujo anterior) vs. en memoria
+                    (core.crops.iter_crop_batches), hasta el lote listo para el modelo
+  yolo_detect       EyesDetector.detect, una imagen por llamada (sólo si hay ultralytics y pesos)
+  yolo_detect_many  EyesDetector.detect_many, en lotes de cfg.yolo_batch_size
+
+Uso:
+  python benchmarks/bench_pipeline.py --n 200 --size 1600x1200 --json bench_abc123.json
+  python benchmarks/bench_pipeline.py --json nuevo.json --compare bench_abc123.json
+
+Memoria: `peak_traced_mb` es el pico de tracemalloc durante la etapa (Python +
+NumPy; no incluye el runtime de TensorFlow); `peak_rss_mb` es el pico de RSS
+del proceso hasta ese momento.
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "-1")  # medir en CPU
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "app"))
+
+import numpy as np
+from PIL import Image
+
+from core.tuner import peak_rss_bytes
+
+
+# ---------- corpus ----------
+
+def make_corpus(root: Path, n: int, width: int, height: int, formats: List[str], seed: int = 0) -> List[str]:
+    """
+    n imágenes por formato con contenido tipo foto (gradiente + manchas + ruido),
+    para que el tamaño comprimido sea realista. Si ya existen, se reutilizan.
+    """
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:height, 0:width].astype(np.float32)
+    paths: List[str] = []
+    for fmt in formats:
+        d = root / f"{fmt}_{width}x{height}"
+        d.mkdir(parents=True, exist_ok=True)
+        for i in range(n):
+            p = d / f"img_{i:05d}.{fmt}"
+            paths.append(str(p))
+            if p.is_file():
+                continue
+            cx, cy = rng.uniform(0, width), rng.uniform(0, height)
+            blob = 120 * np.exp(-(((xx - cx) / (0.2 * width)) ** 2 + ((yy - cy) / (0.2 * height)) ** 2))
+            base = np.stack([xx / width * 200, yy / height * 200, blob], axis=-1)
+            img = np.clip(base + rng.normal(0, 12, base.shape), 0, 255).astype(np.uint8)
+            Image.fromarray(img).save(p, **({"quality": 90} if fmt == "jpg" else {}))
+    return paths
+
+
+# ---------- medición ----------
+
+def _measure(name: str, fn: Callable[[], int], runs: int) -> Dict:
+    """
+    Ejecuta fn `runs` veces (fn devuelve cuántas imágenes procesó) y toma la
+    mediana; la memoria se mide en una pasada extra, porque tracemalloc
+    ralentiza las asignaciones y falsearía el tiempo.
+    """
+    times: List[float] = []
+    n = 0
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        n = fn()
+        times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    peak_traced = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    med = statistics.median(times)
+    rss = peak_rss_bytes()
+    row = {
+        "name": name,
+        "images": n,
+        "runs": runs,
+        "median_s": med,
+        "min_s": min(times),
+        "images_per_s": n / med if med > 0 else 0.0,
+        "peak_traced_mb": peak_traced / 2**20,
+        "peak_rss_mb": rss / 2**20 if rss else None,
+    }
+    print(f"{name:<28}{n:>7}{row['images_per_s']:>12.1f} img/s{row['peak_traced_mb']:>10.1f} MB", flush=True)
+    return row
+
+
+def _tiny_model(tmp: Path, image_size: int, num_classes: int):
+    """Modelo mínimo con la misma E/S que los clasificadores reales ([N,S,S,3] -> [N,C])."""
+    import tensorflow as tf
+    from core.model_loader import load_keras_model
+
+    model = tf.keras.Sequential([
+        tf.keras.Input((image_size, image_size, 3)),
+        tf.keras.layers.Conv2D(8, 3, strides=4, activation="relu"),
+        tf.keras.layers.GlobalAveragePooling2D(),
+        tf.keras.layers.Dense(num_classes, activation="softmax"),
+    ])
+    path = tmp / "tiny.keras"
+    model.save(path)
+    classes = tmp / "classes.json"
+    classes.write_text(json.dumps({"classes": [str(-i) for i in range(num_classes, 0, -1)]}), encoding="utf-8")
+    return load_keras_model(str(path), str(classes), image_size=image_size)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _compare(new: List[Dict], old_path: str) -> None:
+    old = {r["name"]: r for r in json.loads(Path(old_path).read_text(encoding="utf-8"))["results"]}
+    print(f"\n{'etapa':<28}{'antes':>12}{'ahora':>12}{'cambio':>9}")
+    for r in new:
+        o = old.get(r["name"])
+        if not o or not o["images_per_s"]:
+            continue
+        ratio = r["images_per_s"] / o["images_per_s"]
+        print(f"{r['name']:<28}{o['images_per_s']:>12.1f}{r['images_per_s']:>12.1f}{ratio:>8.2f}×")
+
+
+# ---------- main ----------
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=64, help="imágenes por formato")
+    ap.add_argument("--size", default="1024x768", help="resolución del corpus, ANCHOxALTO")
+    ap.add_argument("--formats", nargs="+", default=["jpg", "png"], choices=["jpg", "png"])
+    ap.add_argument("--image-size", type=int, default=224)
+    ap.add_argument("--classes", type=int, default=5)
+    ap.add_argument("--batch-size", type=int, default=16)
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--corpus-dir", default=None, help="reutilizar/guardar el corpus aquí (por defecto: temporal)")
+    ap.add_argument("--skip", nargs="*", default=[], help="etapas a omitir")
+    ap.add_argument("--json", default=None, help="guardar resultados en este archivo")
+    ap.add_argument("--compare", default=None, help="JSON de una corrida anterior para comparar")
+    args = ap.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="irfl_bench_"))
+    corpus_root = Path(args.corpus_dir) if args.corpus_dir else tmp / "corpus"
+
+    try:
+        return _run(args, tmp, corpus_root)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _run(args: argparse.Namespace, tmp: Path, corpus_root: Path) -> int:
+    from core.config import AppConfig
+    from core.crops import save_crops
+    from core.predictor import Prediction, PredictionBatch
+    from core.preprocessor import batch_from_paths
+    from core.storage import append_predictions_csv
+    from core.utils import iter_images_in_paths
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    t0 = time.perf_counter()
+    paths = make_corpus(corpus_root, args.n, width, height, args.formats)
+    print(f"Corpus: {len(paths)} imágenes {width}x{height} en {corpus_root} ({time.perf_counter() - t0:.1f}s)")
+    by_fmt = {fmt: [p for p in paths if p.endswith(fmt)] for fmt in args.formats}
+
+    cfg = AppConfig(batch_size=args.batch_size, image_size=args.image_size,
+                    tensor_cache_mb=0, prediction_cache=False, runs_dir=str(tmp / "runs"))
+    rows: List[Dict] = []
+    skip = set(args.skip)
+
+    if "iter_images" not in skip:
+        rows.append(_measure("iter_images", lambda: len(iter_images_in_paths([str(corpus_root)])), args.runs))
+
+    if "batch_from_paths" not in skip:
+        batch_from_paths(paths[:1], args.image_size)  # importa TensorFlow fuera de la medición
+        for fmt, ps in by_fmt.items():
+            def _decode(ps=ps):
+                for i in range(0, len(ps), args.batch_size):
+                    batch_from_paths(ps[i:i + args.batch_size], args.image_size, cfg.jpeg_draft_decode)
+                return len(ps)
+            rows.append(_measure(f"batch_from_paths[{fmt}]", _decode, args.runs))
+
+    if "predict_files" not in skip:
+        from core.predictor import predict_files
+        lm = _tiny_model(tmp, args.image_size, args.classes)
+        predict_files(lm, cfg, paths[: args.batch_size])  # trazado fuera de la medición
+        for fmt, ps in by_fmt.items():
+            rows.append(_measure(f"predict_files[{fmt}]", lambda ps=ps: len(predict_files(lm, cfg, ps)), args.runs))
+
+    if "csv_storage" not in skip:
+        classes = [str(-i) for i in range(args.classes, 0, -1)]
+        probs = {c: 1.0 / len(classes) for c in classes}
+        preds = [Prediction(p, classes[0], 0.6, classes[1], 0.3, probs, "high", 0.3) for p in paths]
+        out_csv = tmp / "bench.csv"
+
+        def _csv():
+            out_csv.unlink(missing_ok=True)
+            for i in range(0, len(preds), args.batch_size):
+                append_predictions_csv(out_csv, "Bench", "tiny", "0" * 10, preds[i:i + args.batch_size])
+            return len(preds)
+        rows.append(_measure("csv_storage", _csv, args.runs))
+
+    if "results_store" not in skip:
+        from core.results_store import ResultsStore
+        classes = [str(-i) for i in range(args.classes, 0, -1)]
+        probs = np.full((len(paths), len(classes)), 1.0 / len(classes), dtype=np.float32)
+        bs = args.batch_size
+        chunks = [PredictionBatch.from_probs(paths[i:i + bs], probs[i:i + bs], classes, cfg)
+                  for i in range(0, len(paths), bs)]
+        db = tmp / "bench.sqlite"
+
+        def _store():
+            for suffix in ("", "-wal", "-shm"):
+                Path(f"{db}{suffix}").unlink(missing_ok=True)
+            store = ResultsStore(db)
+            run = store.start_run("Bench", "tiny", "0" * 10, classes)
+            for chunk in chunks:
+                store.add_predictions(run, chunk)
+            store.close()
+            return len(paths)
+        rows.append(_measure("results_store", _store, args.runs))
+
+    if "crops" not in skip:
+        crop_dir = tmp / "crops"
+        crop_dir.mkdir(exist_ok=True)
+        rois = [(width // 8, height // 8, width // 3, height // 3), (width // 2, height // 2, width // 3, height // 3)]
+
+        def _crops():
+            for p in paths:
+                save_crops(p, rois, crop_dir)
+            return len(paths)
+        rows.append(_measure("crops", _crops, args.runs))
+
+        from core.crops import iter_crop_batches
+        sources = [(p, rois) for p in paths]
+
+        def _via_files():
+            out = []
+            for p in paths:
+                out.extend(save_crops(p, rois, crop_dir))
+            for i in range(0, len(out), args.batch_size):
+                batch_from_paths(out[i:i + args.batch_size], args.image_size, cfg.jpeg_draft_decode)
+            return len(paths)
+
+        def _in_memory():
+            for _ in iter_crop_batches(sources, args.image_size, args.batch_size, cfg.decode_workers,
+                                       fast_decode=cfg.jpeg_draft_decode):
+                pass
+            return len(paths)
+        batch_from_paths(paths[:1], args.image_size)  # importa TensorFlow fuera de la medición
+        rows.append(_measure("crops_to_tensors[archivos]", _via_files, args.runs))
+        rows.append(_measure("crops_to_tensors[memoria]", _in_memory, args.runs))
+
+    if "yolo_detect" not in skip:
+        try:
+            from core.eyes_detector import default_eyes_detector
+            det = default_eyes_detector()
+            det.detect(paths[0])  # carga del modelo fuera de la medición
+        except Exception as e:  # sin ultralytics/torch o sin pesos
+            print(f"{'yolo_detect':<28}omitido ({type(e).__name__}: {str(e).splitlines()[0][:60]})")
+        else:
+            rows.append(_measure("yolo_detect", lambda: len([det.detect(p) for p in paths]), args.runs))
+            rows.append(_measure("yolo_detect_many",
+                                 lambda: len(det.detect_many(paths, batch_size=cfg.yolo_batch_size)), args.runs))
+
+    result = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": rows,
+    }
+    if args.json:
+        Path(args.json).write_text(json.dumps(result, indent=2), encoding="utf-8")
+        print(f"Resultados: {args.json}")
+    if args.compare:
+        _compare(rows, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())